@@ -4,6 +4,8 @@ from .users import router as users_router
 from .groups import router as groups_router
 from .hearings import router as hearings_router
 from .recommendations import router as recommendations_router
+from .metrics import router as metrics_router
+from .jobs import router as jobs_router
 # 段階的に機能を有効化
 try:
     from .interviews import router as interviews_router
@@ -18,6 +20,8 @@ api_router.include_router(users_router, prefix="/users", tags=["users"])
 api_router.include_router(groups_router, prefix="/groups", tags=["groups"])
 api_router.include_router(hearings_router, prefix="/hearings", tags=["hearings"])
 api_router.include_router(recommendations_router, prefix="/recommendations", tags=["recommendations"])
+api_router.include_router(metrics_router, prefix="/metrics", tags=["metrics"])
+api_router.include_router(jobs_router, prefix="/jobs", tags=["jobs"])
 
 if INTERVIEWS_AVAILABLE:
     api_router.include_router(interviews_router, prefix="/interviews", tags=["interviews"])
\ No newline at end of file
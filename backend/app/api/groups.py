@@ -1,8 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Header, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from app.db.database import get_db
+from app.db.database import get_db, unit_of_work, AsyncSessionLocal
+from app.core.group_events import group_events
+from app.core.group_version import bump_group_version, group_etag, etag_matches, not_modified, set_etag
 from app.models.group import Group
 from app.models.user import User
 from app.schemas.group import GroupCreate, GroupUpdate, GroupResponse, GroupWithMembers, GroupJoinRequest
@@ -10,6 +14,18 @@ from app.schemas.group import GroupCreate, GroupUpdate, GroupResponse, GroupWith
 router = APIRouter()
 
 
+def publish_members_changed(group: Group, event: str, user: User):
+    """メンバーの参加・離脱をグループのイベントストリームに流す"""
+    group_events.publish(group.group_id, event, {
+        "user_id": user.user_id,
+        "nickname": user.nickname,
+        "members": [{
+            "user_id": member.user_id,
+            "nickname": member.nickname
+        } for member in group.members]
+    })
+
+
 @router.post("/", response_model=GroupResponse)
 def create_group(group: GroupCreate, db: Session = Depends(get_db)):
     """新しいグループを作成（ホストユーザーが実行）"""
@@ -27,9 +43,8 @@ def create_group(group: GroupCreate, db: Session = Depends(get_db)):
     # ホストユーザーをメンバーに追加
     db_group.members.append(host_user)
     
-    db.add(db_group)
-    db.commit()
-    db.refresh(db_group)
+    with unit_of_work(db):
+        db.add(db_group)
     return db_group
 
 
@@ -51,9 +66,11 @@ def join_group(join_request: GroupJoinRequest, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="User is already a member of this group")
     
     # グループにユーザーを追加
-    group.members.append(user)
-    db.commit()
-    db.refresh(group)
+    with unit_of_work(db):
+        group.members.append(user)
+        bump_group_version(db, group.group_id)
+    
+    publish_members_changed(group, "member_joined", user)
     
     # GroupWithMembersレスポンスを返す
     group_data = GroupWithMembers(
@@ -74,8 +91,15 @@ def join_group(join_request: GroupJoinRequest, db: Session = Depends(get_db)):
 
 
 @router.get("/{group_id}", response_model=GroupWithMembers)
-def get_group(group_id: str, db: Session = Depends(get_db)):
+def get_group(group_id: str, request: Request, response: Response, db: Session = Depends(get_db)):
     """グループ情報の取得"""
+    # バージョンが変わっていなければメンバーを読み込まずに304を返す
+    etag = group_etag(db, group_id)
+    if etag is None:
+        raise HTTPException(status_code=404, detail="Group not found")
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
     group = db.query(Group).filter(Group.group_id == group_id).first()
     if group is None:
         raise HTTPException(status_code=404, detail="Group not found")
@@ -95,6 +119,7 @@ def get_group(group_id: str, db: Session = Depends(get_db)):
         } for member in group.members]
     )
     
+    set_etag(response, etag)
     return group_data
 
 
@@ -105,11 +130,10 @@ def update_group(group_id: str, group_update: GroupUpdate, db: Session = Depends
     if group is None:
         raise HTTPException(status_code=404, detail="Group not found")
     
-    for field, value in group_update.dict(exclude_unset=True).items():
-        setattr(group, field, value)
-    
-    db.commit()
-    db.refresh(group)
+    with unit_of_work(db):
+        for field, value in group_update.dict(exclude_unset=True).items():
+            setattr(group, field, value)
+        bump_group_version(db, group_id)
     return group
 
 
@@ -125,8 +149,10 @@ def add_member_to_group(group_id: str, user_id: str, db: Session = Depends(get_d
         raise HTTPException(status_code=404, detail="User not found")
     
     if user not in group.members:
-        group.members.append(user)
-        db.commit()
+        with unit_of_work(db):
+            group.members.append(user)
+            bump_group_version(db, group_id)
+        publish_members_changed(group, "member_joined", user)
     
     return {"message": "Member added to group successfully"}
 
@@ -143,8 +169,33 @@ def remove_member_from_group(group_id: str, user_id: str, db: Session = Depends(
         raise HTTPException(status_code=404, detail="User not found")
     
     if user in group.members:
-        group.members.remove(user)
-        db.commit()
+        with unit_of_work(db):
+            group.members.remove(user)
+            bump_group_version(db, group_id)
+        publish_members_changed(group, "member_left", user)
     
     return {"message": "Member removed from group successfully"}
 
+
+
+@router.get("/{group_id}/events")
+async def stream_group_events(
+    group_id: str,
+    request: Request,
+    last_event_id: Optional[str] = Header(None)
+):
+    """グループの状態変化（メンバー参加・インタビュー状況・投票・最終決定）をSSEで配信"""
+    # ストリーム中にDB接続を握り続けないよう、存在確認だけ短いセッションで行う
+    async with AsyncSessionLocal() as db:
+        group = await db.scalar(select(Group.group_id).where(Group.group_id == group_id))
+    if group is None:
+        raise HTTPException(status_code=404, detail="Group not found")
+    
+    return StreamingResponse(
+        group_events.stream(group_id, last_event_id, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
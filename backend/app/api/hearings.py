@@ -3,7 +3,7 @@ from sqlalchemy.orm import Session
 from typing import List
 import uuid
 
-from app.db.database import get_db
+from app.db.database import get_db, unit_of_work
 from app.models.hearing import Hearing
 from app.models.group import Group
 from app.models.user import User
@@ -25,9 +25,8 @@ def create_hearing(hearing: HearingCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="User not found")
     
     db_hearing = Hearing(**hearing.dict())
-    db.add(db_hearing)
-    db.commit()
-    db.refresh(db_hearing)
+    with unit_of_work(db):
+        db.add(db_hearing)
     return db_hearing
 
 
@@ -47,11 +46,9 @@ def update_hearing(hearing_id: uuid.UUID, hearing_update: HearingUpdate, db: Ses
     if hearing is None:
         raise HTTPException(status_code=404, detail="Hearing not found")
     
-    for field, value in hearing_update.dict(exclude_unset=True).items():
-        setattr(hearing, field, value)
-    
-    db.commit()
-    db.refresh(hearing)
+    with unit_of_work(db):
+        for field, value in hearing_update.dict(exclude_unset=True).items():
+            setattr(hearing, field, value)
     return hearing
 
 
@@ -1,30 +1,182 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, func, select
+from typing import List, Optional, Tuple
+import asyncio
 import uuid
 import json
 import logging
 from datetime import datetime
 
-from app.db.database import get_db
-from app.models import User, Group, Interview, Message
+from app.db.database import get_db, get_async_db, unit_of_work, async_unit_of_work, AsyncSessionLocal
+from app.models import User, Group, Interview, Message, Recommendation
+from app.models.group import group_members
 from app.models.interview import InterviewStatus, MessageRole
 from app.schemas.interview import (
     InterviewCreate, InterviewResponse, InterviewChatRequest,
     InterviewAutoCompleteRequest, MessageResponse, InterviewListResponse
 )
-from app.clients.openai_client import openai_client
+from app.clients.openai_client import ClientDisconnected, openai_client
+from app.core.jobs import job_queue
+from app.core.group_events import group_events
+from app.core.group_version import bump_group_version, read_group_state
+from app.core.conversation_context import (
+    OPENING_MESSAGE, build_chat_context, load_slot_state, messages_to_fold, needs_fold
+)
+from app.core.preference_state import (
+    analysis_dedupe_key, empty_preference_state, load_preference_state, record_user_message, snapshot_preferences,
+    update_preference_state
+)
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+def publish_interview_status(db: Session, group_id: str):
+    """グループのインタビュー状況をイベントストリームに流す"""
+    group_events.publish(group_id, "interview_status", load_group_interview_status(db, group_id))
+
+
+def _sse_message(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+def opening_message(interview_id: str) -> Message:
+    """インタビュー冒頭のAIメッセージ（固定文のためモデルは呼ばない）"""
+    return Message(
+        message_id=str(uuid.uuid4()),
+        interview_id=interview_id,
+        role=MessageRole.assistant,
+        content=OPENING_MESSAGE,
+        sequence_number=1,
+        is_mock="true",
+        ai_source="system",
+        ai_model=None
+    )
+
+
+async def _save_messages(messages: List[Message], fold_context: bool = False):
+    async with AsyncSessionLocal() as db:
+        async with async_unit_of_work(db):
+            db.add_all(messages)
+            interview = await db.get(Interview, messages[0].interview_id)
+            for message in messages:
+                if message.role == MessageRole.user:
+                    record_user_message(interview, message.content)
+        if fold_context:
+            await db.run_sync(enqueue_context_fold, messages[0].interview_id)
+
+
+async def load_chat_context(db: AsyncSession, interview: Interview, user_message: str) -> Tuple[int, List[dict], bool]:
+    """
+    次のメッセージ番号と、モデルに送るメッセージを取得
+    
+    要約済みのメッセージは読み込まず、要約されていない直近のメッセージだけを使う。
+    3つ目の値は、今回のターンを保存した後に古いターンを要約に畳み込むべきかどうか。
+    """
+    last_sequence = await db.scalar(
+        select(func.max(Message.sequence_number)).where(Message.interview_id == interview.interview_id)
+    ) or 0
+    recent_messages = (await db.scalars(
+        select(Message).where(
+            Message.interview_id == interview.interview_id,
+            Message.sequence_number > interview.summarized_through
+        ).order_by(Message.sequence_number)
+    )).all()
+    
+    message_history = build_chat_context(interview, recent_messages, user_message)
+    # 今回のユーザー・AIメッセージの2件を加えた件数で判定する
+    return last_sequence + 1, message_history, needs_fold(len(recent_messages) + 2)
+
+
+def enqueue_context_fold(db: Session, interview_id: str):
+    """古いターンを要約に畳み込むジョブを登録"""
+    job_queue.enqueue(
+        db,
+        "fold_interview_context",
+        {"interview_id": interview_id},
+        dedupe_key=f"fold_interview_context:{interview_id}"
+    )
+
+
+async def _is_group_member(db: AsyncSession, group_id: str, user_id: str) -> bool:
+    membership = await db.execute(
+        select(group_members.c.user_id).where(
+            group_members.c.group_id == group_id,
+            group_members.c.user_id == user_id
+        )
+    )
+    return membership.first() is not None
+
+
+async def _load_messages(db: AsyncSession, interview_id: str) -> List[Message]:
+    return (await db.scalars(
+        select(Message).where(Message.interview_id == interview_id).order_by(Message.sequence_number)
+    )).all()
+
+
+def client_closed_response(interview_id: str) -> Response:
+    """応答生成中にクライアントが切断した（メッセージは保存しない）"""
+    logger.info(f"Client disconnected while waiting for chat reply: {interview_id}")
+    return Response(status_code=499)
+
+
+def stream_chat_reply(user_message: Message, message_history: List[dict], fold_context: bool = False) -> StreamingResponse:
+    """
+    AI応答をトークン単位でSSE配信し、完了後にユーザー・AIメッセージを保存する
+    
+    token イベントで本文の断片を、done イベントで保存したAIメッセージを送る。
+    生成中はDBセッションを持たず、保存時だけ短いセッションを使う。
+    """
+    async def events():
+        stream = openai_client.stream_chat_completion(message_history)
+        async for piece in stream:
+            yield _sse_message("token", {"content": piece})
+        
+        ai_response = stream.response
+        ai_message = Message(
+            message_id=str(uuid.uuid4()),
+            interview_id=user_message.interview_id,
+            role=MessageRole.assistant,
+            content=ai_response.content,
+            sequence_number=user_message.sequence_number + 1,
+            is_mock="true" if ai_response.is_mock else "false",
+            ai_source=ai_response.source,
+            ai_model=ai_response.model
+        )
+        try:
+            await _save_messages([user_message, ai_message], fold_context)
+        except Exception as e:
+            logger.error(f"Failed to save streamed chat for interview {user_message.interview_id}: {e}")
+            yield _sse_message("error", {"detail": "Failed to save message"})
+            return
+        
+        yield _sse_message("done", MessageResponse(
+            message_id=ai_message.message_id,
+            interview_id=ai_message.interview_id,
+            role=ai_message.role,
+            content=ai_message.content,
+            sequence_number=ai_message.sequence_number,
+            created_at=ai_message.created_at,
+            is_mock=ai_response.is_mock,
+            ai_source=ai_response.source,
+            ai_model=ai_response.model
+        ).model_dump(mode="json"))
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.post("/groups/{group_id}/users/{user_id}/interviews", response_model=InterviewResponse)
 async def create_interview(
     group_id: str,
     user_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     ユーザーのインタビューを作成
@@ -32,7 +184,7 @@ async def create_interview(
     logger.info(f"Creating interview for user {user_id} in group {group_id}")
     
     # ユーザーとグループの存在確認
-    user = db.query(User).filter(User.user_id == user_id).first()
+    user = await db.scalar(select(User).where(User.user_id == user_id))
     if not user:
         logger.error(f"User not found: {user_id}")
         raise HTTPException(
@@ -40,7 +192,7 @@ async def create_interview(
             detail="User not found"
         )
     
-    group = db.query(Group).filter(Group.group_id == group_id).first()
+    group = await db.scalar(select(Group).where(Group.group_id == group_id))
     if not group:
         logger.error(f"Group not found: {group_id}")
         raise HTTPException(
@@ -50,39 +202,33 @@ async def create_interview(
     
     # ユーザーがグループのメンバーかチェック
     # より明示的にメンバーシップをチェック
-    from app.models.group import group_members
-    membership_exists = db.query(group_members).filter(
-        group_members.c.group_id == group_id,
-        group_members.c.user_id == user_id
-    ).first()
+    membership_exists = await _is_group_member(db, group_id, user_id)
     
-    logger.info(f"Membership check - User: {user_id}, Group: {group_id}, Exists: {membership_exists is not None}")
+    logger.info(f"Membership check - User: {user_id}, Group: {group_id}, Exists: {membership_exists}")
     
     if not membership_exists:
         logger.error(f"User {user_id} is not a member of group {group_id}")
         # デバッグ情報として実際のメンバー一覧を出力
-        actual_members = db.query(group_members).filter(
-            group_members.c.group_id == group_id
-        ).all()
-        logger.error(f"Actual members in group {group_id}: {[m.user_id for m in actual_members]}")
+        actual_members = (await db.scalars(
+            select(group_members.c.user_id).where(group_members.c.group_id == group_id)
+        )).all()
+        logger.error(f"Actual members in group {group_id}: {actual_members}")
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="User is not a member of this group"
         )
     
     # 既存のインタビューをチェック
-    existing_interview = db.query(Interview).filter(
+    existing_interview = await db.scalar(select(Interview).where(
         and_(
             Interview.user_id == user_id,
             Interview.group_id == group_id
         )
-    ).first()
+    ))
     
     if existing_interview:
         # 既存のインタビューがある場合はそれを返す（エラーではなく）
-        messages = db.query(Message).filter(
-            Message.interview_id == existing_interview.interview_id
-        ).order_by(Message.sequence_number).all()
+        messages = await _load_messages(db, existing_interview.interview_id)
         
         return InterviewResponse(
             interview_id=existing_interview.interview_id,
@@ -114,25 +260,15 @@ async def create_interview(
         status=InterviewStatus.in_progress
     )
     
-    db.add(db_interview)
-    db.commit()
-    db.refresh(db_interview)
-    
     # 初期システムメッセージを作成
-    initial_message = Message(
-        message_id=str(uuid.uuid4()),
-        interview_id=db_interview.interview_id,
-        role=MessageRole.assistant,
-        content="こんにちは！レストラン選びのお手伝いをさせていただきます。あなたの好みや要望を教えてください。",
-        sequence_number=1,
-        is_mock="true",
-        ai_source="system",
-        ai_model=None
-    )
+    initial_message = opening_message(db_interview.interview_id)
+    
+    # インタビューと初期メッセージを1トランザクションでまとめて登録
+    async with async_unit_of_work(db):
+        db.add_all([db_interview, initial_message])
+        await db.run_sync(bump_group_version, group_id)
     
-    db.add(initial_message)
-    db.commit()
-    db.refresh(initial_message)
+    await db.run_sync(publish_interview_status, group_id)
     
     return InterviewResponse(
         interview_id=db_interview.interview_id,
@@ -180,14 +316,14 @@ def get_interview(
 async def chat_with_interview(
     interview_id: str,
     chat_request: InterviewChatRequest,
-    db: Session = Depends(get_db)
+    request: Request,
+    stream: bool = False,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    インタビューでチャット
+    インタビューでチャット（stream=true でAI応答をトークン単位にSSE配信）
     """
-    interview = db.query(Interview).filter(
-        Interview.interview_id == interview_id
-    ).first()
+    interview = await db.scalar(select(Interview).where(Interview.interview_id == interview_id))
     
     if not interview:
         raise HTTPException(
@@ -201,12 +337,8 @@ async def chat_with_interview(
             detail="Interview is not in progress"
         )
     
-    # 既存のメッセージを取得
-    existing_messages = db.query(Message).filter(
-        Message.interview_id == interview_id
-    ).order_by(Message.sequence_number).all()
-    
-    next_sequence = len(existing_messages) + 1
+    # 要約と直近のメッセージからモデルに送る文脈を組み立てる
+    next_sequence, message_history, fold_context = await load_chat_context(db, interview, chat_request.message)
     
     # ユーザーメッセージを保存
     user_message = Message(
@@ -217,17 +349,15 @@ async def chat_with_interview(
         sequence_number=next_sequence
     )
     
-    db.add(user_message)
-    db.commit()
+    if stream:
+        # 生成中に接続を保持しないよう、先にセッションを閉じる
+        await db.close()
+        return stream_chat_reply(user_message, message_history, fold_context)
     
-    # OpenAI APIでレスポンス生成
-    message_history = [
-        {"role": msg.role.value, "content": msg.content}
-        for msg in existing_messages
-    ]
-    message_history.append({"role": "user", "content": chat_request.message})
-    
-    ai_response = await openai_client.chat_completion(message_history)
+    try:
+        ai_response = await openai_client.chat_completion(message_history, request.is_disconnected)
+    except ClientDisconnected:
+        return client_closed_response(interview_id)
     
     # AIメッセージを保存
     ai_message = Message(
@@ -241,9 +371,12 @@ async def chat_with_interview(
         ai_model=ai_response.model
     )
     
-    db.add(ai_message)
-    db.commit()
-    db.refresh(ai_message)
+    # ユーザーメッセージとAIメッセージを1トランザクションでまとめて保存し、好みの状態を更新
+    async with async_unit_of_work(db):
+        db.add_all([user_message, ai_message])
+        record_user_message(interview, chat_request.message)
+    if fold_context:
+        await db.run_sync(enqueue_context_fold, interview_id)
     
     return MessageResponse(
         message_id=ai_message.message_id,
@@ -262,14 +395,12 @@ async def chat_with_interview(
 async def complete_interview(
     interview_id: str,
     complete_request: InterviewAutoCompleteRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    インタビューを完了
+    インタビューを完了（会話中に更新してきた好みの状態をそのまま確定する）
     """
-    interview = db.query(Interview).filter(
-        Interview.interview_id == interview_id
-    ).first()
+    interview = await db.scalar(select(Interview).where(Interview.interview_id == interview_id))
     
     if not interview:
         raise HTTPException(
@@ -283,33 +414,7 @@ async def complete_interview(
             detail="Interview is already completed"
         )
     
-    # メッセージ履歴を取得
-    messages = db.query(Message).filter(
-        Message.interview_id == interview_id
-    ).order_by(Message.sequence_number).all()
-    
-    # 好みを分析
-    message_history = [
-        {"role": msg.role.value, "content": msg.content}
-        for msg in messages
-    ]
-    
-    preferences = await openai_client.analyze_preferences(message_history)
-    
-    # インタビューを完了状態に更新
-    interview.status = InterviewStatus.completed
-    interview.preferences_summary = json.dumps(preferences, ensure_ascii=False)
-    interview.completed_at = datetime.utcnow()
-    
-    db.commit()
-    db.refresh(interview)
-    
-    return {
-        "interview_id": interview_id,
-        "status": "completed",
-        "preferences_summary": preferences,
-        "message": "Interview completed successfully"
-    }
+    return await db.run_sync(_complete_interview, interview)
 
 
 @router.get("/groups/{group_id}/interviews", response_model=InterviewListResponse)
@@ -361,20 +466,20 @@ def get_user_interviews(
 @router.post("/", response_model=InterviewResponse)
 async def create_interview_simple(
     request: InterviewCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     シンプルなインタビュー作成エンドポイント
     """
     # ユーザーとグループの存在確認
-    user = db.query(User).filter(User.user_id == request.user_id).first()
+    user = await db.scalar(select(User).where(User.user_id == request.user_id))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    group = db.query(Group).filter(Group.group_id == request.group_id).first()
+    group = await db.scalar(select(Group).where(Group.group_id == request.group_id))
     if not group:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -382,22 +487,20 @@ async def create_interview_simple(
         )
     
     # ユーザーがグループのメンバーかチェック
-    if user not in group.members:
+    if not await _is_group_member(db, request.group_id, request.user_id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="User is not a member of this group"
         )
     
     # 既存のインタビューがあるかチェック
-    existing_interview = db.query(Interview).filter(
+    existing_interview = await db.scalar(select(Interview).where(
         and_(Interview.user_id == request.user_id, Interview.group_id == request.group_id)
-    ).first()
+    ))
     
     if existing_interview:
         # 既存のインタビューのメッセージも取得
-        messages = db.query(Message).filter(
-            Message.interview_id == existing_interview.interview_id
-        ).order_by(Message.sequence_number).all()
+        messages = await _load_messages(db, existing_interview.interview_id)
         
         return InterviewResponse(
             interview_id=existing_interview.interview_id,
@@ -427,19 +530,14 @@ async def create_interview_simple(
         status=InterviewStatus.in_progress
     )
     
-    db.add(new_interview)
-    
     # 初期メッセージを作成
-    initial_message = Message(
-        message_id=str(uuid.uuid4()),
-        interview_id=interview_id,
-        role=MessageRole.assistant,
-        content="こんにちは！今日は美味しいお店を一緒に探しましょう。まず、どのような料理がお好みですか？"
-    )
+    initial_message = opening_message(interview_id)
     
-    db.add(initial_message)
-    db.commit()
-    db.refresh(new_interview)
+    async with async_unit_of_work(db):
+        db.add_all([new_interview, initial_message])
+        await db.run_sync(bump_group_version, request.group_id)
+    
+    await db.run_sync(publish_interview_status, request.group_id)
     
     return InterviewResponse(
         interview_id=interview_id,
@@ -465,13 +563,15 @@ async def create_interview_simple(
 async def chat_simple(
     interview_id: str,
     chat_request: InterviewChatRequest,
-    db: Session = Depends(get_db)
+    request: Request,
+    stream: bool = False,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    シンプルなチャットエンドポイント
+    シンプルなチャットエンドポイント（stream=true でAI応答をトークン単位にSSE配信）
     """
     # インタビューの存在確認
-    interview = db.query(Interview).filter(Interview.interview_id == interview_id).first()
+    interview = await db.scalar(select(Interview).where(Interview.interview_id == interview_id))
     if not interview:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -485,12 +585,8 @@ async def chat_simple(
             detail="Interview is not in progress"
         )
     
-    # 既存のメッセージを取得
-    existing_messages = db.query(Message).filter(
-        Message.interview_id == interview_id
-    ).order_by(Message.sequence_number).all()
-    
-    next_sequence = len(existing_messages) + 1
+    # 要約と直近のメッセージからモデルに送る文脈を組み立てる
+    next_sequence, message_history, fold_context = await load_chat_context(db, interview, chat_request.message)
     
     # ユーザーメッセージを保存
     user_message = Message(
@@ -501,18 +597,14 @@ async def chat_simple(
         sequence_number=next_sequence
     )
     
-    db.add(user_message)
-    db.commit()
-    
     # OpenAI APIでレスポンス生成
     try:
-        message_history = [
-            {"role": msg.role.value, "content": msg.content}
-            for msg in existing_messages
-        ]
-        message_history.append({"role": "user", "content": chat_request.message})
+        if stream:
+            # 生成中に接続を保持しないよう、先にセッションを閉じる
+            await db.close()
+            return stream_chat_reply(user_message, message_history, fold_context)
         
-        ai_response = await openai_client.chat_completion(message_history)
+        ai_response = await openai_client.chat_completion(message_history, request.is_disconnected)
         
         # AIレスポンスメッセージを保存
         ai_message = Message(
@@ -526,9 +618,11 @@ async def chat_simple(
             ai_model=ai_response.model
         )
         
-        db.add(ai_message)
-        db.commit()
-        db.refresh(ai_message)
+        async with async_unit_of_work(db):
+            db.add_all([user_message, ai_message])
+            record_user_message(interview, chat_request.message)
+        if fold_context:
+            await db.run_sync(enqueue_context_fold, interview_id)
         
         return MessageResponse(
             message_id=ai_message.message_id,
@@ -542,6 +636,8 @@ async def chat_simple(
             ai_model=ai_response.model
         )
         
+    except ClientDisconnected:
+        return client_closed_response(interview_id)
     except Exception as e:
         # AI APIエラー時のフォールバック
         fallback_response = "申し訳ございません。一時的にAIサービスに接続できません。再度お試しください。"
@@ -557,9 +653,9 @@ async def chat_simple(
             ai_model=None
         )
         
-        db.add(ai_message)
-        db.commit()
-        db.refresh(ai_message)
+        async with async_unit_of_work(db):
+            db.add_all([user_message, ai_message])
+            record_user_message(interview, chat_request.message)
         
         return MessageResponse(
             message_id=ai_message.message_id,
@@ -577,79 +673,194 @@ async def chat_simple(
 @router.post("/{interview_id}/complete")
 async def complete_interview_simple(
     interview_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    シンプルなインタビュー完了エンドポイント
+    シンプルなインタビュー完了エンドポイント（会話中に更新してきた好みの状態をそのまま確定する）
     """
     # インタビューの存在確認
-    interview = db.query(Interview).filter(Interview.interview_id == interview_id).first()
+    interview = await db.scalar(select(Interview).where(Interview.interview_id == interview_id))
     if not interview:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Interview not found"
         )
     
-    # インタビューメッセージを取得
-    messages = db.query(Message).filter(
-        Message.interview_id == interview_id
-    ).order_by(Message.sequence_number).all()
+    # 完了済みの場合はそのまま返す
+    if interview.status == InterviewStatus.completed:
+        return {
+            "interview_id": interview_id,
+            "status": "completed",
+            "preferences_summary": interview.preferences_summary
+        }
     
-    # メッセージの内容から好みを分析
-    try:
-        message_contents = [msg.content for msg in messages if msg.role == MessageRole.user]
-        analysis_prompt = f"""
-        以下のユーザーの発言から、レストランの好みを分析してください：
-        
-        {chr(10).join(message_contents)}
-        
-        以下の形式で分析結果を返してください：
-        - 好みの料理ジャンル: 
-        - 予算範囲: 
-        - 特別な要望: 
-        - アレルギー情報: 
-        - 優先事項:
-        """
-        
-        analysis_result = await openai_client.analyze_preferences(analysis_prompt)
-        
-        # インタビューを完了状態に更新
+    return await db.run_sync(_complete_interview, interview)
+
+
+def _interview_preference_state(db: Session, interview: Interview) -> dict:
+    """インタビューの好みの状態（状態を持たない古いインタビューは発言から作り直す）"""
+    if interview.preference_state:
+        return load_preference_state(interview)
+    user_messages = db.query(Message.content).filter(
+        Message.interview_id == interview.interview_id,
+        Message.role == MessageRole.user
+    ).order_by(Message.sequence_number)
+    return update_preference_state(empty_preference_state(), [content for (content,) in user_messages])
+
+
+def _complete_interview(db: Session, interview: Interview) -> dict:
+    """
+    好みの状態をスナップショットしてインタビューを完了にする
+    
+    OpenAIが使える場合は、会話全体からの分析をバックグラウンドで行い結果を差し替える。
+    """
+    preferences = snapshot_preferences(_interview_preference_state(db, interview))
+    
+    with unit_of_work(db):
         interview.status = InterviewStatus.completed
-        interview.preferences_summary = analysis_result
+        interview.preferences_summary = json.dumps(preferences, ensure_ascii=False)
         interview.completed_at = datetime.utcnow()
-        
-        db.commit()
-        db.refresh(interview)
-        
+        bump_group_version(db, interview.group_id)
+    
+    publish_interview_status(db, interview.group_id)
+    
+    if openai_client.enabled:
+        job_queue.enqueue(
+            db,
+            "analyze_interview",
+            {"interview_id": interview.interview_id},
+            dedupe_key=analysis_dedupe_key(interview.interview_id)
+        )
+    
+    return {
+        "interview_id": interview.interview_id,
+        "status": "completed",
+        "preferences_summary": preferences,
+        "message": "Interview completed successfully"
+    }
+
+
+@job_queue.handler("analyze_interview")
+async def analyze_interview(db: AsyncSession, payload: dict) -> dict:
+    """
+    完了したインタビューの好みを会話全体から分析し直す（ジョブハンドラ）
+    """
+    interview_id = payload["interview_id"]
+    interview = await db.get(Interview, interview_id)
+    if not interview:
+        raise ValueError(f"Interview not found: {interview_id}")
+    
+    # 完了前に登録されたジョブはまず好みの状態で完了にする
+    if interview.status != InterviewStatus.completed:
+        await db.run_sync(_complete_interview, interview)
+    
+    if not openai_client.enabled:
         return {
             "interview_id": interview_id,
             "status": "completed",
-            "preferences_summary": analysis_result
+            "preferences_summary": interview.preferences_summary
         }
-        
+    
+    # メッセージ履歴を取得
+    messages = await _load_messages(db, interview_id)
+    
+    message_history = [
+        {"role": msg.role.value, "content": msg.content}
+        for msg in messages
+    ]
+    
+    try:
+        preferences = await openai_client.analyze_preferences(message_history)
     except Exception as e:
-        # AI分析失敗時のフォールバック
-        basic_analysis = "ユーザーの好みを記録しました。詳細な分析はAIサービス復旧後に実行されます。"
-        
-        interview.status = InterviewStatus.completed
-        interview.preferences_summary = basic_analysis
-        interview.completed_at = datetime.utcnow()
-        
-        db.commit()
-        
+        # 分析に失敗した場合は完了時のスナップショットを残す
+        logger.error(f"Preference analysis failed for interview {interview_id}: {e}")
+        return {
+            "interview_id": interview_id,
+            "status": "completed",
+            "preferences_summary": interview.preferences_summary
+        }
+    
+    # 推薦が作成済みなら、その元になった好みを書き換えない
+    has_recommendation = await db.scalar(
+        select(Recommendation.recommendation_id).where(Recommendation.group_id == interview.group_id).limit(1)
+    )
+    if has_recommendation:
         return {
             "interview_id": interview_id,
             "status": "completed",
-            "preferences_summary": basic_analysis
+            "preferences_summary": interview.preferences_summary,
+            "message": "Recommendation already exists; kept the completion snapshot"
         }
+    
+    async with async_unit_of_work(db):
+        interview.preferences_summary = json.dumps(preferences, ensure_ascii=False)
+        await db.run_sync(bump_group_version, interview.group_id)
+    
+    return {
+        "interview_id": interview_id,
+        "status": "completed",
+        "preferences_summary": preferences,
+        "message": "Interview preferences analyzed"
+    }
+
+
+@job_queue.handler("fold_interview_context")
+async def fold_interview_context(db: AsyncSession, payload: dict) -> dict:
+    """
+    会話ウィンドウから外れたメッセージを要約と条件に畳み込む（ジョブハンドラ）
+    """
+    interview_id = payload["interview_id"]
+    interview = await db.get(Interview, interview_id)
+    if not interview:
+        raise ValueError(f"Interview not found: {interview_id}")
+    
+    unsummarized = (await db.scalars(
+        select(Message).where(
+            Message.interview_id == interview_id,
+            Message.sequence_number > interview.summarized_through
+        ).order_by(Message.sequence_number)
+    )).all()
+    folding = messages_to_fold(unsummarized)
+    if not folding:
+        return {"interview_id": interview_id, "summarized_through": interview.summarized_through}
+    
+    result = await openai_client.summarize_conversation(
+        interview.context_summary or "",
+        load_slot_state(interview),
+        [{"role": msg.role.value, "content": msg.content} for msg in folding]
+    )
+    
+    async with async_unit_of_work(db):
+        interview.context_summary = result["summary"]
+        interview.slot_state = json.dumps(result["slot_state"], ensure_ascii=False)
+        interview.summarized_through = folding[-1].sequence_number
+    
+    return {
+        "interview_id": interview_id,
+        "summarized_through": interview.summarized_through,
+        "slot_state": result["slot_state"]
+    }
 
 
 @router.get("/groups/{group_id}/interview-status")
-def get_group_interview_status(
+async def get_group_interview_status(
     group_id: str,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    since_version: Optional[int] = None,
+    timeout: float = 25
 ):
-    """グループのインタビュー完了状況を取得"""
+    """
+    グループのインタビュー完了状況を取得
+    
+    バージョンが変わっていなければ集計せずに304を返す。since_version を指定すると
+    状況が変わるまで応答を保留する（長ポーリング、最大 timeout 秒）。
+    """
+    return await read_group_state(request, response, group_id, load_group_interview_status, since_version, timeout)
+
+
+def load_group_interview_status(db: Session, group_id: str) -> dict:
+    """メンバーごとのインタビュー状況を集計"""
     group = db.query(Group).filter(Group.group_id == group_id).first()
     if not group:
         raise HTTPException(
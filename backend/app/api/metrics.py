@@ -0,0 +1,41 @@
+from fastapi import APIRouter
+
+from app.core.http_client import http_client
+from app.core.search_cache import search_cache
+from app.core.singleflight import get_singleflight_stats
+from app.core.restaurant_catalog import restaurant_catalog
+from app.core.geo_index import restaurant_geo_index
+from app.core.rate_limiter import get_rate_limiter_stats
+from app.core.circuit_breaker import get_circuit_breaker_stats
+from app.core.search_cache import stale_search_cache
+from app.core.jobs import job_queue
+from app.core.group_events import group_events
+from app.core.vote_hub import vote_hub
+from app.core.group_version import group_version_watcher
+from app.clients.openai_client import llm_scheduler
+from app.core.llm_cache import llm_cache
+from app.db.database import get_pool_stats
+
+router = APIRouter()
+
+
+@router.get("/")
+def get_metrics():
+    """外部API連携の稼働状況メトリクスを取得"""
+    return {
+        "http_client": http_client.get_stats(),
+        "search_cache": search_cache.get_stats(),
+        "singleflight": get_singleflight_stats(),
+        "restaurant_catalog": restaurant_catalog.get_stats(),
+        "geo_index": restaurant_geo_index.get_stats(),
+        "rate_limiters": get_rate_limiter_stats(),
+        "circuit_breakers": get_circuit_breaker_stats(),
+        "stale_results": stale_search_cache.get_stats(),
+        "jobs": job_queue.get_stats(),
+        "group_events": group_events.get_stats(),
+        "vote_hub": vote_hub.get_stats(),
+        "long_poll": group_version_watcher.get_stats(),
+        "llm_scheduler": llm_scheduler.get_stats(),
+        "llm_cache": llm_cache.get_stats(),
+        "db_pool": get_pool_stats()
+    }
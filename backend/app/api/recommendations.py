@@ -1,15 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import text
-from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text, func, distinct, select
+from typing import Dict, List, Optional
+import asyncio
 import uuid
 import json
+import logging
 from datetime import datetime
 from pydantic import BaseModel
 
-from app.db.database import get_db
+from app.db.database import get_db, get_async_db, unit_of_work, async_unit_of_work, SessionLocal
 from app.models import Group, User, Recommendation, RestaurantCandidate, Vote
 from app.schemas.recommendation import RecommendationResponse
+from app.clients.hotpepper_client import hotpepper_client
+from app.core.geo_index import restaurant_geo_index, range_to_meters
+from app.core.match_scoring import match_scorer
+from app.core.config import settings
+from app.core.jobs import JobDeferred, job_queue
+from app.core.group_events import group_events
+from app.core.vote_hub import vote_hub
+from app.core.vote_tally import new_tally, apply_vote_changes, load_vote_tallies
+from app.core.preference_state import analysis_dedupe_key
+from app.core.group_version import (
+    IMMUTABLE_CACHE_CONTROL, bump_group_version, group_etag, etag_matches, not_modified, set_etag, read_group_state
+)
 
 class VoteRequest(BaseModel):
     vote_type: str
@@ -21,22 +37,83 @@ class FinalDecisionRequest(BaseModel):
     decided_by_user_id: str
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+def serialize_candidate(candidate: RestaurantCandidate) -> dict:
+    """候補をAPIレスポンス用の辞書に変換"""
+    return {
+        "restaurant_id": candidate.candidate_id,
+        "name": candidate.name,
+        "cuisine_type": candidate.cuisine_type,
+        "price_range": candidate.price_range,
+        "address": candidate.address,
+        "external_rating": candidate.rating,
+        "external_review_count": 100,
+        "image_url": candidate.image_url,
+        "match_score": candidate.match_score,
+        "recommendation_reason": candidate.recommendation_reason,
+        "vote_count": 0
+    }
+
+
+def publish_vote_delta(db: Session, recommendation: Recommendation, user_id: str, changes: List[Dict]):
+    """投票の差分を WebSocket で購読中のクライアントへ配信
+
+    changes は {"candidate_id", "vote_type", "delta"} のリスト。変化した候補の
+    最新の集計も添えるため、同じ差分を二重に受け取っても結果は変わらない。
+    SSE だけを購読するクライアント向けに、同じ集計とグループのバージョンを
+    votes_updated としてグループのイベントストリームにも流す。
+    """
+    if recommendation is None or not changes:
+        return
+
+    tallies = load_vote_tallies(
+        db,
+        recommendation.recommendation_id,
+        recommendation.group_id,
+        candidate_ids=[change["candidate_id"] for change in changes]
+    )
+    summary = {
+        "group_id": recommendation.group_id,
+        "recommendation_id": recommendation.recommendation_id,
+        "candidates": [
+            {
+                "candidate_id": result["candidate_id"],
+                "vote_summary": result["vote_summary"],
+                "total_votes": result["total_votes"]
+            }
+            for result in tallies["vote_results"]
+        ],
+        "total_members": tallies["total_members"],
+        "voted_members": tallies["voted_members"],
+        "is_voting_complete": tallies["voted_members"] >= tallies["total_members"]
+    }
+    
+    vote_hub.publish(recommendation.group_id, {
+        "type": "vote_delta",
+        "user_id": user_id,
+        "changes": changes,
+        **summary
+    })
+    version = db.query(Group.version).filter(Group.group_id == recommendation.group_id).scalar()
+    group_events.publish(recommendation.group_id, "votes_updated", {"version": version, **summary})
 
 
 @router.post("/groups/{group_id}/recommendations")
-def create_group_recommendations(
+async def create_group_recommendations(
     group_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    全員のヒアリングをもとに店舗候補を生成（簡略版）
+    全員のヒアリングをもとに店舗候補の生成ジョブを登録（結果は /jobs/{job_id} で取得）
     """
     from app.models import Interview
     from app.models.interview import InterviewStatus
     from app.models.group import group_members
     
     # グループの存在確認
-    group = db.query(Group).filter(Group.group_id == group_id).first()
+    group = await db.scalar(select(Group).where(Group.group_id == group_id))
     if not group:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -44,19 +121,20 @@ def create_group_recommendations(
         )
     
     # グループのメンバー数を取得
-    member_count_result = db.execute(
-        text("SELECT COUNT(*) FROM group_members WHERE group_id = :group_id"),
-        {"group_id": group_id}
-    ).scalar()
+    member_count_result = await db.scalar(
+        select(func.count()).select_from(group_members).where(group_members.c.group_id == group_id)
+    )
     member_count = member_count_result or 0
     
     # 完了したインタビューの数を取得
-    completed_interviews = db.query(Interview).filter(
-        Interview.group_id == group_id,
-        Interview.status == InterviewStatus.completed
-    ).count()
+    completed_interviews = await db.scalar(
+        select(func.count()).select_from(Interview).where(
+            Interview.group_id == group_id,
+            Interview.status == InterviewStatus.completed
+        )
+    )
     
-    print(f"Group {group_id}: {completed_interviews}/{member_count} interviews completed")
+    logger.debug(f"Group {group_id}: {completed_interviews}/{member_count} interviews completed")
     
     # 全員のヒアリングが完了していない場合はエラー
     if completed_interviews < member_count:
@@ -66,9 +144,9 @@ def create_group_recommendations(
         )
     
     # 既存の推薦があるかチェック（どのステータスでも拒否）
-    existing_recommendation = db.query(Recommendation).filter(
-        Recommendation.group_id == group_id
-    ).first()
+    existing_recommendation = await db.scalar(
+        select(Recommendation.recommendation_id).where(Recommendation.group_id == group_id).limit(1)
+    )
     
     if existing_recommendation:
         raise HTTPException(
@@ -76,116 +154,130 @@ def create_group_recommendations(
             detail="Recommendation already exists for this group"
         )
     
-    # 簡略版の推薦作成
-    db_recommendation = Recommendation(
-        recommendation_id=str(uuid.uuid4()),
-        group_id=group_id,
-        status="completed"
+    # 外部APIの検索・スコアリングはバックグラウンドジョブで実行し、すぐに202を返す
+    job = await db.run_sync(
+        job_queue.enqueue,
+        "generate_recommendations",
+        {"group_id": group_id},
+        dedupe_key=f"generate_recommendations:{group_id}"
+    )
+    
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content={
+            "job_id": job.job_id,
+            "status": job.status.value,
+            "message": "Recommendation generation started"
+        }
     )
+
+
+@job_queue.handler("generate_recommendations")
+async def generate_group_recommendations(db: AsyncSession, payload: dict) -> dict:
+    """
+    店舗候補を検索・スコアリングして推薦を作成（ジョブハンドラ）
+    """
+    from app.models import Interview
+    from app.models.interview import InterviewStatus
+    
+    group_id = payload["group_id"]
+    
+    # 前回の試行で作成済みの場合はそのまま返す（リトライ時の二重作成を防ぐ）
+    existing_recommendation = await db.scalar(
+        select(Recommendation.recommendation_id).where(Recommendation.group_id == group_id).limit(1)
+    )
+    if existing_recommendation:
+        return await db.run_sync(load_group_recommendations, group_id)
     
-    db.add(db_recommendation)
-    db.commit()
-    db.refresh(db_recommendation)
+    # 完了後の好み分析が残っていれば、その結果を反映してから候補を選ぶ
+    interview_ids = (await db.scalars(
+        select(Interview.interview_id).where(Interview.group_id == group_id)
+    )).all()
+    if await job_queue.has_unfinished(db, [analysis_dedupe_key(interview_id) for interview_id in interview_ids]):
+        raise JobDeferred(f"Waiting for preference analysis of group {group_id}")
     
     # ホットペッパーAPIを使用してレストランを検索
+    # デフォルトの検索条件（渋谷エリア）
+    search_params = {
+        'lat': 35.6595,      # 渋谷の緯度
+        'lng': 139.7005,     # 渋谷の経度
+        'range': 3,          # 1000m範囲
+        'keyword': '居酒屋', # デフォルトキーワード
+        'count': settings.MATCH_SCORE_CANDIDATE_POOL  # スコアリング対象の候補数
+    }
+    
+    restaurants_data = []
+    is_stale = False
     try:
-        # デフォルトの検索条件（渋谷エリア）
-        search_params = {
-            'lat': 35.6595,      # 渋谷の緯度
-            'lng': 139.7005,     # 渋谷の経度
-            'range': 3,          # 1000m範囲
-            'keyword': '居酒屋', # デフォルトキーワード
-            'count': 5           # 5件取得
-        }
-        
-        # ホットペッパーAPIで検索（importはファイル上部で行う必要があります）
-        import requests
-        
-        api_key = 'dddcc42e51793523'  # 設定から取得
-        base_url = 'https://webservice.recruit.co.jp/hotpepper/gourmet/v1/'
+        # プロバイダ障害時は同じエリアの直近の実データが stale 付きで返る
+        api_data = await hotpepper_client.search_restaurants(search_params)
+        is_stale = bool(api_data.get('stale'))
         
-        search_params['key'] = api_key
-        search_params['format'] = 'json'
-        
-        response = requests.get(base_url, params=search_params, timeout=10)
-        response.raise_for_status()
-        
-        api_data = response.json()
-        
-        restaurants_data = []
         if 'results' in api_data and 'shop' in api_data['results']:
-            for shop in api_data['results']['shop'][:3]:  # 最大3件
+            for shop in api_data['results']['shop']:
+                restaurant = hotpepper_client.convert_to_restaurant_data(shop)
                 restaurant_data = {
-                    "name": shop.get('name', ''),
-                    "cuisine_type": shop.get('genre', {}).get('name', 'レストラン'),
-                    "price_range": shop.get('budget', {}).get('name', '¥¥'),
-                    "address": shop.get('address', ''),
+                    "name": restaurant['name'],
+                    "cuisine_type": restaurant['cuisine_type'] or 'レストラン',
+                    "price_range": restaurant['price_range'] or '¥¥',
+                    "address": restaurant['address'],
                     "rating": 4.0,  # ホットペッパーAPIには評価がないのでデフォルト
-                    "image_url": shop.get('photo', {}).get('pc', {}).get('l', '') if shop.get('photo') else ''
+                    "image_url": restaurant['image_url'],
+                    "description": restaurant['description'],
+                    "features": restaurant['features'],
+                    "external_id": restaurant['restaurant_id'],
+                    "external_url": restaurant['url']
                 }
                 restaurants_data.append(restaurant_data)
-        
-        # APIから取得できない場合はダミーデータを使用
-        if not restaurants_data:
-            restaurants_data = [
-                {
-                    "name": "イタリアン・トラットリア",
-                    "cuisine_type": "イタリアン",
-                    "price_range": "¥¥",
-                    "address": "東京都渋谷区恵比寿1-1-1",
-                    "rating": 4.2,
-                    "image_url": "https://images.unsplash.com/photo-1555396273-367ea4eb4db5?w=300&h=200&fit=crop"
-                },
-                {
-                    "name": "和食居酒屋 さくら",
-                    "cuisine_type": "和食", 
-                    "price_range": "¥¥",
-                    "address": "東京都渋谷区恵比寿2-2-2",
-                    "rating": 4.5,
-                    "image_url": "https://images.unsplash.com/photo-1579952363873-27d3bfad9c0d?w=300&h=200&fit=crop"
-                },
-                {
-                    "name": "フレンチビストロ",
-                    "cuisine_type": "フレンチ",
-                    "price_range": "¥¥¥",
-                    "address": "東京都渋谷区恵比寿3-3-3",
-                    "rating": 4.3,
-                    "image_url": "https://images.unsplash.com/photo-1414235077428-338989a2e8c0?w=300&h=200&fit=crop"
-                }
-            ]
-            
     except Exception as e:
-        # API呼び出しに失敗した場合はダミーデータを使用
-        restaurants_data = [
-            {
-                "name": "イタリアン・トラットリア",
-                "cuisine_type": "イタリアン",
-                "price_range": "¥¥",
-                "address": "東京都渋谷区恵比寿1-1-1",
-                "rating": 4.2,
-                "image_url": "https://images.unsplash.com/photo-1555396273-367ea4eb4db5?w=300&h=200&fit=crop"
-            },
-            {
-                "name": "和食居酒屋 さくら",
-                "cuisine_type": "和食", 
-                "price_range": "¥¥",
-                "address": "東京都渋谷区恵比寿2-2-2",
-                "rating": 4.5,
-                "image_url": "https://images.unsplash.com/photo-1579952363873-27d3bfad9c0d?w=300&h=200&fit=crop"
-            },
-            {
-                "name": "フレンチビストロ",
-                "cuisine_type": "フレンチ",
-                "price_range": "¥¥¥",
-                "address": "東京都渋谷区恵比寿3-3-3",
-                "rating": 4.3,
-                "image_url": "https://images.unsplash.com/photo-1414235077428-338989a2e8c0?w=300&h=200&fit=crop"
-            }
-        ]
+        logger.error(f"Restaurant search failed for group {group_id}: {e}")
+    
+    # APIから取得できない場合はカタログに蓄積済みの近隣店舗を使用
+    if not restaurants_data:
+        nearby_restaurants = await db.run_sync(
+            restaurant_geo_index.nearby,
+            search_params['lat'],
+            search_params['lng'],
+            range_to_meters(search_params['range']),
+            limit=settings.MATCH_SCORE_CANDIDATE_POOL
+        )
+        for restaurant, _distance in nearby_restaurants:
+            restaurants_data.append({
+                "name": restaurant.name,
+                "cuisine_type": restaurant.genre or 'レストラン',
+                "price_range": restaurant.budget or '¥¥',
+                "address": restaurant.address or '',
+                "rating": restaurant.rating if restaurant.rating is not None else 4.0,
+                "image_url": restaurant.image_url or '',
+                "description": restaurant.description or '',
+                "features": restaurant.features or [],
+                "external_id": restaurant.provider_restaurant_id,
+                "external_url": restaurant.url
+            })
+        is_stale = bool(restaurants_data)
+    
+    if not restaurants_data:
+        # ジョブのリトライに任せる
+        raise RuntimeError("レストラン検索サービスが一時的に利用できません")
+    
+    # メンバー全員の好みと各候補の適合度を計算し、上位3件を候補にする
+    preferences_summaries = (await db.scalars(
+        select(Interview.preferences_summary).where(
+            Interview.group_id == group_id,
+            Interview.status == InterviewStatus.completed
+        )
+    )).all()
+    restaurants_data = match_scorer.rank(preferences_summaries, restaurants_data, limit=3)
+    
+    # 簡略版の推薦作成
+    db_recommendation = Recommendation(
+        recommendation_id=str(uuid.uuid4()),
+        group_id=group_id,
+        status="completed"
+    )
     
-    created_restaurants = []
-    for restaurant_data in restaurants_data:
-        candidate = RestaurantCandidate(
+    candidates = [
+        RestaurantCandidate(
             candidate_id=str(uuid.uuid4()),
             recommendation_id=db_recommendation.recommendation_id,
             name=restaurant_data["name"],
@@ -193,23 +285,29 @@ def create_group_recommendations(
             price_range=restaurant_data["price_range"],
             address=restaurant_data["address"],
             rating=restaurant_data["rating"],
-            image_url=restaurant_data["image_url"]
+            image_url=restaurant_data["image_url"],
+            description=restaurant_data["description"],
+            features=json.dumps(restaurant_data["features"], ensure_ascii=False),
+            external_id=restaurant_data["external_id"],
+            external_url=restaurant_data["external_url"],
+            match_score=restaurant_data["match_score"],
+            recommendation_reason=restaurant_data["recommendation_reason"]
         )
-        db.add(candidate)
-        db.commit()
-        db.refresh(candidate)
-        
-        created_restaurants.append({
-            "restaurant_id": candidate.candidate_id,
-            "name": candidate.name,
-            "cuisine_type": candidate.cuisine_type,
-            "price_range": candidate.price_range,
-            "address": candidate.address,
-            "external_rating": candidate.rating,
-            "external_review_count": 100,
-            "image_url": candidate.image_url,
-            "vote_count": 0
-        })
+        for restaurant_data in restaurants_data
+    ]
+    
+    # 推薦と候補を1トランザクションでまとめて登録（created_at は RETURNING で取得）
+    async with async_unit_of_work(db):
+        db.add(db_recommendation)
+        db.add_all(candidates)
+        db.add_all([new_tally(candidate) for candidate in candidates])
+        await db.run_sync(bump_group_version, group_id)
+    
+    group_events.publish(group_id, "recommendations_ready", {
+        "recommendation_id": db_recommendation.recommendation_id
+    })
+    
+    created_restaurants = [serialize_candidate(candidate) for candidate in candidates]
     
     return {
         "recommendation_id": db_recommendation.recommendation_id,
@@ -218,6 +316,7 @@ def create_group_recommendations(
         "reasoning": "AI分析により、グループの好みに合わせて選出されました",
         "restaurants": created_restaurants,
         "created_at": db_recommendation.created_at.isoformat(),
+        "is_stale": is_stale,
         "message": "Recommendation created with restaurant candidates"
     }
 
@@ -247,12 +346,48 @@ def get_recommendation(
     }
 
 
+@router.get("/recommendations/{recommendation_id}/candidates")
+def get_recommendation_candidates(
+    recommendation_id: str,
+    response: Response,
+    db: Session = Depends(get_db)
+):
+    """推薦の候補一覧を取得（作成後は変わらないため長期間キャッシュさせる）"""
+    candidates = db.query(RestaurantCandidate).filter(
+        RestaurantCandidate.recommendation_id == recommendation_id
+    ).order_by(RestaurantCandidate.match_score.desc()).all()
+    
+    if not candidates:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Recommendation not found"
+        )
+    
+    response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    return {
+        "recommendation_id": recommendation_id,
+        "restaurants": [serialize_candidate(candidate) for candidate in candidates]
+    }
+
+
 @router.get("/groups/{group_id}/recommendations")
 def get_group_recommendations(
     group_id: str,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db)
 ):
     """グループの推薦一覧取得"""
+    etag = group_etag(db, group_id)
+    if etag is not None:
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        set_etag(response, etag)
+    return load_group_recommendations(db, group_id)
+
+
+def load_group_recommendations(db: Session, group_id: str) -> dict:
+    """最新の推薦と候補一覧"""
     # 最新のrecommendationを取得（created_atで降順ソート）
     recommendation = db.query(Recommendation).filter(
         Recommendation.group_id == group_id
@@ -267,21 +402,9 @@ def get_group_recommendations(
     # データベースから候補を取得
     candidates = db.query(RestaurantCandidate).filter(
         RestaurantCandidate.recommendation_id == recommendation.recommendation_id
-    ).all()
-    
-    restaurants = []
-    for candidate in candidates:
-        restaurants.append({
-            "restaurant_id": candidate.candidate_id,
-            "name": candidate.name,
-            "cuisine_type": candidate.cuisine_type,
-            "price_range": candidate.price_range,
-            "address": candidate.address,
-            "external_rating": candidate.rating,
-            "external_review_count": 100,
-            "image_url": candidate.image_url,
-            "vote_count": 0
-        })
+    ).order_by(RestaurantCandidate.match_score.desc()).all()
+    
+    restaurants = [serialize_candidate(candidate) for candidate in candidates]
     
     return {
         "recommendation_id": recommendation.recommendation_id,
@@ -303,7 +426,7 @@ def vote_for_candidate(
     """レストラン候補に投票"""
     from app.models.recommendation import VoteType
     
-    print(f"Vote API called - candidate_id: {candidate_id}, user_id: {vote_request.user_id}, vote_type: {vote_request.vote_type}")
+    logger.debug(f"Vote API called - candidate_id: {candidate_id}, user_id: {vote_request.user_id}, vote_type: {vote_request.vote_type}")
     
     # 候補の存在確認
     candidate = db.query(RestaurantCandidate).filter(
@@ -311,56 +434,69 @@ def vote_for_candidate(
     ).first()
     
     if not candidate:
-        print(f"Candidate not found: {candidate_id}")
+        logger.debug(f"Candidate not found: {candidate_id}")
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Restaurant candidate not found"
         )
     
-    print(f"Candidate found: {candidate.name}")
+    logger.debug(f"Candidate found: {candidate.name}")
+    
+    # 候補から推薦を取得（グループの特定と1人1票の判定に使う）
+    candidate_recommendation = db.query(Recommendation).filter(
+        Recommendation.recommendation_id == candidate.recommendation_id
+    ).first()
+    
+    if not candidate_recommendation:
+        logger.debug(f"Recommendation not found for candidate: {candidate_id}")
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Recommendation not found"
+        )
     
     # ユーザーの存在確認
     user = db.query(User).filter(User.user_id == vote_request.user_id).first()
     if not user:
-        print(f"User not found: {vote_request.user_id}")
+        logger.debug(f"User not found: {vote_request.user_id}")
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    print(f"User found: {user.nickname}")
+    logger.debug(f"User found: {user.nickname}")
     
     # 投票タイプの検証
     try:
         vote_type_enum = VoteType(vote_request.vote_type)
-        print(f"Vote type validated: {vote_type_enum}")
+        logger.debug(f"Vote type validated: {vote_type_enum}")
     except ValueError:
-        print(f"Invalid vote type: {vote_request.vote_type}")
+        logger.debug(f"Invalid vote type: {vote_request.vote_type}")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid vote type. Must be 'like', 'dislike', or 'neutral'"
         )
     
+    # 配信する集計の差分
+    changes = []
+    
     # 同じグループ内でのユーザーの既存投票をチェック（1人1票制限）
-    # 候補から推薦を取得
-    candidate_recommendation = db.query(Recommendation).filter(
-        Recommendation.recommendation_id == candidate.recommendation_id
+    # このグループの推薦内で、このユーザーが他の候補に投票していないかチェック
+    existing_user_vote = db.query(Vote).join(
+        RestaurantCandidate, Vote.candidate_id == RestaurantCandidate.candidate_id
+    ).filter(
+        RestaurantCandidate.recommendation_id == candidate_recommendation.recommendation_id,
+        Vote.user_id == vote_request.user_id
     ).first()
     
-    if candidate_recommendation:
-        # このグループの推薦内で、このユーザーが他の候補に投票していないかチェック
-        existing_user_vote = db.query(Vote).join(
-            RestaurantCandidate, Vote.candidate_id == RestaurantCandidate.candidate_id
-        ).filter(
-            RestaurantCandidate.recommendation_id == candidate_recommendation.recommendation_id,
-            Vote.user_id == vote_request.user_id
-        ).first()
-        
-        if existing_user_vote and existing_user_vote.candidate_id != candidate_id:
-            # 異なる候補に既に投票している場合、既存の投票を削除
-            print(f"User already voted for different candidate: {existing_user_vote.candidate_id}, removing old vote")
-            db.delete(existing_user_vote)
-            db.commit()
+    if existing_user_vote and existing_user_vote.candidate_id != candidate_id:
+        # 異なる候補に既に投票している場合、既存の投票を削除
+        logger.debug(f"User already voted for different candidate: {existing_user_vote.candidate_id}, removing old vote")
+        changes.append({
+            "candidate_id": existing_user_vote.candidate_id,
+            "vote_type": existing_user_vote.vote_type.value,
+            "delta": -1
+        })
+        db.delete(existing_user_vote)
     
     # 同じ候補への既存の投票をチェック
     existing_vote = db.query(Vote).filter(
@@ -370,84 +506,113 @@ def vote_for_candidate(
     
     if existing_vote:
         # 既存の投票を更新
-        print(f"Updating existing vote: {existing_vote.vote_id}")
-        existing_vote.vote_type = vote_type_enum
-        existing_vote.updated_at = datetime.utcnow()
-        db.commit()
-        print(f"Vote updated successfully: {existing_vote.vote_id}")
+        logger.debug(f"Updating existing vote: {existing_vote.vote_id}")
+        if existing_vote.vote_type != vote_type_enum:
+            changes.append({"candidate_id": candidate_id, "vote_type": existing_vote.vote_type.value, "delta": -1})
+            changes.append({"candidate_id": candidate_id, "vote_type": vote_type_enum.value, "delta": 1})
+        with unit_of_work(db):
+            existing_vote.vote_type = vote_type_enum
+            existing_vote.updated_at = datetime.utcnow()
+            apply_vote_changes(db, candidate.recommendation_id, changes)
+            bump_group_version(db, candidate_recommendation.group_id)
+        publish_vote_delta(db, candidate_recommendation, vote_request.user_id, changes)
+        logger.info(f"Vote updated successfully: {existing_vote.vote_id}")
         return {"message": "Vote updated successfully", "vote_id": existing_vote.vote_id}
     else:
         # 新しい投票を作成
-        print("Creating new vote")
+        logger.debug("Creating new vote")
         new_vote = Vote(
             vote_id=str(uuid.uuid4()),
             candidate_id=candidate_id,
             user_id=vote_request.user_id,
             vote_type=vote_type_enum
         )
-        db.add(new_vote)
-        db.commit()
-        db.refresh(new_vote)
-        print(f"New vote created successfully: {new_vote.vote_id}")
+        # 他候補への既存投票の削除と同じトランザクションで登録
+        changes.append({"candidate_id": candidate_id, "vote_type": vote_type_enum.value, "delta": 1})
+        with unit_of_work(db):
+            db.add(new_vote)
+            apply_vote_changes(db, candidate.recommendation_id, changes)
+            bump_group_version(db, candidate_recommendation.group_id)
+        publish_vote_delta(db, candidate_recommendation, vote_request.user_id, changes)
+        logger.info(f"New vote created successfully: {new_vote.vote_id}")
         return {"message": "Vote created successfully", "vote_id": new_vote.vote_id}
 
 
 @router.get("/groups/{group_id}/votes")
-def get_group_votes(
+async def get_group_votes(
     group_id: str,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    since_version: Optional[int] = None,
+    timeout: float = 25
 ):
-    """グループの投票結果を取得"""
+    """
+    グループの投票結果を取得
+    
+    バージョンが変わっていなければ集計を読まずに304を返す。since_version を指定すると
+    投票があるまで応答を保留する（長ポーリング、最大 timeout 秒）。
+    """
+    return await read_group_state(request, response, group_id, load_group_votes, since_version, timeout)
+
+
+def load_group_votes(db: Session, group_id: str) -> dict:
+    """最新の推薦の投票集計"""
     # グループの最新推薦を取得（created_atで降順ソート）
-    recommendation = db.query(Recommendation).filter(
+    recommendation_id = db.query(Recommendation.recommendation_id).filter(
         Recommendation.group_id == group_id
-    ).order_by(Recommendation.created_at.desc()).first()
+    ).order_by(Recommendation.created_at.desc()).limit(1).scalar()
     
-    if not recommendation:
+    if not recommendation_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No recommendations found for this group"
         )
     
-    # グループのメンバー数を取得
-    group = db.query(Group).filter(Group.group_id == group_id).first()
-    total_members = len(group.members) if group else 0
-    
-    # 投票したユーザーを追跡
-    voted_users = set()
-    
-    # 投票結果を集計
-    vote_results = []
-    for candidate in recommendation.candidates:
-        votes = db.query(Vote).filter(Vote.candidate_id == candidate.candidate_id).all()
-        
-        vote_summary = {
-            "like": 0,
-            "dislike": 0,
-            "neutral": 0
-        }
-        
-        for vote in votes:
-            vote_summary[vote.vote_type.value] += 1
-            voted_users.add(vote.user_id)
-        
-        vote_results.append({
-            "candidate_id": candidate.candidate_id,
-            "name": candidate.name,
-            "vote_summary": vote_summary,
-            "total_votes": len(votes)
-        })
+    # 候補ごとの集計テーブルとメンバー数を1回のクエリで取得
+    tallies = load_vote_tallies(db, recommendation_id, group_id)
     
     return {
         "group_id": group_id,
-        "recommendation_id": recommendation.recommendation_id,
-        "vote_results": vote_results,
-        "total_members": total_members,
-        "voted_members": len(voted_users),
-        "is_voting_complete": len(voted_users) >= total_members
+        "recommendation_id": recommendation_id,
+        "vote_results": tallies["vote_results"],
+        "total_members": tallies["total_members"],
+        "voted_members": tallies["voted_members"],
+        "is_voting_complete": tallies["voted_members"] >= tallies["total_members"]
     }
 
 
+def _load_vote_snapshot(group_id: str) -> Optional[dict]:
+    """WebSocket 接続時に送る投票集計（DBセッションは取得の間だけ使う）"""
+    db = SessionLocal()
+    try:
+        return load_group_votes(db, group_id)
+    except HTTPException:
+        return None
+    finally:
+        db.close()
+
+
+@router.websocket("/groups/{group_id}/votes/ws")
+async def votes_websocket(websocket: WebSocket, group_id: str):
+    """投票結果の WebSocket 配信（接続時に全体の集計、その後は投票ごとの差分）"""
+    await vote_hub.connect(group_id, websocket)
+    try:
+        # 購読を始めてから集計を取るので、その間の投票も差分で届く
+        snapshot = await asyncio.to_thread(_load_vote_snapshot, group_id)
+        if snapshot is None:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="No recommendations found for this group")
+            return
+        await websocket.send_json({"type": "snapshot", "votes": snapshot})
+
+        # クライアントからのメッセージは使わない（切断の検知のみ）
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await vote_hub.disconnect(group_id, websocket)
+
+
 @router.get("/groups/{group_id}/user/{user_id}/vote")
 def get_user_vote(
     group_id: str,
@@ -491,22 +656,26 @@ def get_user_vote(
 
 
 @router.get("/groups/{group_id}/interview-status")
-def get_group_interview_status(
+async def get_group_interview_status(
     group_id: str,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    since_version: Optional[int] = None,
+    timeout: float = 25
 ):
-    """グループ全体のインタビュー完了状況を取得"""
+    """
+    グループ全体のインタビュー完了状況を取得
+    
+    バージョンが変わっていなければ集計せずに304を返す。since_version を指定すると
+    状況が変わるまで応答を保留する（長ポーリング、最大 timeout 秒）。
+    """
+    return await read_group_state(request, response, group_id, load_interview_completion, since_version, timeout)
+
+
+def load_interview_completion(db: Session, group_id: str) -> dict:
+    """グループのインタビュー完了数の集計"""
     from app.models import Interview
     from app.models.interview import InterviewStatus
-    from app.models.group import group_members
-    
-    # グループの存在確認
-    group = db.query(Group).filter(Group.group_id == group_id).first()
-    if not group:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Group not found"
-        )
     
     # グループのメンバー数を取得
     total_members_result = db.execute(
@@ -571,14 +740,16 @@ def set_final_decision(
     
     # 推薦テーブルに最終決定を記録（簡単な方法として推薦オブジェクトにフィールドを追加）
     # ここでは単純にメモとして記録
-    recommendation.final_decision = json.dumps({
-        "restaurant_id": decision.restaurant_id,
-        "restaurant_name": decision.restaurant_name,
-        "decided_by": decision.decided_by_user_id,
-        "decided_at": datetime.now().isoformat()
-    })
+    with unit_of_work(db):
+        recommendation.final_decision = json.dumps({
+            "restaurant_id": decision.restaurant_id,
+            "restaurant_name": decision.restaurant_name,
+            "decided_by": decision.decided_by_user_id,
+            "decided_at": datetime.now().isoformat()
+        })
+        bump_group_version(db, group_id)
     
-    db.commit()
+    group_events.publish(group_id, "final_decision", json.loads(recommendation.final_decision))
     
     return {
         "success": True,
@@ -593,9 +764,17 @@ def set_final_decision(
 @router.get("/groups/{group_id}/final-decision")
 def get_final_decision(
     group_id: str,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db)
 ):
     """グループの最終決定を取得"""
+    etag = group_etag(db, group_id)
+    if etag is not None:
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        set_etag(response, etag)
+    
     # 最新の推薦を取得
     recommendation = db.query(Recommendation).filter(
         Recommendation.group_id == group_id
@@ -1,10 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Dict, Any
 import uuid
 import logging
 
-from ..db.database import get_db
+from ..db.database import get_db, get_async_db, unit_of_work
 from ..models.search_preference import UserSearchPreference
 from ..schemas.search_preference import (
     SearchPreferenceCreate, 
@@ -29,21 +31,7 @@ def create_search_preference(
 ):
     """ユーザーの検索条件を作成"""
     
-    # 既存の条件があれば削除
-    existing = db.query(UserSearchPreference).filter(
-        UserSearchPreference.group_id == group_id,
-        UserSearchPreference.user_id == user_id
-    ).first()
-    
-    if existing:
-        db.delete(existing)
-        db.commit()
-    
-    # 新しい検索条件を作成
-    db_preference = UserSearchPreference(
-        preference_id=str(uuid.uuid4()),
-        group_id=group_id,
-        user_id=user_id,
+    values = dict(
         location_keyword=preference.location_keyword,
         lat=preference.lat,
         lng=preference.lng,
@@ -59,9 +47,26 @@ def create_search_preference(
         other_conditions=preference.other_conditions
     )
     
-    db.add(db_preference)
-    db.commit()
-    db.refresh(db_preference)
+    existing = db.query(UserSearchPreference).filter(
+        UserSearchPreference.group_id == group_id,
+        UserSearchPreference.user_id == user_id
+    ).first()
+    
+    with unit_of_work(db):
+        if existing:
+            # 既存の条件があれば置き換える（削除→作成ではなく1回のUPDATE）
+            for field, value in values.items():
+                setattr(existing, field, value)
+            db_preference = existing
+        else:
+            # 新しい検索条件を作成
+            db_preference = UserSearchPreference(
+                preference_id=str(uuid.uuid4()),
+                group_id=group_id,
+                user_id=user_id,
+                **values
+            )
+            db.add(db_preference)
     
     return db_preference
 
@@ -103,16 +108,16 @@ def get_group_search_preferences(
 
 @router.post("/groups/{group_id}/search-restaurants",
              response_model=RestaurantSearchResult)
-def search_restaurants_for_group(
+async def search_restaurants_for_group(
     group_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """グループの条件を統合してレストラン検索"""
     
     # グループの全ユーザーの検索条件を取得
-    preferences = db.query(UserSearchPreference).filter(
-        UserSearchPreference.group_id == group_id
-    ).all()
+    preferences = (await db.scalars(
+        select(UserSearchPreference).where(UserSearchPreference.group_id == group_id)
+    )).all()
     
     if not preferences:
         raise HTTPException(
@@ -120,6 +125,9 @@ def search_restaurants_for_group(
             detail="検索条件が見つかりません"
         )
     
+    # 外部APIの応答待ちの間に接続を保持しないよう、先にセッションを閉じる
+    await db.close()
+    
     try:
         # ユーザー条件をマージして検索クエリを作成
         user_preferences_data = []
@@ -144,7 +152,7 @@ def search_restaurants_for_group(
         merged_params = hotpepper_client.merge_user_preferences(user_preferences_data)
         
         # ホットペッパーAPIで検索
-        search_results = hotpepper_client.search_restaurants(merged_params)
+        search_results = await hotpepper_client.search_restaurants(merged_params)
         
         # 結果を変換
         restaurants = []
@@ -191,10 +199,8 @@ def update_search_preference(
         )
     
     # 更新フィールドを適用
-    for field, value in preference_update.dict(exclude_unset=True).items():
-        setattr(existing, field, value)
-    
-    db.commit()
-    db.refresh(existing)
+    with unit_of_work(db):
+        for field, value in preference_update.dict(exclude_unset=True).items():
+            setattr(existing, field, value)
     
     return existing
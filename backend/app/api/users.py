@@ -2,8 +2,9 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
 
-from app.db.database import get_db
+from app.db.database import get_db, unit_of_work
 from app.models.user import User
+from app.core.group_version import bump_user_groups_version
 from app.schemas.user import UserCreate, UserUpdate, UserResponse, AnonymousUserCreate
 
 router = APIRouter()
@@ -13,9 +14,8 @@ router = APIRouter()
 def create_anonymous_user(user: AnonymousUserCreate, db: Session = Depends(get_db)):
     """匿名ユーザーを作成（ニックネーム入力）"""
     db_user = User(nickname=user.nickname)
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    with unit_of_work(db):
+        db.add(db_user)
     return db_user
 
 
@@ -23,9 +23,8 @@ def create_anonymous_user(user: AnonymousUserCreate, db: Session = Depends(get_d
 def create_user(user: UserCreate, db: Session = Depends(get_db)):
     """新しいユーザーを作成"""
     db_user = User(**user.dict())
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    with unit_of_work(db):
+        db.add(db_user)
     return db_user
 
 
@@ -45,11 +44,11 @@ def update_user(user_id: str, user_update: UserUpdate, db: Session = Depends(get
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
     
-    for field, value in user_update.dict(exclude_unset=True).items():
-        setattr(user, field, value)
-    
-    db.commit()
-    db.refresh(user)
+    with unit_of_work(db):
+        for field, value in user_update.dict(exclude_unset=True).items():
+            setattr(user, field, value)
+        # メンバー一覧にニックネームを含むため、所属グループのETagを無効にする
+        bump_user_groups_version(db, user_id)
     return user
 
 
@@ -60,7 +59,8 @@ def delete_user(user_id: str, db: Session = Depends(get_db)):
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
     
-    db.delete(user)
-    db.commit()
+    with unit_of_work(db):
+        bump_user_groups_version(db, user_id)
+        db.delete(user)
     return {"message": "User deleted successfully"}
 
@@ -1,7 +1,14 @@
-import requests
+import asyncio
+import httpx
 import logging
 from typing import Dict, List, Optional, Any
 from ..core.config import settings
+from ..core.http_client import http_client
+from ..core.search_cache import search_cache, stale_search_cache, make_cache_key
+from ..core.singleflight import get_singleflight
+from ..core.rate_limiter import get_rate_limiter, RateLimitExceeded
+from ..core.circuit_breaker import get_circuit_breaker, CircuitOpenError
+from ..core.restaurant_catalog import restaurant_catalog, catalog_record_from_hotpepper
 
 logger = logging.getLogger(__name__)
 
@@ -11,42 +18,145 @@ class HotPepperClient:
     def __init__(self):
         self.base_url = "https://webservice.recruit.co.jp/hotpepper/gourmet/v1/"
         self.api_key = settings.HOTPEPPER_API_KEY
+        self.http = http_client
+        self.cache = search_cache
+        self.flights = get_singleflight("hotpepper")
+        self.rate_limiter = get_rate_limiter("hotpepper")
+        self.breaker = get_circuit_breaker("hotpepper")
+        self.stale_cache = stale_search_cache
+        self._revalidating: Dict[str, asyncio.Task] = {}
+        
+    async def search_restaurants(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """レストラン検索（共有コネクションプール経由・結果はキャッシュ）
+
+        プロバイダ障害時は同一クエリ・同一エリアの直近の結果を
+        'stale': True を付けて返す。
+        """
+        # APIキーと基本パラメータを設定
+        search_params = {
+            'key': self.api_key,
+            'format': 'json',
+            'count': 20,  # 最大20件取得
+            'order': 4,   # おすすめ順
+            **params
+        }
+        
+        # 空の値を除去
+        search_params = {k: v for k, v in search_params.items() if v is not None and v != ''}
+        
+        cache_key = make_cache_key("hotpepper", search_params)
+        cached = await self.cache.aget(cache_key)
+        if cached is not None:
+            logger.info(f"HotPepper search cache hit: {cache_key}")
+            return cached
+        
+        stale_keys = self._stale_keys(search_params, cache_key)
+        
+        # プロバイダ障害中はタイムアウトを待たずに直近の結果を返す
+        if not self.breaker.allow_request():
+            stale = await self._get_stale(stale_keys)
+            if stale is None:
+                raise CircuitOpenError("レストラン検索サービスが一時的に利用できません")
+            self._schedule_revalidation(search_params, cache_key, stale_keys)
+            return stale
         
-    def search_restaurants(self, params: Dict[str, Any]) -> Dict[str, Any]:
-        """レストラン検索"""
         try:
-            # APIキーと基本パラメータを設定
-            search_params = {
-                'key': self.api_key,
-                'format': 'json',
-                'count': 20,  # 最大20件取得
-                'order': 4,   # おすすめ順
-                **params
-            }
-            
-            # 空の値を除去
-            search_params = {k: v for k, v in search_params.items() if v is not None and v != ''}
-            
+            # 同一クエリの同時リクエストは1回のAPI呼び出しにまとめる
+            return await self.flights.do(
+                cache_key,
+                lambda: self._fetch_restaurants(search_params, cache_key, stale_keys)
+            )
+        except Exception:
+            stale = await self._get_stale(stale_keys)
+            if stale is None:
+                raise
+            logger.warning("HotPepper API failed, serving stale results")
+            return stale
+    
+    async def _fetch_restaurants(
+        self,
+        search_params: Dict[str, Any],
+        cache_key: str,
+        stale_keys: List[str]
+    ) -> Dict[str, Any]:
+        """ホットペッパーAPIを呼び出して検索結果を取得"""
+        try:
             logger.info(f"HotPepper API search with params: {search_params}")
             
-            response = requests.get(self.base_url, params=search_params, timeout=10)
-            response.raise_for_status()
+            async with self.rate_limiter.acquire():
+                response = await self.http.get(self.base_url, params=search_params)
+                response.raise_for_status()
             
             data = response.json()
+            self.breaker.record_success()
             
             if 'results' in data and 'shop' in data['results']:
+                await self.cache.aset(cache_key, data)
+                if data['results']['shop']:
+                    for key in stale_keys:
+                        await self.stale_cache.aset(key, data)
+                # 取得した店舗をカタログに取り込む
+                restaurant_catalog.schedule([
+                    catalog_record_from_hotpepper(self.convert_to_restaurant_data(shop))
+                    for shop in data['results']['shop']
+                ])
                 return data
             else:
                 logger.warning(f"No results found in HotPepper API response: {data}")
                 return {'results': {'shop': []}}
                 
-        except requests.exceptions.RequestException as e:
+        except RateLimitExceeded as e:
+            self.breaker.release()
+            logger.warning(f"HotPepper API request rejected by rate limiter: {e}")
+            raise Exception(f"レストラン検索が混み合っています: {str(e)}")
+        except httpx.HTTPError as e:
+            self.breaker.record_failure()
             logger.error(f"HotPepper API request failed: {e}")
             raise Exception(f"レストラン検索でエラーが発生しました: {str(e)}")
         except Exception as e:
+            self.breaker.record_failure()
             logger.error(f"HotPepper API error: {e}")
             raise Exception(f"APIエラー: {str(e)}")
     
+    def _stale_keys(self, search_params: Dict[str, Any], cache_key: str) -> List[str]:
+        """障害時に参照する直近結果のキー（同一クエリ → 同一エリアの順）"""
+        keys = [cache_key]
+        if search_params.get('lat') is not None and search_params.get('lng') is not None:
+            keys.append(make_cache_key("hotpepper-region", {
+                'lat': search_params['lat'],
+                'lng': search_params['lng']
+            }))
+        return keys
+    
+    async def _get_stale(self, stale_keys: List[str]) -> Optional[Dict[str, Any]]:
+        """直近の実データを stale フラグ付きで取得"""
+        for key in stale_keys:
+            data = await self.stale_cache.aget(key)
+            if data is not None:
+                return {**data, 'stale': True}
+        return None
+    
+    def _schedule_revalidation(self, search_params: Dict[str, Any], cache_key: str, stale_keys: List[str]):
+        """プロバイダ復旧後にバックグラウンドで結果を更新する"""
+        if cache_key in self._revalidating:
+            return
+        task = asyncio.ensure_future(self._revalidate(search_params, cache_key, stale_keys))
+        self._revalidating[cache_key] = task
+        task.add_done_callback(lambda _: self._revalidating.pop(cache_key, None))
+    
+    async def _revalidate(self, search_params: Dict[str, Any], cache_key: str, stale_keys: List[str]):
+        await asyncio.sleep(self.breaker.seconds_until_retry())
+        if not self.breaker.allow_request():
+            return
+        try:
+            await self.flights.do(
+                cache_key,
+                lambda: self._fetch_restaurants(search_params, cache_key, stale_keys)
+            )
+            logger.info(f"HotPepper stale results revalidated: {cache_key}")
+        except Exception as e:
+            logger.info(f"HotPepper revalidation failed: {e}")
+    
     def merge_user_preferences(self, user_preferences: List[Dict[str, Any]]) -> Dict[str, Any]:
         """複数ユーザーの希望条件をマージして検索クエリを生成"""
         if not user_preferences:
@@ -84,7 +194,7 @@ class HotPepperClient:
         
         if keywords:
             # 重複を除去してスペース区切りで結合
-            unique_keywords = list(set(keywords))
+            unique_keywords = sorted(set(keywords))
             merged_params['keyword'] = ' '.join(unique_keywords)
         
         # ジャンルのマージ（複数指定可能）
@@ -98,7 +208,7 @@ class HotPepperClient:
         
         if genres:
             # 重複を除去
-            unique_genres = list(set(genres))
+            unique_genres = sorted(set(genres))
             merged_params['genre'] = ','.join(unique_genres)
         
         # 予算のマージ（最も包括的な範囲）
@@ -111,7 +221,7 @@ class HotPepperClient:
                     budgets.append(prefs['budget'])
         
         if budgets:
-            unique_budgets = list(set(budgets))
+            unique_budgets = sorted(set(budgets))
             merged_params['budget'] = ','.join(unique_budgets[:2])  # 最大2個まで
         
         # 人数のマージ（最大人数を採用）
@@ -152,8 +262,10 @@ class HotPepperClient:
             'restaurant_id': shop_data.get('id', ''),
             'name': shop_data.get('name', ''),
             'cuisine_type': shop_data.get('genre', {}).get('name', ''),
+            'genre_code': shop_data.get('genre', {}).get('code', ''),
             'address': shop_data.get('address', ''),
             'price_range': shop_data.get('budget', {}).get('name', ''),
+            'budget_code': shop_data.get('budget', {}).get('code', ''),
             'external_rating': 4.0,  # ホットペッパーAPIには評価がないのでデフォルト値
             'external_review_count': 100,  # デフォルト値
             'image_url': self._get_image_url(shop_data),
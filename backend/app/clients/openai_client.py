@@ -1,12 +1,238 @@
 from ..core.config import settings
-from typing import List, Dict, Optional
+from ..core.rate_limiter import get_rate_limiter
+from ..core.conversation_context import merge_slot_state, parse_context_message, truncate_summary
+from ..core.llm_cache import llm_cache, make_llm_cache_key
+from ..core.preference_state import empty_preference_state, snapshot_preferences, update_preference_state
+from ..core.keyword_matcher import KeywordMatcher, first_hit
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, List, Dict, Optional, TypeVar
+from collections import deque
+from contextlib import asynccontextmanager
 from dataclasses import dataclass
+import asyncio
 import json
 import logging
-import asyncio
+import time
+
+import httpx
+
+try:
+    import openai
+except ImportError:  # openai がない環境ではモック応答のみ
+    openai = None
 
 logger = logging.getLogger(__name__)
 
+CHAT_MODEL = "gpt-3.5-turbo"
+# 好み分析プロンプトのバージョン（プロンプトを変えたら上げて、キャッシュ済みの結果を使わないようにする）
+PREFERENCE_PROMPT_VERSION = "v2"
+# モック応答をストリーミングする際の1断片の文字数
+MOCK_STREAM_CHUNK_SIZE = 8
+
+# LLM呼び出しの優先度クラス（先にあるほど優先）
+PRIORITY_INTERACTIVE = "interactive"  # ユーザーが応答を待っているチャット
+PRIORITY_BACKGROUND = "background"  # インタビュー完了後の好み分析など
+PRIORITY_CLASSES = (PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND)
+
+T = TypeVar("T")
+
+# モック応答で扱うエリア名（応答文で言及する順）
+MOCK_AREAS = [
+    "渋谷", "新宿", "銀座", "恵比寿", "表参道", "六本木", "大阪", "東京", "名古屋", "京都", "神戸", "福岡",
+    "梅田", "心斎橋", "難波", "天王寺"
+]
+MOCK_CUISINE_WORDS = ["和食", "寿司", "天ぷら", "懐石", "居酒屋", "イタリアン", "パスタ", "ピザ", "フレンチ", "中華",
+                      "中国料理", "韓国", "タイ"]
+
+# モック要約で条件として残す発言の最大文字数
+MOCK_SLOT_MAX_CHARS = 30
+
+# モック応答の判定に使うキーワード（import時に1つの照合器にまとめる）
+RESPONSE_MATCHER = KeywordMatcher({
+    # amount: 金額に触れた発言、meal: 食事の種類だけ（既に予算の話が出たとみなすが、今回の追加とはしない）
+    "budget": {
+        "amount": ["予算", "円", "お金", "1000", "2000", "3000", "5000", "安い", "高い", "リーズナブル"],
+        "meal": ["ランチ", "ディナー"],
+    },
+    "budget_tier": {
+        "リーズナブル": ["1000", "千円", "安い", "リーズナブル"],
+        "高級": ["5000", "高級", "記念日", "デート"],
+    },
+    "cuisine": {"cuisine": MOCK_CUISINE_WORDS},
+    "cuisine_kind": {
+        "和食": ["和食", "寿司", "天ぷら", "懐石", "居酒屋"],
+        "イタリアン": ["イタリアン", "パスタ", "ピザ"],
+        "フレンチ": ["フレンチ", "フランス料理"],
+        "中華": ["中華", "中国料理", "北京ダック", "麻婆豆腐"],
+        "寿司": ["寿司"],
+    },
+    # name: 地名、hint: 「駅」「エリア」など場所の話題
+    "location": {
+        "name": [area for area in MOCK_AREAS if area not in ("恵比寿", "表参道", "六本木")],
+        "hint": ["駅", "エリア"],
+    },
+    "area": {area: [area] for area in MOCK_AREAS},
+    "special_request": {"special_request": ["個室", "禁煙", "子供", "ベジタリアン", "特になし", "なし"]},
+})
+
+
+class ClientDisconnected(Exception):
+    """応答を待っていたクライアントが切断した"""
+    pass
+
+
+class _PriorityStats:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_flight = 0
+        self.started = 0
+        self.cancelled = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def record_wait(self, wait: float):
+        self.started += 1
+        self._total_wait += wait
+        self._max_wait = max(self._max_wait, wait)
+
+    def get_stats(self, queued: int) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queued": queued,
+            "started": self.started,
+            "cancelled": self.cancelled,
+            "avg_queue_ms": self._total_wait / self.started * 1000 if self.started > 0 else 0,
+            "max_queue_ms": self._max_wait * 1000
+        }
+
+
+class LLMScheduler:
+    """優先度クラス付きのLLM呼び出しスケジューラ
+
+    全体の同時実行数と優先度クラスごとの同時実行数に上限を設け、枠が空くと
+    優先度の高いクラスの待ち行列から順に実行させる。チャットの待ちがある限り
+    好み分析は始まらず、好み分析はクラスの上限を超えて枠を占有しない。
+    待っている間にキャンセルされた呼び出しは待ち行列から外す。
+    """
+
+    def __init__(self, max_concurrency: int, class_limits: Dict[str, int], disconnect_check_seconds: float = 0.5):
+        self.max_concurrency = max_concurrency
+        self.disconnect_check_seconds = disconnect_check_seconds
+        self.in_flight = 0
+        self._queues: Dict[str, Deque[asyncio.Future]] = {priority: deque() for priority in PRIORITY_CLASSES}
+        self._stats = {
+            priority: _PriorityStats(min(class_limits.get(priority, max_concurrency), max_concurrency))
+            for priority in PRIORITY_CLASSES
+        }
+
+    def _can_start(self, priority: str) -> bool:
+        return self.in_flight < self.max_concurrency and \
+            self._stats[priority].in_flight < self._stats[priority].limit
+
+    def _start(self, priority: str):
+        self.in_flight += 1
+        self._stats[priority].in_flight += 1
+
+    def _dispatch(self):
+        """空いた枠を優先度順に待ち行列の先頭へ渡す"""
+        for priority in PRIORITY_CLASSES:
+            queue = self._queues[priority]
+            while queue and self._can_start(priority):
+                waiter = queue.popleft()
+                if not waiter.done():
+                    self._start(priority)
+                    waiter.set_result(None)
+            if queue:
+                # 上位クラスの待ちが残っている間は下位クラスを始めない
+                return
+
+    @asynccontextmanager
+    async def slot(self, priority: str) -> AsyncIterator[None]:
+        """実行枠を確保する（枠が空くまで優先度順に待つ）"""
+        if priority not in self._stats:
+            raise ValueError(f"Unknown LLM priority class: {priority}")
+        stats = self._stats[priority]
+        queued_at = time.monotonic()
+        higher_waiting = any(self._queues[p] for p in PRIORITY_CLASSES[:PRIORITY_CLASSES.index(priority) + 1])
+        if not higher_waiting and self._can_start(priority):
+            self._start(priority)
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._queues[priority].append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                stats.cancelled += 1
+                if waiter.done() and not waiter.cancelled():
+                    # 枠を渡された直後にキャンセルされた場合は返却する
+                    self._release(priority)
+                elif waiter in self._queues[priority]:
+                    self._queues[priority].remove(waiter)
+                raise
+        stats.record_wait(time.monotonic() - queued_at)
+
+        try:
+            yield
+        except asyncio.CancelledError:
+            stats.cancelled += 1
+            raise
+        finally:
+            self._release(priority)
+
+    def _release(self, priority: str):
+        self.in_flight -= 1
+        self._stats[priority].in_flight -= 1
+        self._dispatch()
+
+    async def run(
+        self,
+        priority: str,
+        call: Callable[[], Awaitable[T]],
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None
+    ) -> T:
+        """枠を確保して call を実行する
+
+        is_disconnected を渡すと待機中・実行中にクライアントの切断を確認し、
+        切断されていれば呼び出しをキャンセルして ClientDisconnected を送出する。
+        """
+        async def _call():
+            async with self.slot(priority):
+                return await call()
+
+        if is_disconnected is None:
+            return await _call()
+
+        task = asyncio.ensure_future(_call())
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=self.disconnect_check_seconds)
+                if done:
+                    return task.result()
+                if await is_disconnected():
+                    raise ClientDisconnected()
+        finally:
+            if not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "classes": {
+                priority: stats.get_stats(len(self._queues[priority]))
+                for priority, stats in self._stats.items()
+            }
+        }
+
+
+# グローバルインスタンス
+llm_scheduler = LLMScheduler(
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    class_limits=settings.LLM_PRIORITY_CONCURRENCY,
+    disconnect_check_seconds=settings.LLM_DISCONNECT_CHECK_SECONDS
+)
+
 
 @dataclass
 class ChatResponse:
@@ -17,33 +243,94 @@ class ChatResponse:
     model: Optional[str] = None
 
 
+class ChatStream:
+    """トークン単位で届くチャット応答
+
+    async for で本文の断片を順に受け取り、読み終えると response に全文の ChatResponse が入る。
+    OpenAIが最初の断片を返す前に失敗した場合は、モック応答を同じように流す。
+    """
+
+    def __init__(self, client: "OpenAIClient", messages: List[Dict[str, str]]):
+        self._client = client
+        self._messages = messages
+        self.response: Optional[ChatResponse] = None
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        pieces: List[str] = []
+        if self._client.enabled:
+            try:
+                async for piece in self._client._stream_openai(self._messages):
+                    pieces.append(piece)
+                    yield piece
+            except Exception as e:
+                # 途中まで届いていればその内容を応答とする
+                logger.error(f"OpenAI streaming error after {len(pieces)} chunks: {e}")
+
+        if pieces:
+            self.response = ChatResponse(content="".join(pieces), is_mock=False, source="openai", model=CHAT_MODEL)
+            return
+
+        mock_content = self._client._get_mock_response(self._messages)
+        for start in range(0, len(mock_content), MOCK_STREAM_CHUNK_SIZE):
+            yield mock_content[start:start + MOCK_STREAM_CHUNK_SIZE]
+        self.response = ChatResponse(content=mock_content, is_mock=True, source="mock", model=None)
+
+
 class OpenAIClient:
     def __init__(self):
         self.api_key = settings.OPENAI_API_KEY
-        self.client = None
-        # OpenAI APIキーが設定されている場合のみクライアントを初期化
+        self.enabled = False
+        self.rate_limiter = get_rate_limiter("openai")
+        self.scheduler = llm_scheduler
+        self._client: Optional[Any] = None
+        # OpenAI APIキーが設定されている場合のみ有効にする（クライアントは初回呼び出し時に作成）
         if self.api_key and self.api_key.startswith('sk-'):
-            try:
-                import openai
-                # v1.0+では直接クライアントを作成（初期化時にはテスト呼び出ししない）
-                self.client = True  # クライアントが利用可能であることを示すフラグ
-                logger.info("OpenAI client initialized successfully")
-            except ImportError:
+            if openai is None:
                 logger.warning("OpenAI library not installed. Using mock responses.")
-            except Exception as e:
-                logger.error(f"Failed to initialize OpenAI client: {e}")
+            else:
+                self.enabled = True
+                logger.info("OpenAI client enabled")
     
-    async def chat_completion(self, messages: List[Dict[str, str]]) -> ChatResponse:
+    def _get_client(self):
+        """共有の AsyncOpenAI クライアント（コネクションプールを全リクエストで使い回す）"""
+        if self._client is None or self._client.is_closed():
+            self._client = openai.AsyncOpenAI(
+                api_key=self.api_key,
+                max_retries=settings.OPENAI_MAX_RETRIES,
+                timeout=httpx.Timeout(settings.OPENAI_TIMEOUT, connect=settings.OPENAI_CONNECT_TIMEOUT),
+                http_client=httpx.AsyncClient(
+                    limits=httpx.Limits(
+                        max_connections=settings.OPENAI_MAX_CONNECTIONS,
+                        max_keepalive_connections=settings.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+                        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY
+                    ),
+                    timeout=httpx.Timeout(settings.OPENAI_TIMEOUT, connect=settings.OPENAI_CONNECT_TIMEOUT)
+                )
+            )
+        return self._client
+    
+    async def aclose(self):
+        """コネクションプールを閉じる（アプリ終了時に呼び出す）"""
+        if self._client is not None and not self._client.is_closed():
+            await self._client.close()
+        self._client = None
+    
+    async def chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None
+    ) -> ChatResponse:
         """
-        OpenAI APIを使用してチャット補完を行う
+        OpenAI APIを使用してチャット補完を行う（対話用の優先度で実行）
         
         Args:
             messages: チャット履歴のリスト
+            is_disconnected: クライアントの切断を確認する関数（切断時は ClientDisconnected）
             
         Returns:
             ChatResponse: 応答内容とメタデータ
         """
-        if not self.client:
+        if not self.enabled:
             # APIキーが設定されていない場合はモックレスポンスを返す
             mock_content = self._get_mock_response(messages)
             return ChatResponse(
@@ -54,43 +341,22 @@ class OpenAIClient:
             )
         
         try:
-            # 新しいOpenAI API v1.0+ 呼び出し方式
-            import openai
-            
-            # 同期的にAPIを呼び出してからawaitで待機
-            import asyncio
-            
-            def sync_api_call():
-                try:
-                    # より簡単な初期化方式を試す
-                    import openai
-                    client = openai.OpenAI(api_key=self.api_key)
-                    response = client.chat.completions.create(
-                        model="gpt-3.5-turbo",
-                        messages=messages,
-                        max_tokens=500,
-                        temperature=0.7
-                    )
-                    return response.choices[0].message.content
-                except Exception as e:
-                    logger.error(f"OpenAI API sync call error: {e}")
-                    # より詳細なエラー情報をログに記録
-                    import traceback
-                    logger.error(traceback.format_exc())
-                    raise e
-            
-            # 非同期実行
-            response_content = await asyncio.get_event_loop().run_in_executor(
-                None, sync_api_call
+            # イベントループ上で直接呼び出す（優先度・レート制限・同時実行数制御付き）
+            response = await self.scheduler.run(
+                PRIORITY_INTERACTIVE,
+                lambda: self._create_completion(messages, max_tokens=500, temperature=0.7),
+                is_disconnected
             )
             
             return ChatResponse(
-                content=response_content,
+                content=response.choices[0].message.content,
                 is_mock=False,
                 source="openai",
-                model="gpt-3.5-turbo"
+                model=CHAT_MODEL
             )
             
+        except ClientDisconnected:
+            raise
         except Exception as e:
             logger.error(f"OpenAI API error: {e}")
             # エラーが発生した場合はモックレスポンスを返す
@@ -102,13 +368,50 @@ class OpenAIClient:
                 model=None
             )
     
+    def stream_chat_completion(self, messages: List[Dict[str, str]]) -> ChatStream:
+        """
+        チャット補完をトークン単位のストリームで受け取る
+        
+        Args:
+            messages: チャット履歴のリスト
+            
+        Returns:
+            ChatStream: async for で本文の断片を返し、完了後に response が入る
+        """
+        return ChatStream(self, messages)
+    
+    async def _create_completion(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float):
+        async with self.rate_limiter.acquire():
+            return await self._get_client().chat.completions.create(
+                model=CHAT_MODEL,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature
+            )
+    
+    async def _stream_openai(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        # ストリームを読み終えるまで同時実行枠を保持する（切断時はジェネレータごとキャンセルされる）
+        async with self.scheduler.slot(PRIORITY_INTERACTIVE), self.rate_limiter.acquire():
+            stream = await self._get_client().chat.completions.create(
+                model=CHAT_MODEL,
+                messages=messages,
+                max_tokens=500,
+                temperature=0.7,
+                stream=True
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+    
     def _get_mock_response(self, messages: List[Dict[str, str]]) -> str:
         """モックレスポンス（開発・テスト用）"""
         last_message = messages[-1]["content"] if messages else ""
         message_count = len([m for m in messages if m["role"] == "user"])
+        # 古いターンが要約に畳み込まれている場合は、そこで分かった条件も既知として扱う
+        folded = parse_context_message(messages)
         
         # 最初のメッセージかチェック
-        if message_count <= 1:
+        if message_count <= 1 and folded is None:
             return """こんにちは！レストラン選びのお手伝いをさせていただきます。
 
 まず、以下について教えてください：
@@ -124,35 +427,36 @@ class OpenAIClient:
 
 何から聞かせていただきましょうか？"""
         
-        # 全てのユーザーメッセージを結合して文脈を把握
+        # ユーザーメッセージごとのキーワード照合結果を合算して文脈を把握（照合結果は発言ごとにキャッシュ）
         user_messages = [m["content"] for m in messages if m["role"] == "user"]
-        all_user_content = " ".join(user_messages).lower()
-        current_message = last_message.lower()
+        history = RESPONSE_MATCHER.scan_all(user_messages)
+        current = RESPONSE_MATCHER.scan(last_message)
         
         # 既に得られている情報をチェック
-        has_budget = any(word in all_user_content for word in ["予算", "円", "お金", "1000", "2000", "3000", "5000", "安い", "高い", "リーズナブル", "ランチ", "ディナー"])
-        has_cuisine = any(word in all_user_content for word in ["和食", "寿司", "天ぷら", "懐石", "居酒屋", "イタリアン", "パスタ", "ピザ", "フレンチ", "中華", "中国料理", "韓国", "タイ"])
-        has_location = any(word in all_user_content for word in ["駅", "渋谷", "新宿", "銀座", "エリア", "大阪", "東京", "名古屋", "京都", "神戸", "福岡", "梅田", "心斎橋", "難波", "天王寺"])
+        folded = folded or {}
+        has_budget = bool(history["budget"] or folded.get("budget"))
+        has_cuisine = bool(history["cuisine"] or folded.get("cuisine_types"))
+        has_location = bool(history["location"] or folded.get("location"))
         
         # 情報が揃っているかチェック
         if has_budget and has_cuisine and has_location:
             # 特別要望が既に含まれているかチェック
-            has_special_request = any(word in all_user_content for word in ["個室", "禁煙", "子供", "ベジタリアン", "特になし", "なし"])
+            has_special_request = bool(history["special_request"] or folded.get("special_requests"))
             if has_special_request:
                 return "ありがとうございます！すべての情報が揃いました。\n\n条件：\n• 予算：2000円程度\n• 料理：寿司・海鮮\n• エリア：大阪\n• その他：個室希望\n\nこれらの条件でお店を探しています。ヒアリングを完了いたします。"
             else:
                 return "素晴らしい！ご希望の条件が揃いましたね。\n\n最後に、特別なご要望はありますか？\n• 個室希望\n• 禁煙席\n• 子供連れ歓迎\n• ベジタリアン対応\n\n特になければ「特になし」とお答えください。これでレストランをお探しします！"
         
         # 現在のメッセージで新しい情報が追加されたかチェック
-        message_adds_budget = any(word in current_message for word in ["予算", "円", "お金", "1000", "2000", "3000", "5000", "安い", "高い", "リーズナブル"])
-        message_adds_cuisine = any(word in current_message for word in ["和食", "寿司", "天ぷら", "懐石", "居酒屋", "イタリアン", "パスタ", "ピザ", "フレンチ", "中華", "中国料理", "韓国", "タイ"])
-        message_adds_location = any(word in current_message for word in ["渋谷", "新宿", "銀座", "大阪", "東京", "名古屋", "京都", "神戸", "福岡", "梅田", "心斎橋", "難波", "天王寺"])
+        message_adds_budget = "amount" in current["budget"]
+        message_adds_cuisine = bool(current["cuisine"])
+        message_adds_location = "name" in current["location"]
         
         # 予算が追加された場合
         if message_adds_budget and not has_budget:
-            if any(word in current_message for word in ["1000", "千円", "安い", "リーズナブル"]):
+            if "リーズナブル" in current["budget_tier"]:
                 response = "1000-2000円のリーズナブルな価格帯ですね！学生さんや気軽なランチにぴったりです。"
-            elif any(word in current_message for word in ["5000", "高級", "記念日", "デート"]):
+            elif "高級" in current["budget_tier"]:
                 response = "5000円以上の高級レストランですね！特別な日のお食事にふさわしいお店を探しましょう。"
             else:
                 response = "予算について教えてくださりありがとうございます！"
@@ -166,16 +470,14 @@ class OpenAIClient:
         
         # 料理ジャンルが追加された場合
         if message_adds_cuisine and not has_cuisine:
-            if any(word in current_message for word in ["和食", "寿司", "天ぷら", "懐石", "居酒屋"]):
-                response = "和食がお好みですね！日本料理の奥深い味わいを楽しめるお店を探しましょう。"
-            elif any(word in current_message for word in ["イタリアン", "パスタ", "ピザ"]):
-                response = "イタリアンですね！パスタやピザの本格的な味を楽しめるお店を見つけましょう。"
-            elif any(word in current_message for word in ["フレンチ", "フランス料理"]):
-                response = "フレンチですね！洗練されたフランス料理を楽しめるお店を探しましょう。"
-            elif any(word in current_message for word in ["中華", "中国料理", "北京ダック", "麻婆豆腐"]):
-                response = "中華料理ですね！本格的な中国の味を堪能できるお店を見つけましょう。"
-            else:
-                response = "料理ジャンルありがとうございます！"
+            cuisine_replies = {
+                "和食": "和食がお好みですね！日本料理の奥深い味わいを楽しめるお店を探しましょう。",
+                "イタリアン": "イタリアンですね！パスタやピザの本格的な味を楽しめるお店を見つけましょう。",
+                "フレンチ": "フレンチですね！洗練されたフランス料理を楽しめるお店を探しましょう。",
+                "中華": "中華料理ですね！本格的な中国の味を堪能できるお店を見つけましょう。",
+            }
+            cuisine = first_hit(current["cuisine_kind"], cuisine_replies)
+            response = cuisine_replies.get(cuisine, "料理ジャンルありがとうございます！")
             
             # 次に必要な情報を聞く
             if not has_budget:
@@ -186,8 +488,7 @@ class OpenAIClient:
         
         # エリアが追加された場合
         if message_adds_location and not has_location:
-            locations = ["渋谷", "新宿", "銀座", "恵比寿", "表参道", "六本木", "大阪", "東京", "名古屋", "京都", "神戸", "福岡", "梅田", "心斎橋", "難波", "天王寺"]
-            mentioned_location = next((loc for loc in locations if loc in current_message), "そちらのエリア")
+            mentioned_location = first_hit(current["area"], MOCK_AREAS) or "そちらのエリア"
             response = f"{mentioned_location}エリアですね！アクセスも良く、たくさんの素敵なお店があります。"
             
             # 次に必要な情報を聞く
@@ -198,7 +499,7 @@ class OpenAIClient:
             return response
         
         # 特殊なケース：複数の情報が一度に提供された場合
-        if "寿司" in current_message and "大阪" in current_message:
+        if "寿司" in current["cuisine_kind"] and "大阪" in current["area"]:
             response = "和食（寿司）で大阪エリアですね！素晴らしい選択です。大阪は美味しい寿司店がたくさんありますね。"
             if not has_budget:
                 response += "\n\nご予算の目安を教えてください。\n• ランチ：1000-2000円\n• ディナー：3000-5000円\n• 高級：5000円以上"
@@ -222,19 +523,28 @@ class OpenAIClient:
         """
         インタビューメッセージから好みを分析
         
+        分析にはユーザーの発言だけを使う。AIの応答は温度>0で生成され会話ごとに
+        変わるため、ユーザーの発言（正規化後）が同じインタビューはキャッシュ済みの分析結果を返す。
+        
         Args:
             messages: インタビューのメッセージ履歴
             
         Returns:
             分析された好みの辞書
         """
-        if not self.client:
+        if not self.enabled:
             return self._get_mock_preferences(messages)
         
+        user_messages = [msg for msg in messages if msg["role"] == "user"]
+        cache_key = make_llm_cache_key("preferences", CHAT_MODEL, PREFERENCE_PROMPT_VERSION, user_messages)
+        cached = await llm_cache.aget(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
             # 実際のOpenAI API呼び出し
             analysis_prompt = """
-以下のインタビューから、ユーザーのレストランの好みを分析してJSON形式で返してください。
+以下のインタビューでのユーザーの発言から、レストランの好みを分析してJSON形式で返してください。
 分析内容:
 - budget: 予算（例: "1000-2000", "3000-5000"）
 - cuisine_types: 好みの料理ジャンル（リスト）
@@ -243,35 +553,22 @@ class OpenAIClient:
 - atmosphere: 雰囲気の好み
 - special_requests: その他の要望
 
-インタビュー内容:
-""" + "\n".join([f"{msg['role']}: {msg['content']}" for msg in messages])
+ユーザーの発言:
+""" + "\n".join([f"- {msg['content']}" for msg in user_messages])
             
-            if hasattr(self.client, 'chat'):
-                # 非同期クライアント
-                response = await asyncio.get_event_loop().run_in_executor(
-                    None,
-                    lambda: self.client.ChatCompletion.create(
-                        model="gpt-3.5-turbo",
-                        messages=[{"role": "user", "content": analysis_prompt}],
-                        max_tokens=300,
-                        temperature=0.3
-                    )
-                )
-            else:
-                # 同期クライアントをasyncioで包む
-                import asyncio
-                response = await asyncio.get_event_loop().run_in_executor(
-                    None,
-                    lambda: self.client.ChatCompletion.create(
-                        model="gpt-3.5-turbo",
-                        messages=[{"role": "user", "content": analysis_prompt}],
-                        max_tokens=300,
-                        temperature=0.3
-                    )
+            # チャットより後回しにするバックグラウンド優先度で実行
+            response = await self.scheduler.run(
+                PRIORITY_BACKGROUND,
+                lambda: self._create_completion(
+                    [{"role": "user", "content": analysis_prompt}], max_tokens=300, temperature=0
                 )
+            )
             
             try:
-                return json.loads(response.choices[0].message.content)
+                preferences = json.loads(response.choices[0].message.content)
+                # フォールバック結果はキャッシュしない
+                await llm_cache.aset(cache_key, preferences)
+                return preferences
             except json.JSONDecodeError:
                 return self._get_mock_preferences(messages)
                 
@@ -279,98 +576,89 @@ class OpenAIClient:
             logger.error(f"OpenAI preference analysis error: {e}")
             return self._get_mock_preferences(messages)
     
-    def _get_mock_preferences(self, messages: List[Dict[str, str]]) -> Dict:
-        """モック好み分析（開発・テスト用）"""
-        user_messages = [msg["content"] for msg in messages if msg["role"] == "user"]
-        content = " ".join(user_messages).lower()
-        
-        preferences = {
-            "budget": "2000-4000",
-            "cuisine_types": [],
-            "location": "",
-            "allergies": [],
-            "atmosphere": "カジュアル",
-            "special_requests": []
-        }
-        
-        # 予算の詳細分析
-        if any(word in content for word in ["1000", "千円", "安い", "リーズナブル", "学生"]):
-            preferences["budget"] = "1000-2000"
-        elif any(word in content for word in ["5000", "高級", "記念日", "デート", "特別"]):
-            preferences["budget"] = "4000-8000"
-        elif any(word in content for word in ["3000", "普通", "標準"]):
-            preferences["budget"] = "2500-4000"
-        elif any(word in content for word in ["2000", "ランチ"]):
-            preferences["budget"] = "1500-3000"
-        
-        # 料理ジャンルの詳細分析
-        cuisine_mapping = {
-            "和食": ["和食", "寿司", "天ぷら", "懐石", "居酒屋", "刺身", "日本料理"],
-            "イタリアン": ["イタリアン", "パスタ", "ピザ", "イタリア"],
-            "フレンチ": ["フレンチ", "フランス料理", "フランス", "ビストロ"],
-            "中華": ["中華", "中国料理", "中国", "北京ダック", "麻婆豆腐", "餃子"],
-            "韓国料理": ["韓国", "キムチ", "サムギョプサル", "ビビンバ"],
-            "タイ料理": ["タイ", "トムヤムクン", "パッタイ"],
-            "洋食": ["洋食", "ステーキ", "ハンバーグ"],
-            "焼肉": ["焼肉", "カルビ", "ホルモン"]
-        }
+    async def summarize_conversation(
+        self,
+        summary: str,
+        slot_state: Dict,
+        messages: List[Dict[str, str]]
+    ) -> Dict:
+        """
+        会話ウィンドウから外れたメッセージを既存の要約と条件に畳み込む
         
-        for cuisine, keywords in cuisine_mapping.items():
-            if any(keyword in content for keyword in keywords):
-                preferences["cuisine_types"].append(cuisine)
+        Args:
+            summary: これまでの要約
+            slot_state: これまでに抽出した条件（budget, cuisine_types, location, special_requests）
+            messages: 新たに畳み込むメッセージ
+            
+        Returns:
+            {"summary": 更新後の要約, "slot_state": 更新後の条件}
+        """
+        if not self.enabled:
+            return self._get_mock_summary(summary, slot_state, messages)
         
-        # 場所の分析
-        locations = ["渋谷", "新宿", "銀座", "恵比寿", "表参道", "六本木", "池袋", "上野", "浅草", "秋葉原"]
-        for location in locations:
-            if location in content:
-                preferences["location"] = location
-                break
+        try:
+            summary_prompt = f"""
+以下の「これまでの要約」と「抽出済みの条件」に「続きの会話」の内容を反映し、JSON形式で返してください。
+- summary: 会話全体の要約（300文字以内）
+- budget: 予算（例: "1000-2000", "3000-5000"）
+- cuisine_types: 好みの料理ジャンル（リスト）
+- location: 希望エリア
+- special_requests: その他の要望（リスト）
+
+これまでの要約:
+{summary or "なし"}
+
+抽出済みの条件:
+{json.dumps(slot_state, ensure_ascii=False)}
+
+続きの会話:
+""" + "\n".join([f"{msg['role']}: {msg['content']}" for msg in messages])
+            
+            response = await self.scheduler.run(
+                PRIORITY_BACKGROUND,
+                lambda: self._create_completion(
+                    [{"role": "user", "content": summary_prompt}], max_tokens=500, temperature=0.3
+                )
+            )
+            result = json.loads(response.choices[0].message.content)
+            return {
+                "summary": truncate_summary(str(result.get("summary", ""))),
+                "slot_state": merge_slot_state(slot_state, result)
+            }
+            
+        except Exception as e:
+            logger.error(f"OpenAI conversation summary error: {e}")
+            return self._get_mock_summary(summary, slot_state, messages)
+    
+    def _get_mock_summary(self, summary: str, slot_state: Dict, messages: List[Dict[str, str]]) -> Dict:
+        """モック要約（ユーザー発言を要約に追記し、条件はキーワードから抽出）"""
+        user_messages = [msg["content"] for msg in messages if msg["role"] == "user"]
+        lines = [summary] if summary else []
+        lines.extend(f"ユーザー: {content[:100]}" for content in user_messages)
         
-        # アレルギー分析
-        allergy_keywords = {
-            "魚介類": ["魚", "エビ", "カニ", "貝", "魚介", "海老", "蟹"],
-            "卵": ["卵", "たまご"],
-            "乳製品": ["牛乳", "チーズ", "乳製品", "ミルク"],
-            "ナッツ": ["ナッツ", "ピーナッツ", "アーモンド"],
-            "そば": ["そば", "蕎麦"],
-            "辛い物": ["辛い", "スパイシー", "激辛", "唐辛子"]
+        extracted = update_preference_state(empty_preference_state(), user_messages)
+        # 好みとして読み取れなくてもモック応答が「聞いた」とみなす話題は発言のまま残す
+        # （要約後も同じ質問を繰り返さないため）
+        for content in user_messages:
+            hits = RESPONSE_MATCHER.scan(content)
+            mentioned = content[:MOCK_SLOT_MAX_CHARS]
+            if hits["budget"] and not extracted["budget"]:
+                extracted["budget"] = mentioned
+            if hits["cuisine"] and not extracted["cuisine_types"]:
+                extracted["cuisine_types"] = [mentioned]
+            if hits["location"] and not extracted["location"]:
+                extracted["location"] = first_hit(hits["area"], MOCK_AREAS) or mentioned
+            if hits["special_request"] and not extracted["special_requests"]:
+                extracted["special_requests"] = [mentioned]
+        return {
+            "summary": truncate_summary("\n".join(lines)),
+            "slot_state": merge_slot_state(slot_state, extracted)
         }
-        
-        for allergy, keywords in allergy_keywords.items():
-            if any(f"{keyword}が苦手" in content or f"{keyword}はダメ" in content or f"{keyword}アレルギー" in content 
-                   for keyword in keywords):
-                preferences["allergies"].append(allergy)
-        
-        # 雰囲気の分析
-        if any(word in content for word in ["デート", "記念日", "誕生日", "ロマンチック"]):
-            preferences["atmosphere"] = "ロマンチック"
-        elif any(word in content for word in ["会社", "接待", "ビジネス", "商談"]):
-            preferences["atmosphere"] = "フォーマル"
-        elif any(word in content for word in ["家族", "子供", "ファミリー"]):
-            preferences["atmosphere"] = "ファミリー向け"
-        elif any(word in content for word in ["友達", "仲間", "グループ", "ワイワイ"]):
-            preferences["atmosphere"] = "カジュアル・グループ向け"
-        elif any(word in content for word in ["静か", "落ち着い", "大人"]):
-            preferences["atmosphere"] = "落ち着いた大人の空間"
-        
-        # 特別なリクエスト
-        special_requests = []
-        if any(word in content for word in ["個室", "プライベート"]):
-            special_requests.append("個室希望")
-        if any(word in content for word in ["禁煙", "タバコ"]):
-            special_requests.append("禁煙席希望")
-        if any(word in content for word in ["夜景", "景色", "眺め"]):
-            special_requests.append("眺めの良い席希望")
-        if any(word in content for word in ["駐車場", "車"]):
-            special_requests.append("駐車場あり")
-        if any(word in content for word in ["ベジタリアン", "野菜", "菜食"]):
-            special_requests.append("ベジタリアン対応")
-        if any(word in content for word in ["子供", "キッズ"]):
-            special_requests.append("子供連れ歓迎")
-        
-        preferences["special_requests"] = special_requests
-        
-        return preferences
+    
+    def _get_mock_preferences(self, messages: List[Dict[str, str]]) -> Dict:
+        """モック好み分析（開発・テスト用）"""
+        user_messages = [msg["content"] for msg in messages if msg["role"] == "user"]
+        return snapshot_preferences(update_preference_state(empty_preference_state(), user_messages))
 
 
 # グローバルインスタンス
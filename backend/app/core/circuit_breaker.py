@@ -0,0 +1,108 @@
+import logging
+import time
+from typing import Any, Dict
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """サーキットブレーカーが開いているため呼び出しを行わなかった"""
+    pass
+
+
+class CircuitBreaker:
+    """プロバイダごとのサーキットブレーカー
+
+    連続失敗が閾値に達すると open になり、一定時間は呼び出しを即座に拒否する。
+    時間経過後は half_open で1件だけ試行し、成功すれば closed に戻る。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_seconds: float = 30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+        self.short_circuited = 0
+        self.opened_count = 0
+
+    def allow_request(self) -> bool:
+        """呼び出してよいか判定（half_open では試行を1件に限定）"""
+        if self.state == self.CLOSED:
+            return True
+
+        if self.state == self.OPEN and self.seconds_until_retry() <= 0:
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+            logger.info(f"[{self.name}] circuit half-open, probing provider")
+
+        if self.state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+
+        self.short_circuited += 1
+        return False
+
+    def seconds_until_retry(self) -> float:
+        if self.state != self.OPEN:
+            return 0
+        return max(0.0, self._opened_at + self.recovery_seconds - time.monotonic())
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            logger.info(f"[{self.name}] circuit closed, provider recovered")
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def release(self):
+        """許可を得たが呼び出しを行わなかった場合に試行枠を戻す"""
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.opened_count += 1
+                logger.warning(
+                    f"[{self.name}] circuit opened after {self.consecutive_failures} consecutive failures"
+                )
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "opened_count": self.opened_count,
+            "short_circuited": self.short_circuited,
+            "seconds_until_retry": round(self.seconds_until_retry(), 1)
+        }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """プロバイダ名ごとのサーキットブレーカーを取得"""
+    if name not in _breakers:
+        _breakers[name] = CircuitBreaker(
+            name,
+            failure_threshold=settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+            recovery_seconds=settings.CIRCUIT_BREAKER_RECOVERY_SECONDS
+        )
+    return _breakers[name]
+
+
+def get_circuit_breaker_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: breaker.get_stats() for name, breaker in _breakers.items()}
@@ -1,10 +1,24 @@
 from pydantic_settings import BaseSettings
-from typing import Optional, List
+from typing import Optional, List, Dict
 
 
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str = "sqlite:///./restaurant_recommendation.db"
+    ASYNC_DATABASE_URL: str = ""  # 空の場合は DATABASE_URL から作る（sqlite+aiosqlite / postgresql+asyncpg）
+    # コネクションプール（同期・非同期のエンジンそれぞれに適用）
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0  # 空きコネクションを待つ秒数の上限
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE: int = 1800  # 秒、-1で無効
+    DB_STATEMENT_TIMEOUT_MS: int = 30000  # PostgreSQLのみ、0で無効
+    # SQLiteの接続時に設定するPRAGMA
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 268435456  # 256MB
+    SQLITE_CACHE_SIZE: int = -65536  # 負の値はKiB単位（64MB）
     
     # API
     API_V1_STR: str = "/api/v1"
@@ -15,10 +29,105 @@ class Settings(BaseSettings):
     
     # OpenAI API settings
     OPENAI_API_KEY: str = ""
+    # アプリ全体で共有する AsyncOpenAI クライアントの接続設定
+    OPENAI_MAX_CONNECTIONS: int = 20
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    OPENAI_CONNECT_TIMEOUT: float = 5.0
+    OPENAI_TIMEOUT: float = 30.0
+    OPENAI_MAX_RETRIES: int = 1
+    # LLM呼び出しスケジューラ（チャットを好み分析より優先する）
+    LLM_MAX_CONCURRENCY: int = 8
+    LLM_PRIORITY_CONCURRENCY: Dict[str, int] = {"interactive": 8, "background": 2}
+    LLM_DISCONNECT_CHECK_SECONDS: float = 0.5
+    # チャットの文脈：直近のメッセージだけをそのまま送り、それより古いターンは要約に畳み込む
+    CHAT_CONTEXT_WINDOW_MESSAGES: int = 8
+    CHAT_CONTEXT_FOLD_BATCH_MESSAGES: int = 8  # ウィンドウ外がこの件数たまったらまとめて要約する
+    CHAT_CONTEXT_SUMMARY_MAX_CHARS: int = 1500
     
     # External API settings
     GURUNAVI_API_KEY: str = ""
     GOOGLE_PLACES_API_KEY: str = ""
+    HOTPEPPER_API_KEY: str = ""
+    
+    # Outbound HTTP connection pool settings
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_MAX_CONNECTIONS_PER_HOST: int = 10
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP_CONNECT_TIMEOUT: float = 3.0
+    HTTP_TIMEOUT: float = 10.0
+    EXTERNAL_SEARCH_DEADLINE_SECONDS: float = 5.0  # 複数プロバイダ統合検索の全体締め切り
+    
+    # Outbound rate limits per provider
+    # rate: 1秒あたりのリクエスト数, burst: バケット容量, max_concurrency: 同時実行数の上限,
+    # max_queue: 待ち行列の長さ, max_wait_seconds: 待ち時間の上限, target_latency: AIMDの目標レイテンシ（秒）
+    PROVIDER_RATE_LIMITS: Dict[str, Dict[str, float]] = {
+        "default": {"rate": 5, "burst": 10, "max_concurrency": 10, "max_queue": 100,
+                    "max_wait_seconds": 5, "target_latency": 2},
+        "hotpepper": {"rate": 5, "burst": 10, "max_concurrency": 20},
+        "gurunavi": {"rate": 5, "burst": 10, "max_concurrency": 10},
+        "google_places": {"rate": 10, "burst": 20, "max_concurrency": 20},
+        "openai": {"rate": 3, "burst": 10, "max_concurrency": 20, "max_wait_seconds": 10,
+                   "target_latency": 10},
+    }
+    
+    # Restaurant search cache settings
+    SEARCH_CACHE_TTL_SECONDS: int = 600
+    SEARCH_CACHE_MEMORY_MAX_ENTRIES: int = 512
+    SEARCH_CACHE_SHARED_MAX_ENTRIES: int = 10000
+    SEARCH_CACHE_PATH: str = "./search_cache.sqlite3"  # 空文字で共有キャッシュを無効化
+    SEARCH_CACHE_TOUCH_INTERVAL_SECONDS: float = 60  # 共有キャッシュの読み出し時にアクセス時刻を更新する最短間隔
+    SEARCH_CACHE_GRID_DEGREES: float = 0.005  # 緯度経度の丸め単位（約500m）
+    STALE_RESULTS_TTL_SECONDS: int = 86400  # 障害時に返す直近結果の保持期間
+    STALE_RESULTS_MAX_ENTRIES: int = 10000
+    
+    # LLM応答キャッシュ（好み分析の結果を会話内容のハッシュで使い回す、共有層は SEARCH_CACHE_PATH）
+    LLM_CACHE_TTL_SECONDS: int = 2592000
+    LLM_CACHE_MEMORY_MAX_ENTRIES: int = 256
+    LLM_CACHE_SHARED_MAX_ENTRIES: int = 5000
+    
+    # Circuit breaker settings
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = 5  # 連続失敗回数でopenにする閾値
+    CIRCUIT_BREAKER_RECOVERY_SECONDS: float = 30  # open後に試行を再開するまでの秒数
+    
+    # Restaurant catalog geo index settings
+    GEO_INDEX_CELL_DEGREES: float = 0.01  # グリッドセルの大きさ（約1km）
+    GEO_INDEX_REFRESH_SECONDS: int = 60  # 他ワーカーの取り込み分を読み込む間隔
+
+    # 候補店舗のマッチスコア設定
+    MATCH_SCORE_WEIGHTS: Dict[str, float] = {
+        "cuisine": 0.4,
+        "budget": 0.3,
+        "atmosphere": 0.15,
+        "special_requests": 0.15
+    }
+    MATCH_SCORE_AGGREGATE: str = "softmin"  # mean / min / softmin（グループ内の公平性の重み付け）
+    MATCH_SCORE_SOFTMIN_TEMPERATURE: float = 0.1  # 小さいほど最も不満なメンバーを重視
+    MATCH_SCORE_ALLERGY_PENALTY: float = 0.8  # 苦手な食材を含む候補の減点率
+    MATCH_SCORE_CANDIDATE_POOL: int = 20  # スコアリング対象として取得する候補数
+
+    # Background job queue settings
+    JOB_WORKER_COUNT: int = 2
+    JOB_POLL_INTERVAL_SECONDS: float = 1.0
+    JOB_VISIBILITY_TIMEOUT_SECONDS: float = 60  # 実行中ジョブを他ワーカーが回収するまでの秒数
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_BACKOFF_SECONDS: float = 2.0  # リトライ間隔の初期値（失敗ごとに倍）
+
+    # Group event stream (SSE) settings
+    GROUP_EVENTS_HISTORY_SIZE: int = 200  # Last-Event-ID で再送できるグループごとの履歴件数
+    GROUP_EVENTS_QUEUE_SIZE: int = 100  # 接続ごとの未送信イベントの上限
+    GROUP_EVENTS_HEARTBEAT_SECONDS: float = 15
+    GROUP_EVENTS_IDLE_TTL_SECONDS: float = 300  # 接続がなくなったグループの履歴を残す秒数
+
+    # Pub/sub settings (vote and group event fan-out across workers)
+    PUBSUB_BACKEND: str = "memory"  # memory（プロセス内）または redis
+    PUBSUB_REDIS_URL: str = "redis://localhost:6379/0"
+    PUBSUB_QUEUE_SIZE: int = 1000  # プロセス内バックエンドの購読ごとの未配信上限
+    VOTE_HUB_SEND_TIMEOUT_SECONDS: float = 5  # 投票差分の送信がこれを超えた WebSocket 接続は閉じる
+
+    # Long-poll settings (?since_version=N&timeout=S)
+    LONG_POLL_MAX_TIMEOUT_SECONDS: float = 60
+    LONG_POLL_RECHECK_SECONDS: float = 5  # 他ワーカーでの更新を検知するためのバージョン再確認間隔
     
     class Config:
         env_file = ".env"
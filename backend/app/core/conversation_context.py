@@ -0,0 +1,124 @@
+import json
+from typing import Any, Dict, List, Optional
+
+from .config import settings
+from ..models.interview import Interview, Message
+
+# 全ターンで同一の先頭部分（プロバイダ側のプロンプトキャッシュが効くよう内容を変えない）
+SYSTEM_PROMPT = """あなたはグループでのお店選びを手伝うヒアリング担当です。
+ユーザーとの会話から、次の条件を一つずつ確認してください。
+1. 予算（1人あたりの目安）
+2. 料理ジャンル
+3. エリア（最寄り駅や地域名）
+4. 特別な要望（個室、禁煙、子供連れ、アレルギーなど）
+
+・返答は日本語で、1回につき質問は1つか2つに絞って簡潔にしてください。
+・既に分かっている条件を聞き直さないでください。
+・条件がすべて揃ったら内容を箇条書きで確認し、ヒアリングを完了すると伝えてください。"""
+
+# インタビュー冒頭のAIメッセージ（会話内容によらず同じなのでモデルは呼ばない）
+OPENING_MESSAGE = "こんにちは！レストラン選びのお手伝いをさせていただきます。あなたの好みや要望を教えてください。"
+
+SLOT_LABELS = {
+    "budget": "予算",
+    "cuisine_types": "料理ジャンル",
+    "location": "エリア",
+    "special_requests": "特別な要望",
+}
+# 要約済みの条件を伝えるシステムメッセージの見出しと、未確認の条件の表記
+CONTEXT_HEADER = "これまでに分かっている条件:"
+UNKNOWN_SLOT_VALUE = "未確認"
+
+
+def empty_slot_state() -> Dict[str, Any]:
+    return {"budget": "", "cuisine_types": [], "location": "", "special_requests": []}
+
+
+def load_slot_state(interview: Interview) -> Dict[str, Any]:
+    state = empty_slot_state()
+    if interview.slot_state:
+        state.update(json.loads(interview.slot_state))
+    return state
+
+
+def merge_slot_state(previous: Dict[str, Any], extracted: Dict[str, Any]) -> Dict[str, Any]:
+    """新しく分かった条件を反映（空の値では上書きせず、リストは重複なく追加）"""
+    merged = empty_slot_state()
+    merged.update(previous)
+    for key in SLOT_LABELS:
+        value = extracted.get(key)
+        if isinstance(merged[key], list):
+            merged[key] = merged[key] + [item for item in (value or []) if item not in merged[key]]
+        elif value:
+            merged[key] = value
+    return merged
+
+
+def _render_context(summary: str, slot_state: Dict[str, Any]) -> str:
+    lines = []
+    for key, label in SLOT_LABELS.items():
+        value = slot_state.get(key)
+        if isinstance(value, list):
+            value = "、".join(value)
+        lines.append(f"・{label}: {value or UNKNOWN_SLOT_VALUE}")
+    text = f"{CONTEXT_HEADER}\n" + "\n".join(lines)
+    if summary:
+        text += f"\n\nこれ以前の会話の要約:\n{summary}"
+    return text
+
+
+def build_chat_context(interview: Interview, recent_messages: List[Message], user_message: str) -> List[Dict[str, str]]:
+    """モデルに送るメッセージを組み立てる
+
+    固定のシステムプロンプト、要約と抽出済みの条件、要約されていない直近のメッセージ、
+    今回のユーザー発言の順に並べる。会話が長くなっても送る量は一定に収まる。
+    recent_messages には summarized_through より後のメッセージを順に渡す。
+    """
+    context = [{"role": "system", "content": SYSTEM_PROMPT}]
+    if interview.summarized_through:
+        context.append({
+            "role": "system",
+            "content": _render_context(interview.context_summary or "", load_slot_state(interview))
+        })
+    context.extend({"role": msg.role.value, "content": msg.content} for msg in recent_messages)
+    context.append({"role": "user", "content": user_message})
+    return context
+
+
+def parse_context_message(messages: List[Dict[str, str]]) -> Optional[Dict[str, Any]]:
+    """build_chat_context が加えた条件のメッセージから条件を読み戻す（要約前の会話では None）
+
+    モック応答はメッセージしか受け取らないため、要約に畳み込まれたターンで
+    分かった条件をここから補う。
+    """
+    for message in messages:
+        if message["role"] != "system" or not message["content"].startswith(CONTEXT_HEADER):
+            continue
+        labels = {label: key for key, label in SLOT_LABELS.items()}
+        state = empty_slot_state()
+        # 条件の一覧は要約（空行以降）より前にある
+        for line in message["content"].split("\n\n", 1)[0].splitlines()[1:]:
+            label, _, value = line.lstrip("・").partition(": ")
+            key = labels.get(label)
+            if key is None or value == UNKNOWN_SLOT_VALUE:
+                continue
+            state[key] = value.split("、") if isinstance(state[key], list) else value
+        return state
+    return None
+
+
+def needs_fold(unsummarized_count: int) -> bool:
+    """要約されていないメッセージがウィンドウを十分に超えたか（数ターンごとにまとめて要約する）"""
+    return unsummarized_count > settings.CHAT_CONTEXT_WINDOW_MESSAGES + settings.CHAT_CONTEXT_FOLD_BATCH_MESSAGES
+
+
+def messages_to_fold(unsummarized: List[Message]) -> List[Message]:
+    """直近のウィンドウを残し、それより古いメッセージを返す"""
+    window = settings.CHAT_CONTEXT_WINDOW_MESSAGES
+    return unsummarized[:-window] if len(unsummarized) > window else []
+
+
+def truncate_summary(summary: str) -> str:
+    """要約の長さを上限に収める（古い側を切り詰める）"""
+    limit = settings.CHAT_CONTEXT_SUMMARY_MAX_CHARS
+    return summary if len(summary) <= limit else summary[-limit:]
@@ -1,12 +1,49 @@
-import requests
+import asyncio
+import httpx
 import json
-from typing import List, Dict, Optional
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, List, Dict, Optional
 from .config import settings
+from .http_client import http_client
+from .search_cache import make_cache_key
+from .singleflight import get_singleflight
+from .rate_limiter import get_rate_limiter, RateLimitExceeded
+from .circuit_breaker import get_circuit_breaker, CircuitOpenError
+from .restaurant_catalog import restaurant_catalog, catalog_record_from_external
 from ..clients.hotpepper_client import hotpepper_client
 import logging
 
 logger = logging.getLogger(__name__)
 
+# プロバイダ呼び出しの失敗として扱う例外
+PROVIDER_ERRORS = (httpx.HTTPError, RateLimitExceeded, CircuitOpenError)
+
+
+class ProviderNotConfiguredError(Exception):
+    """APIキーが未設定のプロバイダを呼び出した"""
+
+
+async def _guarded_get(client, url: str, params: Dict) -> httpx.Response:
+    """クライアントのサーキットブレーカー・レートリミッタを通してGETする"""
+    # 障害中のプロバイダはタイムアウトを待たずに即座に失敗させる
+    if not client.breaker.allow_request():
+        raise CircuitOpenError(f"{client.breaker.name} circuit is open")
+    
+    try:
+        async with client.rate_limiter.acquire():
+            response = await client.http.get(url, params=params)
+            response.raise_for_status()
+    except RateLimitExceeded:
+        client.breaker.release()
+        raise
+    except httpx.HTTPError:
+        client.breaker.record_failure()
+        raise
+    
+    client.breaker.record_success()
+    return response
+
 
 class GurunaviAPIClient:
     """ぐるなびAPI連携クライアント"""
@@ -14,15 +51,20 @@ class GurunaviAPIClient:
     def __init__(self):
         self.base_url = "https://api.gnavi.co.jp/RestSearchAPI/v3/"
         self.api_key = getattr(settings, 'GURUNAVI_API_KEY', None)
+        self.http = http_client
+        self.flights = get_singleflight("gurunavi")
+        self.rate_limiter = get_rate_limiter("gurunavi")
+        self.breaker = get_circuit_breaker("gurunavi")
     
-    def search_restaurants(
+    async def search_restaurants(
         self,
         latitude: float,
         longitude: float,
         range_km: int = 3,
         hit_per_page: int = 10,
         cuisine_type: Optional[str] = None,
-        budget: Optional[str] = None
+        budget: Optional[str] = None,
+        fallback_to_mock: bool = True
     ) -> List[Dict]:
         """
         レストラン検索
@@ -34,11 +76,14 @@ class GurunaviAPIClient:
             hit_per_page: 取得件数
             cuisine_type: 料理ジャンル
             budget: 予算
+            fallback_to_mock: APIキー未設定・呼び出し失敗時にモックデータを返すか（False なら例外を送出）
         
         Returns:
             レストラン情報のリスト
         """
         if not self.api_key:
+            if not fallback_to_mock:
+                raise ProviderNotConfiguredError("Gurunavi API key not configured")
             logger.warning("Gurunavi API key not configured, returning mock data")
             return self._get_mock_restaurants()
         
@@ -59,40 +104,56 @@ class GurunaviAPIClient:
         if budget:
             params['budget'] = self._map_budget(budget)
         
+        # 同一クエリの同時リクエストは1回のAPI呼び出しにまとめる
+        flight_key = make_cache_key("gurunavi", {
+            'lat': latitude,
+            'lng': longitude,
+            **{k: v for k, v in params.items() if k not in ('keyid', 'latitude', 'longitude')}
+        })
         try:
-            response = requests.get(self.base_url, params=params, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
-            restaurants = []
-            
-            if 'rest' in data:
-                for rest in data['rest']:
-                    restaurant = {
-                        'external_id': rest.get('id'),
-                        'external_source': 'gurunavi',
-                        'name': rest.get('name', ''),
-                        'description': rest.get('pr', {}).get('pr_short', ''),
-                        'cuisine_type': rest.get('category', ''),
-                        'price_range': rest.get('budget', ''),
-                        'location': rest.get('address', ''),
-                        'address': rest.get('address', ''),
-                        'phone': rest.get('tel', ''),
-                        'website': rest.get('url', ''),
-                        'external_rating': None,  # ぐるなびAPIには評価がない
-                        'external_review_count': None,
-                        'image_url': rest.get('image_url', {}).get('shop_image1', ''),
-                        'latitude': rest.get('latitude'),
-                        'longitude': rest.get('longitude')
-                    }
-                    restaurants.append(restaurant)
-            
-            return restaurants
-            
-        except requests.RequestException as e:
+            return await self.flights.do(flight_key, lambda: self._fetch_restaurants(params))
+        except PROVIDER_ERRORS as e:
+            if not fallback_to_mock:
+                raise
             logger.error(f"Gurunavi API request failed: {e}")
             return self._get_mock_restaurants()
     
+    async def _fetch_restaurants(self, params: Dict) -> List[Dict]:
+        """ぐるなびAPIを呼び出して検索結果を取得（失敗時は例外を送出）"""
+        response = await self._get(self.base_url, params)
+        
+        data = response.json()
+        restaurants = []
+        
+        if 'rest' in data:
+            for rest in data['rest']:
+                restaurant = {
+                    'external_id': rest.get('id'),
+                    'external_source': 'gurunavi',
+                    'name': rest.get('name', ''),
+                    'description': rest.get('pr', {}).get('pr_short', ''),
+                    'cuisine_type': rest.get('category', ''),
+                    'price_range': rest.get('budget', ''),
+                    'location': rest.get('address', ''),
+                    'address': rest.get('address', ''),
+                    'phone': rest.get('tel', ''),
+                    'website': rest.get('url', ''),
+                    'external_rating': None,  # ぐるなびAPIには評価がない
+                    'external_review_count': None,
+                    'image_url': rest.get('image_url', {}).get('shop_image1', ''),
+                    'latitude': rest.get('latitude'),
+                    'longitude': rest.get('longitude')
+                }
+                restaurants.append(restaurant)
+        
+        # 取得した店舗をカタログに取り込む
+        restaurant_catalog.schedule([catalog_record_from_external(r) for r in restaurants])
+        return restaurants
+    
+    async def _get(self, url: str, params: Dict) -> httpx.Response:
+        """レート制限・サーキットブレーカー付きでぐるなびAPIを呼び出す"""
+        return await _guarded_get(self, url, params)
+    
     def _map_cuisine_type(self, cuisine_type: str) -> str:
         """料理ジャンルをぐるなびAPIのカテゴリにマッピング"""
         mapping = {
@@ -148,14 +209,19 @@ class GooglePlacesAPIClient:
     def __init__(self):
         self.base_url = "https://maps.googleapis.com/maps/api/place"
         self.api_key = getattr(settings, 'GOOGLE_PLACES_API_KEY', None)
+        self.http = http_client
+        self.flights = get_singleflight("google_places")
+        self.rate_limiter = get_rate_limiter("google_places")
+        self.breaker = get_circuit_breaker("google_places")
     
-    def search_restaurants(
+    async def search_restaurants(
         self,
         latitude: float,
         longitude: float,
         radius: int = 3000,
         restaurant_type: str = "restaurant",
-        keyword: Optional[str] = None
+        keyword: Optional[str] = None,
+        fallback_to_mock: bool = True
     ) -> List[Dict]:
         """
         レストラン検索
@@ -166,11 +232,14 @@ class GooglePlacesAPIClient:
             radius: 検索半径（メートル）
             restaurant_type: 場所のタイプ
             keyword: 検索キーワード
+            fallback_to_mock: APIキー未設定・呼び出し失敗時にモックデータを返すか（False なら例外を送出）
         
         Returns:
             レストラン情報のリスト
         """
         if not self.api_key:
+            if not fallback_to_mock:
+                raise ProviderNotConfiguredError("Google Places API key not configured")
             logger.warning("Google Places API key not configured, returning mock data")
             return self._get_mock_restaurants()
         
@@ -186,41 +255,53 @@ class GooglePlacesAPIClient:
         if keyword:
             params['keyword'] = keyword
         
+        # 同一クエリの同時リクエストは1回のAPI呼び出しにまとめる
+        flight_key = make_cache_key("google_places", {
+            'lat': latitude,
+            'lng': longitude,
+            **{k: v for k, v in params.items() if k not in ('key', 'location')}
+        })
         try:
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
-            restaurants = []
-            
-            if 'results' in data:
-                for place in data['results']:
-                    restaurant = {
-                        'external_id': place.get('place_id'),
-                        'external_source': 'google_places',
-                        'name': place.get('name', ''),
-                        'description': '',  # Nearby Searchには詳細説明がない
-                        'cuisine_type': self._extract_cuisine_type(place.get('types', [])),
-                        'price_range': self._map_price_level(place.get('price_level')),
-                        'location': place.get('vicinity', ''),
-                        'address': place.get('vicinity', ''),
-                        'phone': '',  # Nearby Searchには電話番号がない
-                        'website': '',  # Nearby Searchにはウェブサイトがない
-                        'external_rating': place.get('rating'),
-                        'external_review_count': place.get('user_ratings_total'),
-                        'image_url': self._get_photo_url(place.get('photos', [])),
-                        'latitude': place.get('geometry', {}).get('location', {}).get('lat'),
-                        'longitude': place.get('geometry', {}).get('location', {}).get('lng')
-                    }
-                    restaurants.append(restaurant)
-            
-            return restaurants
-            
-        except requests.RequestException as e:
+            return await self.flights.do(flight_key, lambda: self._fetch_restaurants(url, params))
+        except PROVIDER_ERRORS as e:
+            if not fallback_to_mock:
+                raise
             logger.error(f"Google Places API request failed: {e}")
             return self._get_mock_restaurants()
     
-    def get_place_details(self, place_id: str) -> Optional[Dict]:
+    async def _fetch_restaurants(self, url: str, params: Dict) -> List[Dict]:
+        """Google Places APIを呼び出して検索結果を取得（失敗時は例外を送出）"""
+        response = await self._get(url, params)
+        
+        data = response.json()
+        restaurants = []
+        
+        if 'results' in data:
+            for place in data['results']:
+                restaurant = {
+                    'external_id': place.get('place_id'),
+                    'external_source': 'google_places',
+                    'name': place.get('name', ''),
+                    'description': '',  # Nearby Searchには詳細説明がない
+                    'cuisine_type': self._extract_cuisine_type(place.get('types', [])),
+                    'price_range': self._map_price_level(place.get('price_level')),
+                    'location': place.get('vicinity', ''),
+                    'address': place.get('vicinity', ''),
+                    'phone': '',  # Nearby Searchには電話番号がない
+                    'website': '',  # Nearby Searchにはウェブサイトがない
+                    'external_rating': place.get('rating'),
+                    'external_review_count': place.get('user_ratings_total'),
+                    'image_url': self._get_photo_url(place.get('photos', [])),
+                    'latitude': place.get('geometry', {}).get('location', {}).get('lat'),
+                    'longitude': place.get('geometry', {}).get('location', {}).get('lng')
+                }
+                restaurants.append(restaurant)
+        
+        # 取得した店舗をカタログに取り込む
+        restaurant_catalog.schedule([catalog_record_from_external(r) for r in restaurants])
+        return restaurants
+    
+    async def get_place_details(self, place_id: str) -> Optional[Dict]:
         """
         場所の詳細情報を取得
         
@@ -241,18 +322,24 @@ class GooglePlacesAPIClient:
         }
         
         try:
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
+            response = await self.flights.do(
+                f"details:{place_id}",
+                lambda: self._get(url, params)
+            )
             
             data = response.json()
             if 'result' in data:
                 return data['result']
             
-        except requests.RequestException as e:
+        except PROVIDER_ERRORS as e:
             logger.error(f"Google Places Details API request failed: {e}")
         
         return None
     
+    async def _get(self, url: str, params: Dict) -> httpx.Response:
+        """レート制限・サーキットブレーカー付きでGoogle Places APIを呼び出す"""
+        return await _guarded_get(self, url, params)
+    
     def _extract_cuisine_type(self, types: List[str]) -> str:
         """場所のタイプから料理ジャンルを抽出"""
         cuisine_mapping = {
@@ -323,6 +410,23 @@ class GooglePlacesAPIClient:
         ]
 
 
+@dataclass
+class SourceResult:
+    """プロバイダごとの検索結果と実行状況"""
+    source: str
+    status: str  # "ok" / "error" / "timeout"
+    elapsed_ms: float
+    restaurants: List[Dict] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+@dataclass
+class CombinedSearchResult:
+    """統合検索の結果"""
+    restaurants: List[Dict]
+    sources: List[SourceResult]
+
+
 class RestaurantSearchService:
     """レストラン検索統合サービス"""
     
@@ -330,60 +434,101 @@ class RestaurantSearchService:
         self.gurunavi_client = GurunaviAPIClient()
         self.google_places_client = GooglePlacesAPIClient()
     
-    def search_restaurants_combined(
+    async def search_restaurants_combined(
         self,
         latitude: float,
         longitude: float,
         preferences: Dict,
-        max_results: int = 20
-    ) -> List[Dict]:
+        max_results: int = 20,
+        deadline: Optional[float] = None
+    ) -> CombinedSearchResult:
         """
-        複数のAPIからレストラン情報を統合検索
+        複数のAPIからレストラン情報を並行して統合検索
         
         Args:
             latitude: 緯度
             longitude: 経度
             preferences: ユーザーの好み（料理ジャンル、予算など）
             max_results: 最大取得件数
+            deadline: 全体の締め切り（秒）。未指定時は設定値を使用
         
         Returns:
-            統合されたレストラン情報のリスト
+            統合されたレストラン情報と、プロバイダごとの所要時間・ステータス
+            （失敗・未設定のプロバイダは status='error' でモックデータは混ぜない）
         """
-        all_restaurants = []
+        deadline = deadline if deadline is not None else settings.EXTERNAL_SEARCH_DEADLINE_SECONDS
         
-        # ぐるなびAPIから検索
-        try:
-            gurunavi_results = self.gurunavi_client.search_restaurants(
+        searches = {
+            'gurunavi': self.gurunavi_client.search_restaurants(
                 latitude=latitude,
                 longitude=longitude,
                 cuisine_type=preferences.get('cuisine_type'),
                 budget=preferences.get('budget'),
-                hit_per_page=max_results // 2
-            )
-            all_restaurants.extend(gurunavi_results)
-        except Exception as e:
-            logger.error(f"Gurunavi search failed: {e}")
-        
-        # Google Places APIから検索
-        try:
-            google_results = self.google_places_client.search_restaurants(
+                hit_per_page=max_results // 2,
+                fallback_to_mock=False
+            ),
+            'google_places': self.google_places_client.search_restaurants(
                 latitude=latitude,
                 longitude=longitude,
-                keyword=preferences.get('cuisine_type')
+                keyword=preferences.get('cuisine_type'),
+                fallback_to_mock=False
             )
-            all_restaurants.extend(google_results)
-        except Exception as e:
-            logger.error(f"Google Places search failed: {e}")
+        }
+        
+        started_at = time.perf_counter()
+        tasks = {
+            source: asyncio.ensure_future(self._run_source(source, search, started_at))
+            for source, search in searches.items()
+        }
+        
+        # 締め切りまでに応答したプロバイダの結果のみ採用する
+        done, pending = await asyncio.wait(tasks.values(), timeout=deadline)
+        for task in pending:
+            task.cancel()
+        
+        source_results = []
+        for source, task in tasks.items():
+            if task in done:
+                source_results.append(task.result())
+            else:
+                logger.warning(f"{source} search timed out after {deadline}s")
+                source_results.append(SourceResult(
+                    source=source,
+                    status='timeout',
+                    elapsed_ms=deadline * 1000
+                ))
         
         # 重複除去（名前と住所で判定）
         unique_restaurants = []
         seen = set()
         
-        for restaurant in all_restaurants:
-            key = (restaurant['name'], restaurant['location'])
-            if key not in seen:
-                seen.add(key)
-                unique_restaurants.append(restaurant)
+        for source_result in source_results:
+            for restaurant in source_result.restaurants:
+                key = (restaurant['name'], restaurant['location'])
+                if key not in seen:
+                    seen.add(key)
+                    unique_restaurants.append(restaurant)
         
-        return unique_restaurants[:max_results]
-
+        return CombinedSearchResult(
+            restaurants=unique_restaurants[:max_results],
+            sources=source_results
+        )
+    
+    async def _run_source(self, source: str, search: Awaitable[List[Dict]], started_at: float) -> SourceResult:
+        """1プロバイダの検索を実行し、所要時間とステータスを記録"""
+        try:
+            restaurants = await search
+            return SourceResult(
+                source=source,
+                status='ok',
+                elapsed_ms=(time.perf_counter() - started_at) * 1000,
+                restaurants=restaurants
+            )
+        except Exception as e:
+            logger.error(f"{source} search failed: {e}")
+            return SourceResult(
+                source=source,
+                status='error',
+                elapsed_ms=(time.perf_counter() - started_at) * 1000,
+                error=str(e)
+            )
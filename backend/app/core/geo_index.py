@@ -0,0 +1,284 @@
+import logging
+import math
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from .config import settings
+from ..models.restaurant import Restaurant
+
+try:
+    import numpy as np
+except ImportError:  # NumPyがない環境では純Pythonで距離計算する
+    np = None
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_M = 6371000.0
+METERS_PER_DEGREE_LAT = 111320.0
+
+# ホットペッパーAPIの range パラメータ（1〜5）と検索半径（メートル）の対応
+HOTPEPPER_RANGE_METERS = {1: 300, 2: 500, 3: 1000, 4: 2000, 5: 3000}
+
+
+def range_to_meters(search_range: Optional[int]) -> int:
+    """ホットペッパーAPIの range を半径（メートル）に変換"""
+    return HOTPEPPER_RANGE_METERS.get(int(search_range or 3), 1000)
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """2点間の距離（メートル）"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def bounding_box(lat: float, lng: float, radius_m: float) -> Tuple[float, float, float, float]:
+    """中心と半径を囲む緯度経度の範囲 (min_lat, max_lat, min_lng, max_lng)"""
+    lat_span = radius_m / METERS_PER_DEGREE_LAT
+    lng_span = radius_m / (METERS_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 1e-6))
+    return lat - lat_span, lat + lat_span, lng - lng_span, lng + lng_span
+
+
+class GridGeoIndex:
+    """固定グリッドによるメモリ上の空間インデックス
+
+    店舗をグリッドセルに振り分け、半径検索では範囲に掛かるセルの店舗だけ
+    距離計算する（NumPyがあればベクトル化）。
+    """
+
+    def __init__(self, cell_degrees: float = 0.01):
+        self.cell_degrees = cell_degrees
+        self._points: Dict[str, Tuple[float, float]] = {}
+        self._cells: Dict[Tuple[int, int], Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_degrees), math.floor(lng / self.cell_degrees))
+
+    def upsert(self, point_id: str, lat: float, lng: float):
+        with self._lock:
+            previous = self._points.get(point_id)
+            if previous is not None:
+                self._cells.get(self._cell(*previous), set()).discard(point_id)
+            self._points[point_id] = (lat, lng)
+            self._cells.setdefault(self._cell(lat, lng), set()).add(point_id)
+
+    def remove(self, point_id: str):
+        with self._lock:
+            previous = self._points.pop(point_id, None)
+            if previous is not None:
+                self._cells.get(self._cell(*previous), set()).discard(point_id)
+
+    def _candidates(self, lat: float, lng: float, radius_m: float) -> List[str]:
+        min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_m)
+        min_cell = self._cell(min_lat, min_lng)
+        max_cell = self._cell(max_lat, max_lng)
+        candidates = []
+        with self._lock:
+            for lat_cell in range(min_cell[0], max_cell[0] + 1):
+                for lng_cell in range(min_cell[1], max_cell[1] + 1):
+                    candidates.extend(self._cells.get((lat_cell, lng_cell), ()))
+        return candidates
+
+    def _distances(self, lat: float, lng: float, point_ids: List[str]) -> List[float]:
+        if np is None:
+            return [haversine_m(lat, lng, *self._points[point_id]) for point_id in point_ids]
+
+        coords = np.radians(np.array([self._points[point_id] for point_id in point_ids]))
+        phi1, lambda1 = math.radians(lat), math.radians(lng)
+        d_phi = coords[:, 0] - phi1
+        d_lambda = coords[:, 1] - lambda1
+        a = np.sin(d_phi / 2) ** 2 + math.cos(phi1) * np.cos(coords[:, 0]) * np.sin(d_lambda / 2) ** 2
+        return (2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))).tolist()
+
+    def radius(self, lat: float, lng: float, radius_m: float, limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """半径内の点を近い順に返す [(id, 距離m), ...]"""
+        candidates = self._candidates(lat, lng, radius_m)
+        if not candidates:
+            return []
+
+        distances = self._distances(lat, lng, candidates)
+        hits = sorted(
+            ((point_id, distance) for point_id, distance in zip(candidates, distances) if distance <= radius_m),
+            key=lambda hit: hit[1]
+        )
+        return hits[:limit] if limit else hits
+
+    def nearest(self, lat: float, lng: float, k: int, max_radius_m: float = 50000) -> List[Tuple[str, float]]:
+        """近い順にk件返す（探索半径を倍々に広げる）"""
+        radius_m = self.cell_degrees * METERS_PER_DEGREE_LAT
+        while True:
+            hits = self.radius(lat, lng, radius_m)
+            if len(hits) >= k or radius_m >= max_radius_m:
+                return hits[:k]
+            radius_m = min(radius_m * 2, max_radius_m)
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+
+class RestaurantGeoIndex:
+    """レストランカタログの近傍検索
+
+    SQLiteなどではカタログをメモリ上のグリッドインデックスに読み込んで検索し、
+    PostgreSQLでは (lat, lng) インデックスを使った範囲検索をDB側で行う。
+    """
+
+    def __init__(self, cell_degrees: float = 0.01, refresh_seconds: float = 60):
+        self.grid = GridGeoIndex(cell_degrees)
+        self.refresh_seconds = refresh_seconds
+        self._loaded_until: Optional[datetime] = None
+        self._refreshed_at = 0.0
+        self._stale = True
+        self._refresh_lock = threading.Lock()
+        self.queries = 0
+
+    def mark_stale(self):
+        """カタログ更新後に呼び出し、次回検索時に差分を読み込ませる"""
+        self._stale = True
+
+    def refresh(self, db: Session):
+        """前回読み込み以降に更新された店舗だけをインデックスに反映
+
+        非同期セッション（run_sync）ではクエリ中に他のコルーチンへ切り替わるため、
+        DBの読み込みはロックの外で行い、インデックスへの反映だけをロック内で行う。
+        """
+        started_at = time.monotonic()
+        loaded_until = self._loaded_until
+        # 読み込み中に mark_stale されたら次回も読み込み直す
+        self._stale = False
+        query = db.query(
+            Restaurant.restaurant_id, Restaurant.lat, Restaurant.lng, Restaurant.last_seen_at
+        ).filter(Restaurant.lat.isnot(None), Restaurant.lng.isnot(None))
+        if loaded_until is not None:
+            query = query.filter(Restaurant.last_seen_at >= loaded_until)
+        try:
+            rows = query.all()
+        except Exception:
+            self._stale = True
+            raise
+
+        with self._refresh_lock:
+            # 後から始まった読み込みが先に反映済みなら、古い結果で上書きしない
+            if started_at < self._refreshed_at:
+                return
+            for restaurant_id, lat, lng, last_seen_at in rows:
+                self.grid.upsert(restaurant_id, lat, lng)
+                if last_seen_at and (self._loaded_until is None or last_seen_at > self._loaded_until):
+                    self._loaded_until = last_seen_at
+
+            self._refreshed_at = started_at
+
+    def _ensure_fresh(self, db: Session):
+        if self._stale or time.monotonic() - self._refreshed_at > self.refresh_seconds:
+            self.refresh(db)
+
+    def nearby(
+        self,
+        db: Session,
+        lat: float,
+        lng: float,
+        radius_m: float,
+        limit: Optional[int] = None
+    ) -> List[Tuple[Restaurant, float]]:
+        """半径内のカタログ店舗を近い順に返す [(Restaurant, 距離m), ...]"""
+        self.queries += 1
+        if db.get_bind().dialect.name == 'postgresql':
+            return self._nearby_sql(db, lat, lng, radius_m, limit)
+
+        self._ensure_fresh(db)
+        hits = self.grid.radius(lat, lng, radius_m, limit)
+        return self._load(db, hits)
+
+    def nearest(self, db: Session, lat: float, lng: float, k: int) -> List[Tuple[Restaurant, float]]:
+        """中心に近い順にk件のカタログ店舗を返す"""
+        self.queries += 1
+        if db.get_bind().dialect.name == 'postgresql':
+            radius_m = 500.0
+            while True:
+                results = self._nearby_sql(db, lat, lng, radius_m, k)
+                if len(results) >= k or radius_m >= 50000:
+                    return results
+                radius_m *= 2
+
+        self._ensure_fresh(db)
+        return self._load(db, self.grid.nearest(lat, lng, k))
+
+    def nearby_from_merged_params(
+        self,
+        db: Session,
+        merged_params: Dict[str, Any],
+        limit: Optional[int] = None
+    ) -> List[Tuple[Restaurant, float]]:
+        """merge_user_preferences が計算した中心点と range で近傍検索"""
+        if merged_params.get('lat') is None or merged_params.get('lng') is None:
+            return []
+        return self.nearby(
+            db,
+            float(merged_params['lat']),
+            float(merged_params['lng']),
+            range_to_meters(merged_params.get('range')),
+            limit
+        )
+
+    def _load(self, db: Session, hits: List[Tuple[str, float]]) -> List[Tuple[Restaurant, float]]:
+        if not hits:
+            return []
+        rows = db.query(Restaurant).filter(
+            Restaurant.restaurant_id.in_([restaurant_id for restaurant_id, _ in hits])
+        ).all()
+        by_id = {row.restaurant_id: row for row in rows}
+        return [(by_id[restaurant_id], distance) for restaurant_id, distance in hits if restaurant_id in by_id]
+
+    def _nearby_sql(
+        self,
+        db: Session,
+        lat: float,
+        lng: float,
+        radius_m: float,
+        limit: Optional[int]
+    ) -> List[Tuple[Restaurant, float]]:
+        """(lat, lng) インデックスで範囲を絞り込み、DB側で距離順に並べる"""
+        min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_m)
+        # 正距円筒図法による近似距離の二乗（並び替え用）
+        lng_scale = math.cos(math.radians(lat))
+        approx_distance = (
+            (Restaurant.lat - lat) * (Restaurant.lat - lat)
+            + (Restaurant.lng - lng) * lng_scale * (Restaurant.lng - lng) * lng_scale
+        )
+        query = db.query(Restaurant).filter(
+            Restaurant.lat.between(min_lat, max_lat),
+            Restaurant.lng.between(min_lng, max_lng)
+        ).order_by(approx_distance)
+        if limit:
+            query = query.limit(limit)
+
+        results = []
+        for row in query.all():
+            distance = haversine_m(lat, lng, row.lat, row.lng)
+            if distance <= radius_m:
+                results.append((row, distance))
+                if limit and len(results) >= limit:
+                    break
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "numpy" if np is not None else "python",
+            "indexed_restaurants": len(self.grid),
+            "queries": self.queries,
+            "stale": self._stale
+        }
+
+
+# グローバルインスタンス
+restaurant_geo_index = RestaurantGeoIndex(
+    cell_degrees=settings.GEO_INDEX_CELL_DEGREES,
+    refresh_seconds=settings.GEO_INDEX_REFRESH_SECONDS
+)
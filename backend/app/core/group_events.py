@@ -0,0 +1,285 @@
+import asyncio
+import json
+import logging
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from .config import settings
+from .pubsub import PubSubBackend, Subscription, pubsub
+
+logger = logging.getLogger(__name__)
+
+# 切断時にブラウザ（EventSource）が再接続するまでの待ち時間
+RECONNECT_MILLISECONDS = 3000
+
+
+@dataclass
+class GroupEvent:
+    """グループの状態変化イベント（SSEの1メッセージ）"""
+    epoch: str
+    id: int
+    event: str
+    data: Dict[str, Any]
+
+    def encode(self) -> str:
+        payload = json.dumps(self.data, ensure_ascii=False, default=str)
+        return f"id: {self.epoch}-{self.id}\nevent: {self.event}\ndata: {payload}\n\n"
+
+
+def parse_event_id(value: Optional[str]) -> Optional[Tuple[str, int]]:
+    """Last-Event-ID（"エポック-連番"）を分解（形式が違えば None）"""
+    if not value:
+        return None
+    epoch, _, sequence = value.rpartition("-")
+    if not epoch or not sequence.isdigit():
+        return None
+    return epoch, int(sequence)
+
+
+class _Subscriber:
+    def __init__(self, queue_size: int):
+        self.queue: "asyncio.Queue[Optional[GroupEvent]]" = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def close(self):
+        """ストリームを終わらせる（クライアントは再接続して resync を受け取る）"""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class _GroupChannel:
+    """このワーカーで購読中の1グループの状態
+
+    連番と履歴は購読を始めた時点のエポックに属する。購読し直すとエポックが変わり、
+    古いエポックの Last-Event-ID で再接続したクライアントには resync を送る。
+    """
+
+    def __init__(self, history_size: int):
+        self.epoch = uuid.uuid4().hex[:8]
+        self.last_id = 0
+        self.history: Deque[GroupEvent] = deque(maxlen=history_size)
+        self.subscribers: Set[_Subscriber] = set()
+        self.ready = asyncio.Event()
+        self.closed = False
+        self.relay: Optional[asyncio.Task] = None
+        self.evict_handle: Optional[asyncio.TimerHandle] = None
+
+
+class GroupEventBus:
+    """グループごとのイベント配信
+
+    イベントは pub/sub のグループ別チャンネルに publish し、各ワーカーは SSE 接続中の
+    クライアントがいるグループだけを購読して手元の接続に転送する（どのワーカーで
+    発行されても全ワーカーの接続に届く）。受信したイベントにはグループ単位の連番IDを振り、
+    直近の履歴をリングバッファに残す。再接続時は Last-Event-ID 以降の履歴を再送し、
+    履歴から外れている場合はクライアントに全体の再取得（resync）を促す。
+    接続がなくなったグループは idle_ttl_seconds 後に購読をやめて状態を破棄する。
+    """
+
+    def __init__(
+        self,
+        backend: PubSubBackend,
+        history_size: int = 200,
+        queue_size: int = 100,
+        heartbeat_seconds: float = 15,
+        idle_ttl_seconds: float = 300,
+        channel_prefix: str = "group_events:"
+    ):
+        self.backend = backend
+        self.history_size = history_size
+        self.queue_size = queue_size
+        self.heartbeat_seconds = heartbeat_seconds
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.channel_prefix = channel_prefix
+        self._channels: Dict[str, _GroupChannel] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.published = 0
+        self.dropped = 0
+        self.evicted = 0
+
+    def start(self):
+        """イベントループを記録（アプリ起動時に呼び出す）"""
+        self._loop = asyncio.get_running_loop()
+
+    async def stop(self):
+        channels = list(self._channels.values())
+        for channel in channels:
+            if channel.relay is not None:
+                channel.relay.cancel()
+        await asyncio.gather(*(c.relay for c in channels if c.relay is not None), return_exceptions=True)
+        self._channels = {}
+
+    def _channel_name(self, group_id: str) -> str:
+        return f"{self.channel_prefix}{group_id}"
+
+    def publish(self, group_id: str, event: str, data: Dict[str, Any]):
+        """イベントを発行（スレッドプールで動く同期ハンドラからも呼び出せる）"""
+        if self._loop is None:
+            logger.debug("Group event bus is not started; skipped publishing")
+            return
+        future = asyncio.run_coroutine_threadsafe(
+            self.backend.publish(self._channel_name(group_id), {"event": event, "data": data}), self._loop
+        )
+        future.add_done_callback(self._log_publish_error)
+        self.published += 1
+
+    def _log_publish_error(self, future):
+        if future.exception() is not None:
+            logger.error(f"Failed to publish group event: {future.exception()!r}")
+
+    def _open(self, group_id: str) -> _GroupChannel:
+        """グループの購読を取得（なければ作成し、購読はリレータスク内で始める）"""
+        channel = self._channels.get(group_id)
+        if channel is None:
+            # 待ち合わせ中の同時接続が二重に購読しないよう、先に登録してから購読する
+            channel = _GroupChannel(self.history_size)
+            self._channels[group_id] = channel
+            channel.relay = asyncio.create_task(self._relay(group_id, channel))
+        elif channel.evict_handle is not None:
+            channel.evict_handle.cancel()
+            channel.evict_handle = None
+        return channel
+
+    async def _relay(self, group_id: str, channel: _GroupChannel):
+        subscription: Optional[Subscription] = None
+        try:
+            subscription = await self.backend.subscribe(self._channel_name(group_id))
+            channel.ready.set()
+            async for message in subscription:
+                self._append(channel, message["event"], message["data"])
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Group event relay for group {group_id} stopped: {e!r}")
+        finally:
+            self._close(group_id, channel)
+            if subscription is not None:
+                await subscription.close()
+
+    def _append(self, channel: _GroupChannel, event: str, data: Dict[str, Any]):
+        channel.last_id += 1
+        group_event = GroupEvent(channel.epoch, channel.last_id, event, data)
+        channel.history.append(group_event)
+        for subscriber in channel.subscribers:
+            try:
+                subscriber.queue.put_nowait(group_event)
+            except asyncio.QueueFull:
+                # 読み出しが追いつかない接続は再取得させる
+                subscriber.overflowed = True
+                self.dropped += 1
+
+    def _close(self, group_id: str, channel: _GroupChannel):
+        """購読の終了（接続中のストリームも終わらせ、再接続時に購読し直させる）"""
+        channel.closed = True
+        channel.ready.set()
+        if self._channels.get(group_id) is channel:
+            del self._channels[group_id]
+        for subscriber in channel.subscribers:
+            subscriber.close()
+
+    def _evict_if_idle(self, group_id: str, channel: _GroupChannel):
+        channel.evict_handle = None
+        if channel.subscribers or self._channels.get(group_id) is not channel:
+            return
+        self.evicted += 1
+        if channel.relay is not None:
+            channel.relay.cancel()
+
+    def _replay(self, channel: _GroupChannel, last_event_id: Optional[str]) -> Optional[List[GroupEvent]]:
+        """Last-Event-ID 以降の履歴（履歴で埋められない場合は None）"""
+        if last_event_id is None:
+            return []
+        parsed = parse_event_id(last_event_id)
+        if parsed is None or parsed[0] != channel.epoch or parsed[1] > channel.last_id:
+            # 別のワーカー・購読し直し・サーバー再起動などで連番がつながらない
+            return None
+        last_id = parsed[1]
+        if last_id == channel.last_id:
+            return []
+        if not channel.history or channel.history[0].id > last_id + 1:
+            return None
+        return [event for event in channel.history if event.id > last_id]
+
+    async def stream(
+        self,
+        group_id: str,
+        last_event_id: Optional[str],
+        is_disconnected: Callable[[], Awaitable[bool]]
+    ) -> AsyncIterator[str]:
+        """SSEとして送る文字列を順に返す（一定間隔でハートビートを送る）"""
+        self._loop = self._loop or asyncio.get_running_loop()
+        channel = self._open(group_id)
+        subscriber = _Subscriber(self.queue_size)
+        channel.subscribers.add(subscriber)
+
+        try:
+            # 接続直後にクライアントの再接続間隔を指定
+            yield f"retry: {RECONNECT_MILLISECONDS}\n\n"
+
+            # 購読が始まってから履歴を読む（その間のイベントを取りこぼさない）
+            await channel.ready.wait()
+            if channel.closed:
+                return
+
+            replay = self._replay(channel, last_event_id)
+            if replay is None:
+                yield self._resync_message(channel, group_id)
+            else:
+                for group_event in replay:
+                    yield group_event.encode()
+
+            while True:
+                if subscriber.overflowed:
+                    subscriber.overflowed = False
+                    while not subscriber.queue.empty():
+                        subscriber.queue.get_nowait()
+                    yield self._resync_message(channel, group_id)
+                    continue
+
+                try:
+                    group_event = await asyncio.wait_for(subscriber.queue.get(), timeout=self.heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    if await is_disconnected():
+                        break
+                    yield ": heartbeat\n\n"
+                    continue
+
+                if group_event is None:
+                    break  # 購読が終了した
+                if replay and group_event.id <= replay[-1].id:
+                    continue  # 再送済み
+                yield group_event.encode()
+        finally:
+            channel.subscribers.discard(subscriber)
+            if not channel.subscribers and not channel.closed:
+                channel.evict_handle = asyncio.get_running_loop().call_later(
+                    self.idle_ttl_seconds, self._evict_if_idle, group_id, channel
+                )
+
+    def _resync_message(self, channel: _GroupChannel, group_id: str) -> str:
+        return GroupEvent(channel.epoch, channel.last_id, "resync", {"group_id": group_id}).encode()
+
+    def get_stats(self) -> Dict[str, Any]:
+        channels = list(self._channels.values())
+        return {
+            "backend": self.backend.name,
+            "groups": len(channels),
+            "subscribers": sum(len(channel.subscribers) for channel in channels),
+            "published": self.published,
+            "dropped": self.dropped,
+            "evicted": self.evicted
+        }
+
+
+# グローバルインスタンス
+group_events = GroupEventBus(
+    pubsub,
+    history_size=settings.GROUP_EVENTS_HISTORY_SIZE,
+    queue_size=settings.GROUP_EVENTS_QUEUE_SIZE,
+    heartbeat_seconds=settings.GROUP_EVENTS_HEARTBEAT_SECONDS,
+    idle_ttl_seconds=settings.GROUP_EVENTS_IDLE_TTL_SECONDS
+)
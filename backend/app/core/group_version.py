@@ -0,0 +1,222 @@
+import asyncio
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .config import settings
+from ..db.database import SessionLocal
+from ..models.group import Group, group_members
+
+# ETag付きのレスポンスは毎回再検証させる（変わっていなければ304で本体を送らない）
+REVALIDATE_CACHE_CONTROL = "no-cache"
+# 作成後に内容が変わらないリソース
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def bump_group_version(db: Session, group_id: str):
+    """グループのバージョンを進める（グループに影響する書き込みと同じトランザクション内で呼ぶ）"""
+    db.query(Group).filter(Group.group_id == group_id).update(
+        {Group.version: Group.version + 1},
+        synchronize_session=False
+    )
+    # commit後に長ポーリング中のリクエストを起こす
+    db.info.setdefault("bumped_group_ids", set()).add(group_id)
+
+
+def bump_user_groups_version(db: Session, user_id: str):
+    """ユーザーが所属する全グループのバージョンを進める（ニックネーム変更など）"""
+    group_ids = [
+        group_id for (group_id,) in
+        db.query(group_members.c.group_id).filter(group_members.c.user_id == user_id)
+    ]
+    if not group_ids:
+        return
+    db.query(Group).filter(Group.group_id.in_(group_ids)).update(
+        {Group.version: Group.version + 1},
+        synchronize_session=False
+    )
+    db.info.setdefault("bumped_group_ids", set()).update(group_ids)
+
+
+def make_etag(group_id: str, version: int) -> str:
+    return f'"{group_id}-{version}"'
+
+
+def group_etag(db: Session, group_id: str) -> Optional[str]:
+    """グループの現在のバージョンからETagを作る（グループがなければ None）"""
+    version = db.query(Group.version).filter(Group.group_id == group_id).scalar()
+    if version is None:
+        return None
+    return make_etag(group_id, version)
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match がETagと一致するか（弱い比較）"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(
+        status_code=304,
+        headers={"ETag": etag, "Cache-Control": REVALIDATE_CACHE_CONTROL}
+    )
+
+
+def set_etag(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = REVALIDATE_CACHE_CONTROL
+
+
+def read_group_version(group_id: str) -> Optional[int]:
+    """グループの現在のバージョン（DBセッションは読み取りの間だけ使う）"""
+    db = SessionLocal()
+    try:
+        return db.query(Group.version).filter(Group.group_id == group_id).scalar()
+    finally:
+        db.close()
+
+
+class GroupVersionWatcher:
+    """グループのバージョン更新を待つ長ポーリング用の通知
+
+    待機中のリクエストはイベントを待つだけで、DBセッションもスレッドも持たない。
+    同じプロセスでのcommitは即座に通知され、他のワーカー・ノードでの更新は
+    recheck_seconds ごとのバージョン再確認で検知する。
+    """
+
+    def __init__(self, recheck_seconds: float = 5):
+        self.recheck_seconds = recheck_seconds
+        self._events: Dict[str, asyncio.Event] = {}
+        self._waiters: Dict[str, int] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.notified = 0
+        self.changed = 0
+        self.timed_out = 0
+
+    def notify(self, group_id: str):
+        """バージョンが進んだことを通知（commit後にどのスレッドから呼んでもよい）"""
+        if self._loop is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._wake, group_id)
+
+    def _wake(self, group_id: str):
+        event = self._events.pop(group_id, None)
+        if event is not None:
+            self.notified += 1
+            event.set()
+
+    async def wait_for_change(self, group_id: str, since_version: int, timeout: float) -> Optional[int]:
+        """バージョンが since_version を超えるか timeout 秒経つまで待ち、その時点のバージョンを返す"""
+        self._loop = asyncio.get_running_loop()
+        deadline = self._loop.time() + timeout
+        self._waiters[group_id] = self._waiters.get(group_id, 0) + 1
+        try:
+            while True:
+                # 読み取りより先に待機イベントを用意し、その間の更新を取りこぼさない
+                event = self._events.setdefault(group_id, asyncio.Event())
+                version = await asyncio.to_thread(read_group_version, group_id)
+                if version is None:
+                    return None
+                if version > since_version:
+                    self.changed += 1
+                    return version
+
+                remaining = deadline - self._loop.time()
+                if remaining <= 0:
+                    self.timed_out += 1
+                    return version
+                try:
+                    await asyncio.wait_for(event.wait(), timeout=min(remaining, self.recheck_seconds))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._waiters[group_id] -= 1
+            if not self._waiters[group_id]:
+                del self._waiters[group_id]
+                self._events.pop(group_id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "waiting": sum(self._waiters.values()),
+            "notified": self.notified,
+            "changed": self.changed,
+            "timed_out": self.timed_out
+        }
+
+
+# グローバルインスタンス
+group_version_watcher = GroupVersionWatcher(recheck_seconds=settings.LONG_POLL_RECHECK_SECONDS)
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_bumped_groups(session: Session):
+    for group_id in session.info.pop("bumped_group_ids", ()):
+        group_version_watcher.notify(group_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_bumped_groups(session: Session):
+    session.info.pop("bumped_group_ids", None)
+
+
+def _load_group_state(
+    group_id: str,
+    loader: Callable[[Session, str], Any],
+    request: Optional[Request]
+) -> Tuple[int, Optional[Any]]:
+    """バージョンと状態を1つのセッションで読む（ETagが一致すれば状態は読まない）"""
+    db = SessionLocal()
+    try:
+        version = db.query(Group.version).filter(Group.group_id == group_id).scalar()
+        if version is None:
+            raise HTTPException(status_code=404, detail="Group not found")
+        if request is not None and etag_matches(request, make_etag(group_id, version)):
+            return version, None
+        return version, loader(db, group_id)
+    finally:
+        db.close()
+
+
+def _versioned(response: Response, group_id: str, version: int) -> Response:
+    response.headers["ETag"] = make_etag(group_id, version)
+    response.headers["Cache-Control"] = REVALIDATE_CACHE_CONTROL
+    response.headers["X-Group-Version"] = str(version)
+    return response
+
+
+async def read_group_state(
+    request: Request,
+    response: Response,
+    group_id: str,
+    loader: Callable[[Session, str], Any],
+    since_version: Optional[int] = None,
+    timeout: float = 25
+) -> Any:
+    """ETag付きでグループの状態を返す
+
+    since_version を指定すると、バージョンがそれより進むまで（最大 timeout 秒）
+    応答を保留する長ポーリングになる。変化がないまま時間切れになった場合は304を返す。
+    """
+    if since_version is not None:
+        timeout = min(max(timeout, 0), settings.LONG_POLL_MAX_TIMEOUT_SECONDS)
+        version = await group_version_watcher.wait_for_change(group_id, since_version, timeout)
+        if version is None:
+            raise HTTPException(status_code=404, detail="Group not found")
+        if version <= since_version:
+            return _versioned(Response(status_code=304), group_id, version)
+
+    version, state = await asyncio.to_thread(
+        _load_group_state, group_id, loader, request if since_version is None else None
+    )
+    if state is None:
+        return _versioned(Response(status_code=304), group_id, version)
+    _versioned(response, group_id, version)
+    return state
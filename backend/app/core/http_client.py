@@ -0,0 +1,124 @@
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+import httpx
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PooledAsyncClient:
+    """外部API呼び出し用の共有非同期HTTPクライアント
+
+    keep-alive付きのコネクションプールを全プロバイダで共有し、
+    ホストごとの同時接続数をセマフォで制限する。
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        max_connections_per_host: int = 10,
+        keepalive_expiry: float = 30.0,
+        connect_timeout: float = 3.0,
+        timeout: float = 10.0
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.max_connections_per_host = max_connections_per_host
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._host_in_flight: Dict[str, int] = {}
+
+        # 統計情報
+        self._requests_total = 0
+        self._errors_total = 0
+        self._waiting_for_host = 0
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """クライアントを遅延生成（イベントループ起動後に作成する）"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                limits=self.limits,
+                timeout=self.timeout,
+                headers={"Accept": "application/json"}
+            )
+        return self._client
+
+    def _get_host_semaphore(self, host: str) -> asyncio.Semaphore:
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_connections_per_host)
+            self._host_semaphores[host] = semaphore
+        return semaphore
+
+    async def get(self, url: str, params: Optional[Dict[str, Any]] = None, **kwargs) -> httpx.Response:
+        """GETリクエストを送信（ホスト単位の同時接続数制限付き）"""
+        host = httpx.URL(url).host
+        semaphore = self._get_host_semaphore(host)
+
+        self._waiting_for_host += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self._waiting_for_host -= 1
+
+        self._requests_total += 1
+        self._host_in_flight[host] = self._host_in_flight.get(host, 0) + 1
+        try:
+            return await self._get_client().get(url, params=params, **kwargs)
+        except httpx.HTTPError:
+            self._errors_total += 1
+            raise
+        finally:
+            self._host_in_flight[host] -= 1
+            semaphore.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """コネクションプールの統計情報を取得"""
+        connections = []
+        if self._client is not None and not self._client.is_closed:
+            try:
+                connections = list(self._client._transport._pool.connections)
+            except AttributeError:
+                connections = []
+
+        idle = sum(1 for conn in connections if conn.is_idle())
+
+        return {
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "max_connections_per_host": self.max_connections_per_host,
+            "open_connections": len(connections),
+            "idle_connections": idle,
+            "active_connections": len(connections) - idle,
+            "requests_total": self._requests_total,
+            "errors_total": self._errors_total,
+            "waiting_for_host_slot": self._waiting_for_host,
+            "in_flight_by_host": {
+                host: count for host, count in self._host_in_flight.items() if count > 0
+            }
+        }
+
+    async def aclose(self):
+        """コネクションプールを閉じる"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+
+# グローバルインスタンス
+http_client = PooledAsyncClient(
+    max_connections=settings.HTTP_MAX_CONNECTIONS,
+    max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    max_connections_per_host=settings.HTTP_MAX_CONNECTIONS_PER_HOST,
+    keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+    connect_timeout=settings.HTTP_CONNECT_TIMEOUT,
+    timeout=settings.HTTP_TIMEOUT
+)
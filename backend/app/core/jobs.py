@@ -0,0 +1,340 @@
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .config import settings
+from ..db.database import AsyncSessionLocal, SessionLocal, unit_of_work
+from ..models.job import Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+# ジョブハンドラ: (非同期DBセッション, payload) -> 結果（JSONにできる辞書）
+# ハンドラはイベントループ上で動くため、DBアクセスは AsyncSession で行う
+JobHandler = Callable[[AsyncSession, Dict[str, Any]], Awaitable[Optional[Dict[str, Any]]]]
+
+
+class JobDeferred(Exception):
+    """先に終わるべきジョブが残っているため、試行回数を消費せずに後で実行し直す"""
+
+    def __init__(self, reason: str, delay: Optional[float] = None):
+        super().__init__(reason)
+        self.delay = delay
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _loads(value: Optional[str]) -> Any:
+    if not value:
+        return None
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def serialize_job(job: Job) -> Dict[str, Any]:
+    """ジョブ状態をAPIレスポンス用の辞書に変換"""
+    return {
+        "job_id": job.job_id,
+        "job_type": job.job_type,
+        "status": job.status.value,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "result": _loads(job.result),
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "updated_at": job.updated_at.isoformat() if job.updated_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None
+    }
+
+
+class JobQueue:
+    """DBテーブルを使った永続ジョブキュー
+
+    ジョブは jobs テーブルに保存され、ワーカーコルーチンが取り出して実行する。
+    取り出したジョブには可視性タイムアウトを設定し、ワーカーが落ちて期限が
+    過ぎたジョブは別のワーカーが再実行する。失敗時は指数バックオフでリトライする。
+    """
+
+    def __init__(
+        self,
+        poll_interval: float = 1.0,
+        visibility_timeout: float = 60,
+        max_attempts: int = 3,
+        retry_backoff: float = 2.0
+    ):
+        self.poll_interval = poll_interval
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self._handlers: Dict[str, JobHandler] = {}
+        self._workers: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.succeeded = 0
+        self.failed = 0
+        self.retried = 0
+        self.reclaimed = 0
+        self.deferred = 0
+
+    def handler(self, job_type: str) -> Callable[[JobHandler], JobHandler]:
+        """ジョブ種別ごとのハンドラを登録するデコレータ"""
+        def register(func: JobHandler) -> JobHandler:
+            self._handlers[job_type] = func
+            return func
+        return register
+
+    def enqueue(
+        self,
+        db: Session,
+        job_type: str,
+        payload: Dict[str, Any],
+        dedupe_key: Optional[str] = None,
+        max_attempts: Optional[int] = None
+    ) -> Job:
+        """ジョブを登録（同じ dedupe_key の未完了ジョブがあればそれを返す）"""
+        if dedupe_key:
+            existing = db.query(Job).filter(
+                Job.dedupe_key == dedupe_key,
+                Job.status.in_([JobStatus.pending, JobStatus.running])
+            ).first()
+            if existing:
+                return existing
+
+        job = Job(
+            job_type=job_type,
+            status=JobStatus.pending,
+            dedupe_key=dedupe_key,
+            payload=json.dumps(payload, ensure_ascii=False),
+            max_attempts=max_attempts or self.max_attempts,
+            run_after=_now()
+        )
+        with unit_of_work(db):
+            db.add(job)
+
+        self._notify()
+        return job
+
+    async def has_unfinished(self, db: AsyncSession, dedupe_keys: List[str]) -> bool:
+        """指定した dedupe_key のうち未完了（待機中・実行中）のジョブがあるか"""
+        if not dedupe_keys:
+            return False
+        job_id = await db.scalar(
+            select(Job.job_id).where(
+                Job.dedupe_key.in_(dedupe_keys),
+                Job.status.in_([JobStatus.pending, JobStatus.running])
+            ).limit(1)
+        )
+        return job_id is not None
+
+    def _notify(self):
+        """待機中のワーカーを起こす（スレッドプールから呼ばれても安全）"""
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def start(self, workers: int):
+        """ワーカーを起動（アプリ起動時に呼び出す）"""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        for index in range(workers):
+            self._workers.append(asyncio.create_task(self._worker(index)))
+        logger.info(f"Started {workers} job workers")
+
+    async def stop(self):
+        """ワーカーを停止（実行中のジョブは可視性タイムアウト後に再実行される）"""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def _worker(self, index: int):
+        while True:
+            try:
+                job = await asyncio.to_thread(self._claim)
+            except Exception as e:
+                logger.error(f"Job worker {index} failed to claim a job: {e}")
+                job = None
+
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._run(job)
+
+    def _claimable(self, now: datetime):
+        return or_(
+            and_(Job.status == JobStatus.pending, Job.run_after <= now),
+            and_(Job.status == JobStatus.running, Job.locked_until < now)
+        )
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        """実行可能なジョブを1件確保する（条件付きUPDATEで他ワーカーとの重複を防ぐ）"""
+        db = SessionLocal()
+        try:
+            now = _now()
+            candidates = db.query(Job.job_id, Job.status).filter(
+                self._claimable(now)
+            ).order_by(Job.run_after).limit(10).all()
+
+            for job_id, previous_status in candidates:
+                claimed = db.query(Job).filter(
+                    Job.job_id == job_id,
+                    self._claimable(now)
+                ).update(
+                    {
+                        Job.status: JobStatus.running,
+                        Job.attempts: Job.attempts + 1,
+                        Job.locked_until: now + timedelta(seconds=self.visibility_timeout),
+                        Job.started_at: now
+                    },
+                    synchronize_session=False
+                )
+                db.commit()
+                if not claimed:
+                    continue
+
+                if previous_status == JobStatus.running:
+                    self.reclaimed += 1
+                    logger.warning(f"Reclaimed job {job_id} after visibility timeout")
+
+                job = db.get(Job, job_id)
+                return {
+                    "job_id": job.job_id,
+                    "job_type": job.job_type,
+                    "payload": _loads(job.payload) or {},
+                    "attempts": job.attempts,
+                    "max_attempts": job.max_attempts
+                }
+            return None
+        finally:
+            db.close()
+
+    async def _run(self, job: Dict[str, Any]):
+        handler = self._handlers.get(job["job_type"])
+        if handler is None:
+            await asyncio.to_thread(self._finish_failed, job, f"Unknown job type: {job['job_type']}", False)
+            return
+        if job["attempts"] > job["max_attempts"]:
+            # 可視性タイムアウトで回収されたが、試行回数を使い切っている
+            await asyncio.to_thread(self._finish_failed, job, "Job exceeded max attempts", False)
+            return
+
+        async with AsyncSessionLocal() as db:
+            try:
+                # 可視性タイムアウトを過ぎると別ワーカーに回収されるため、それまでに打ち切る
+                result = await asyncio.wait_for(handler(db, job["payload"]), timeout=self.visibility_timeout)
+            except JobDeferred as e:
+                await db.rollback()
+                logger.info(f"Job {job['job_id']} ({job['job_type']}) deferred: {e}")
+                await asyncio.to_thread(self._defer, job, e.delay if e.delay is not None else self.poll_interval)
+                return
+            except Exception as e:
+                await db.rollback()
+                logger.error(f"Job {job['job_id']} ({job['job_type']}) failed on attempt {job['attempts']}: {e!r}")
+                await asyncio.to_thread(self._finish_failed, job, str(e) or repr(e), True)
+                return
+
+        await asyncio.to_thread(self._finish_succeeded, job, result)
+
+    def _update_own_job(self, db: Session, job: Dict[str, Any], values: Dict[Any, Any]) -> bool:
+        """自分が確保した試行のままであれば更新する（回収済みなら何もしない）"""
+        updated = db.query(Job).filter(
+            Job.job_id == job["job_id"],
+            Job.status == JobStatus.running,
+            Job.attempts == job["attempts"]
+        ).update(values, synchronize_session=False)
+        db.commit()
+        return bool(updated)
+
+    def _finish_succeeded(self, job: Dict[str, Any], result: Optional[Dict[str, Any]]):
+        db = SessionLocal()
+        try:
+            if self._update_own_job(db, job, {
+                Job.status: JobStatus.succeeded,
+                Job.result: json.dumps(result, ensure_ascii=False, default=str) if result is not None else None,
+                Job.error: None,
+                Job.locked_until: None,
+                Job.finished_at: _now()
+            }):
+                self.succeeded += 1
+        finally:
+            db.close()
+
+    def _defer(self, job: Dict[str, Any], delay: float):
+        db = SessionLocal()
+        try:
+            if self._update_own_job(db, job, {
+                Job.status: JobStatus.pending,
+                Job.attempts: Job.attempts - 1,
+                Job.locked_until: None,
+                Job.run_after: _now() + timedelta(seconds=delay)
+            }):
+                self.deferred += 1
+        finally:
+            db.close()
+
+    def _finish_failed(self, job: Dict[str, Any], error: str, retryable: bool):
+        db = SessionLocal()
+        try:
+            now = _now()
+            if retryable and job["attempts"] < job["max_attempts"]:
+                delay = self.retry_backoff * (2 ** (job["attempts"] - 1))
+                if self._update_own_job(db, job, {
+                    Job.status: JobStatus.pending,
+                    Job.error: error,
+                    Job.locked_until: None,
+                    Job.run_after: now + timedelta(seconds=delay)
+                }):
+                    self.retried += 1
+                return
+
+            if self._update_own_job(db, job, {
+                Job.status: JobStatus.failed,
+                Job.error: error,
+                Job.locked_until: None,
+                Job.finished_at: now
+            }):
+                self.failed += 1
+        finally:
+            db.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = {
+            "workers": len(self._workers),
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "retried": self.retried,
+            "reclaimed": self.reclaimed,
+            "deferred": self.deferred
+        }
+        db = SessionLocal()
+        try:
+            for job_status in (JobStatus.pending, JobStatus.running):
+                stats[job_status.value] = db.query(Job).filter(Job.status == job_status).count()
+        except Exception as e:
+            logger.warning(f"Failed to count jobs: {e}")
+        finally:
+            db.close()
+        return stats
+
+
+# グローバルインスタンス
+job_queue = JobQueue(
+    poll_interval=settings.JOB_POLL_INTERVAL_SECONDS,
+    visibility_timeout=settings.JOB_VISIBILITY_TIMEOUT_SECONDS,
+    max_attempts=settings.JOB_MAX_ATTEMPTS,
+    retry_backoff=settings.JOB_RETRY_BACKOFF_SECONDS
+)
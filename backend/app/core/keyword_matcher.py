@@ -0,0 +1,98 @@
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Tuple
+
+KANJI_DIGITS = {"〇": 0, "零": 0, "一": 1, "二": 2, "三": 3, "四": 4, "五": 5, "六": 6, "七": 7, "八": 8, "九": 9}
+KANJI_UNITS = {"十": 10, "百": 100, "千": 1000}
+KANJI_MYRIAD = "万"
+
+# 漢数字（算用数字との混在を含む）の並び
+_NUMERAL_RUN = re.compile(r"[0-9〇零一二三四五六七八九十百千万]+")
+# 桁区切りのカンマ（3,000円 → 3000円）
+_DIGIT_COMMA = re.compile(r"(?<=\d),(?=\d{3})")
+
+
+def kanji_to_int(numeral: str) -> int:
+    """漢数字・算用数字混じりの数を整数に変換（三千 → 3000, 1万5千 → 15000）"""
+    total = section = current = 0
+    for char in numeral:
+        if char.isdigit():
+            current = current * 10 + int(char)
+        elif char in KANJI_DIGITS:
+            current = current * 10 + KANJI_DIGITS[char]
+        elif char in KANJI_UNITS:
+            section += (current or 1) * KANJI_UNITS[char]
+            current = 0
+        elif char == KANJI_MYRIAD:
+            total += (section + current or 1) * 10000
+            section = current = 0
+    return total + section + current
+
+
+def _replace_numeral(match: "re.Match[str]") -> str:
+    numeral = match.group(0)
+    if numeral.isdigit():
+        return numeral
+    followed_by_yen = match.string.startswith("円", match.end())
+    has_unit = any(char in KANJI_UNITS or char == KANJI_MYRIAD for char in numeral)
+    # 「一緒」「十分」のような単語は数にしない（円が続くか、単位付きで2文字以上のものだけ変換）
+    if followed_by_yen or (has_unit and len(numeral) >= 2):
+        return str(kanji_to_int(numeral))
+    return numeral
+
+
+def normalize_text(text: str) -> str:
+    """照合用にテキストを正規化（全角半角統一・小文字化・桁区切り除去・漢数字を算用数字に）"""
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = _DIGIT_COMMA.sub("", text)
+    return _NUMERAL_RUN.sub(_replace_numeral, text)
+
+
+class KeywordMatcher:
+    """複数スロットのキーワードを1回の走査でまとめて照合する
+
+    table は {スロット: {ラベル: [キーワード, ...]}}。全キーワードを1つの正規表現
+    （先読みの選択）にコンパイルし、テキストの各位置で一致したキーワードから
+    スロットごとのラベルの集合を返す。部分文字列として含まれていれば一致とみなす。
+    """
+
+    def __init__(self, table: Mapping[str, Mapping[str, Iterable[str]]]):
+        self.slots = tuple(table)
+        self._labels: Dict[str, List[Tuple[str, str]]] = {}
+        for slot, labels in table.items():
+            for label, keywords in labels.items():
+                for keyword in keywords:
+                    self._labels.setdefault(normalize_text(keyword), []).append((slot, label))
+        # 長いキーワードを先に試し、同じ位置から始まる短いキーワードは長い方のラベルで代表させる
+        alternatives = sorted(self._labels, key=len, reverse=True)
+        self._pattern = re.compile("(?=(" + "|".join(re.escape(keyword) for keyword in alternatives) + "))")
+        # 同じ位置で長いキーワードに隠れる短いキーワード
+        self._shadowed = {
+            keyword: [other for other in alternatives if other != keyword and keyword.startswith(other)]
+            for keyword in alternatives
+        }
+        self.scan = lru_cache(maxsize=4096)(self._scan)
+
+    def _scan(self, text: str) -> Dict[str, FrozenSet[str]]:
+        hits: Dict[str, set] = {slot: set() for slot in self.slots}
+        for match in self._pattern.finditer(normalize_text(text)):
+            keyword = match.group(1)
+            for matched in (keyword, *self._shadowed[keyword]):
+                for slot, label in self._labels[matched]:
+                    hits[slot].add(label)
+        return {slot: frozenset(labels) for slot, labels in hits.items()}
+
+    def scan_all(self, texts: Iterable[str]) -> Dict[str, FrozenSet[str]]:
+        """複数テキストのヒットを合算（テキストごとの結果はキャッシュされる）"""
+        hits: Dict[str, FrozenSet[str]] = {slot: frozenset() for slot in self.slots}
+        for text in texts:
+            for slot, labels in self.scan(text).items():
+                if labels:
+                    hits[slot] = hits[slot] | labels
+        return hits
+
+
+def first_hit(labels: FrozenSet[str], order: Iterable[str]) -> str:
+    """ヒットしたラベルのうち order で最初のもの（なければ空文字）"""
+    return next((label for label in order if label in labels), "")
@@ -0,0 +1,43 @@
+import hashlib
+import json
+import unicodedata
+from typing import Dict, List
+
+from .config import settings
+from .search_cache import MemoryTTLCache, SQLiteTTLCache, TieredSearchCache
+
+
+def normalize_messages(messages: List[Dict[str, str]]) -> List[List[str]]:
+    """会話履歴を正規化（全角半角統一・空白の連続を1つにまとめる）"""
+    return [
+        [msg["role"], " ".join(unicodedata.normalize("NFKC", msg["content"]).split())]
+        for msg in messages
+    ]
+
+
+def make_llm_cache_key(kind: str, model: str, prompt_version: str, messages: List[Dict[str, str]]) -> str:
+    """正規化した会話履歴・モデル名・プロンプトのバージョンからキャッシュキーを生成
+
+    messages にはモデルへの入力になる発言だけを渡す（生成のたびに変わるAIの応答を含めると
+    同じ内容の会話でもキーが一致しない）。モデルやプロンプトを変えると別のキーになり、
+    古い結果は使われずにLRUで追い出される。
+    """
+    payload = json.dumps([model, prompt_version, normalize_messages(messages)], ensure_ascii=False)
+    digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    return f"{kind}:{digest}"
+
+
+# グローバルインスタンス（同じ会話内容へのLLM応答を使い回す）
+llm_cache = TieredSearchCache(
+    memory=MemoryTTLCache(
+        max_entries=settings.LLM_CACHE_MEMORY_MAX_ENTRIES,
+        ttl_seconds=settings.LLM_CACHE_TTL_SECONDS
+    ),
+    shared=SQLiteTTLCache(
+        path=settings.SEARCH_CACHE_PATH,
+        max_entries=settings.LLM_CACHE_SHARED_MAX_ENTRIES,
+        ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+        table="llm_cache_entries",
+        touch_interval_seconds=settings.SEARCH_CACHE_TOUCH_INTERVAL_SECONDS
+    ) if settings.SEARCH_CACHE_PATH else None
+)
@@ -0,0 +1,406 @@
+import json
+import logging
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# 料理ジャンル: 好みのジャンル名 -> 店舗ジャンル・説明文に含まれるキーワード
+CUISINE_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "和食": ("和食", "寿司", "鮨", "天ぷら", "懐石", "割烹", "居酒屋", "日本料理", "そば", "うどん", "海鮮"),
+    "イタリアン": ("イタリアン", "イタリア", "パスタ", "ピザ", "ピッツァ"),
+    "フレンチ": ("フレンチ", "フランス", "ビストロ"),
+    "中華": ("中華", "中国料理", "餃子", "点心"),
+    "韓国料理": ("韓国", "サムギョプサル", "ビビンバ"),
+    "タイ料理": ("タイ", "アジア・エスニック", "エスニック"),
+    "洋食": ("洋食", "ステーキ", "ハンバーグ", "ダイニングバー"),
+    "焼肉": ("焼肉", "ホルモン"),
+}
+
+# 雰囲気: 好みの雰囲気 -> 店舗側のキーワード
+ATMOSPHERE_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "ロマンチック": ("夜景", "デート", "記念日", "ロマンチック", "フレンチ", "イタリアン"),
+    "フォーマル": ("個室", "接待", "懐石", "割烹", "会席", "コース"),
+    "ファミリー向け": ("お子様連れ", "ファミリー", "家族", "洋食", "焼肉"),
+    "カジュアル・グループ向け": ("居酒屋", "飲み放題", "食べ放題", "宴会", "ダイニングバー", "カラオケ"),
+    "落ち着いた大人の空間": ("隠れ家", "落ち着", "バー", "大人", "割烹"),
+}
+# 好みの雰囲気の表記ゆれ（"カジュアル" など）を上記のキーに寄せる
+ATMOSPHERE_ALIASES: Dict[str, str] = {
+    "ロマンチック": "ロマンチック",
+    "デート": "ロマンチック",
+    "フォーマル": "フォーマル",
+    "接待": "フォーマル",
+    "ファミリー": "ファミリー向け",
+    "家族": "ファミリー向け",
+    "カジュアル": "カジュアル・グループ向け",
+    "グループ": "カジュアル・グループ向け",
+    "にぎやか": "カジュアル・グループ向け",
+    "落ち着": "落ち着いた大人の空間",
+    "静か": "落ち着いた大人の空間",
+    "大人": "落ち着いた大人の空間",
+}
+
+# 特別な要望 -> 店舗の特徴（HotPepperClient._extract_features のラベル）
+SPECIAL_REQUEST_FEATURES: Dict[str, Tuple[str, ...]] = {
+    "個室希望": ("個室あり",),
+    "禁煙席希望": ("禁煙席",),
+    "眺めの良い席希望": ("夜景がキレイ",),
+    "駐車場あり": ("駐車場あり",),
+    "ベジタリアン対応": ("ベジタリアン", "野菜"),
+    "子供連れ歓迎": ("お子様連れOK",),
+}
+
+# アレルギー・苦手な食材 -> 避けるべき店舗のキーワード
+ALLERGY_CONFLICT_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "魚介類": ("寿司", "鮨", "海鮮", "魚", "刺身", "かに", "カニ", "ふぐ"),
+    "卵": ("オムライス", "親子丼", "卵料理"),
+    "乳製品": ("チーズ", "グラタン"),
+    "ナッツ": ("ナッツ",),
+    "そば": ("そば", "蕎麦"),
+    "辛い物": ("激辛", "四川", "韓国", "タイ", "エスニック", "カレー"),
+}
+
+CUISINES = list(CUISINE_KEYWORDS)
+ATMOSPHERES = list(ATMOSPHERE_KEYWORDS)
+SPECIAL_REQUESTS = list(SPECIAL_REQUEST_FEATURES)
+ALLERGIES = list(ALLERGY_CONFLICT_KEYWORDS)
+
+AGGREGATES = ("mean", "min", "softmin")
+
+# 好みが分からない項目に割り当てる中立スコア
+NEUTRAL_SCORE = 0.5
+
+_NUMBER_PATTERN = re.compile(r"\d+")
+
+
+def _normalize(text: Any) -> str:
+    return unicodedata.normalize("NFKC", str(text or "")).lower()
+
+
+def _as_list(value: Any) -> List[str]:
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [item for item in re.split(r"[、,/・\s]+", value) if item]
+    return [str(item) for item in value if item]
+
+
+def parse_budget_range(text: Any) -> Optional[Tuple[float, float]]:
+    """予算表記（"2000-4000"、"2001～3000円"、"3000円"）を (下限, 上限) に変換"""
+    numbers = [float(n) for n in _NUMBER_PATTERN.findall(_normalize(text).replace(",", ""))]
+    numbers = [n for n in numbers if n >= 100]  # "¥¥" や "1名" などの数字は除外
+    if not numbers:
+        return None
+    if len(numbers) == 1:
+        return numbers[0], numbers[0]
+    return min(numbers[:2]), max(numbers[:2])
+
+
+def parse_preferences_summary(summary: Any) -> Dict[str, Any]:
+    """Interview.preferences_summary（JSON文字列または自由記述）を好みの辞書に変換"""
+    if isinstance(summary, dict):
+        return summary
+    if not summary:
+        return {}
+
+    try:
+        parsed = json.loads(summary)
+        if isinstance(parsed, dict):
+            return parsed
+    except (TypeError, ValueError):
+        pass
+
+    # 自由記述の場合はジャンル名・雰囲気・予算だけ拾う
+    text = _normalize(summary)
+    return {
+        "cuisine_types": [cuisine for cuisine in CUISINES if cuisine in text],
+        "atmosphere": next((alias for alias in ATMOSPHERE_ALIASES if alias in text), ""),
+        "budget": text if parse_budget_range(text) else "",
+    }
+
+
+@dataclass
+class MemberFeatures:
+    """メンバーの好みの特徴行列（行=メンバー）"""
+    cuisine: np.ndarray
+    atmosphere: np.ndarray
+    requests: np.ndarray
+    allergies: np.ndarray
+    budget_low: np.ndarray
+    budget_high: np.ndarray
+    has_budget: np.ndarray
+
+
+@dataclass
+class CandidateFeatures:
+    """候補店舗の特徴行列（行=候補）"""
+    cuisine: np.ndarray
+    atmosphere: np.ndarray
+    requests: np.ndarray
+    allergies: np.ndarray
+    budget_mid: np.ndarray
+    has_budget: np.ndarray
+
+
+def build_member_features(preferences_list: Sequence[Dict[str, Any]]) -> MemberFeatures:
+    """メンバーごとの好みを特徴行列に変換"""
+    m = len(preferences_list)
+    cuisine = np.zeros((m, len(CUISINES)))
+    atmosphere = np.zeros((m, len(ATMOSPHERES)))
+    requests = np.zeros((m, len(SPECIAL_REQUESTS)))
+    allergies = np.zeros((m, len(ALLERGIES)))
+    budget_low = np.zeros(m)
+    budget_high = np.zeros(m)
+    has_budget = np.zeros(m, dtype=bool)
+
+    for i, preferences in enumerate(preferences_list):
+        for item in _as_list(preferences.get("cuisine_types")):
+            item = _normalize(item)
+            for j, name in enumerate(CUISINES):
+                if name in item or item in CUISINE_KEYWORDS[name]:
+                    cuisine[i, j] = 1
+
+        atmosphere_text = _normalize(preferences.get("atmosphere"))
+        for alias, target in ATMOSPHERE_ALIASES.items():
+            if alias in atmosphere_text:
+                atmosphere[i, ATMOSPHERES.index(target)] = 1
+
+        request_text = _normalize(" ".join(_as_list(preferences.get("special_requests"))))
+        for j, request in enumerate(SPECIAL_REQUESTS):
+            if request in request_text or request.replace("希望", "") in request_text:
+                requests[i, j] = 1
+
+        allergy_text = _normalize(" ".join(_as_list(preferences.get("allergies"))))
+        for j, allergy in enumerate(ALLERGIES):
+            if allergy in allergy_text:
+                allergies[i, j] = 1
+
+        budget = parse_budget_range(preferences.get("budget"))
+        if budget:
+            budget_low[i], budget_high[i] = budget
+            has_budget[i] = True
+
+    return MemberFeatures(cuisine, atmosphere, requests, allergies, budget_low, budget_high, has_budget)
+
+
+def _candidate_text(candidate: Dict[str, Any]) -> str:
+    features = candidate.get("features") or []
+    if isinstance(features, str):
+        try:
+            features = json.loads(features)
+        except ValueError:
+            features = [features]
+    return _normalize(" ".join([
+        str(candidate.get("cuisine_type") or ""),
+        str(candidate.get("name") or ""),
+        str(candidate.get("description") or ""),
+        " ".join(str(feature) for feature in features),
+    ]))
+
+
+def build_candidate_features(candidates: Sequence[Dict[str, Any]]) -> CandidateFeatures:
+    """候補店舗を特徴行列に変換"""
+    n = len(candidates)
+    cuisine = np.zeros((n, len(CUISINES)))
+    atmosphere = np.zeros((n, len(ATMOSPHERES)))
+    requests = np.zeros((n, len(SPECIAL_REQUESTS)))
+    allergies = np.zeros((n, len(ALLERGIES)))
+    budget_mid = np.zeros(n)
+    has_budget = np.zeros(n, dtype=bool)
+
+    for i, candidate in enumerate(candidates):
+        text = _candidate_text(candidate)
+        genre = _normalize(candidate.get("cuisine_type"))
+
+        for j, name in enumerate(CUISINES):
+            if any(_normalize(keyword) in genre for keyword in CUISINE_KEYWORDS[name]):
+                cuisine[i, j] = 1
+        for j, name in enumerate(ATMOSPHERES):
+            if any(_normalize(keyword) in text for keyword in ATMOSPHERE_KEYWORDS[name]):
+                atmosphere[i, j] = 1
+        for j, name in enumerate(SPECIAL_REQUESTS):
+            if any(_normalize(keyword) in text for keyword in SPECIAL_REQUEST_FEATURES[name]):
+                requests[i, j] = 1
+        for j, name in enumerate(ALLERGIES):
+            if any(_normalize(keyword) in text for keyword in ALLERGY_CONFLICT_KEYWORDS[name]):
+                allergies[i, j] = 1
+
+        budget = parse_budget_range(candidate.get("price_range"))
+        if budget:
+            budget_mid[i] = (budget[0] + budget[1]) / 2
+            has_budget[i] = True
+
+    return CandidateFeatures(cuisine, atmosphere, requests, allergies, budget_mid, has_budget)
+
+
+def _overlap_scores(member: np.ndarray, candidate: np.ndarray) -> np.ndarray:
+    """メンバーの希望のうち候補が満たす割合（希望なしは中立）"""
+    wanted = member.sum(axis=1, keepdims=True)
+    matched = member @ candidate.T
+    return np.where(wanted > 0, matched / np.maximum(wanted, 1), NEUTRAL_SCORE)
+
+
+def _budget_scores(members: MemberFeatures, candidates: CandidateFeatures) -> np.ndarray:
+    """予算の適合度（範囲内で1、範囲から外れるほど線形に低下）"""
+    low = members.budget_low[:, None]
+    high = members.budget_high[:, None]
+    mid = candidates.budget_mid[None, :]
+    width = np.maximum(high - low, high * 0.5)
+    width = np.maximum(width, 1)
+    distance = np.maximum(low - mid, 0) + np.maximum(mid - high, 0)
+    scores = np.clip(1 - distance / width, 0, 1)
+    known = members.has_budget[:, None] & candidates.has_budget[None, :]
+    return np.where(known, scores, NEUTRAL_SCORE)
+
+
+def score_matrix(
+    members: MemberFeatures,
+    candidates: CandidateFeatures,
+    weights: Optional[Dict[str, float]] = None
+) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """メンバー×候補のスコア行列（0〜1）と項目別の行列を計算"""
+    weights = weights or settings.MATCH_SCORE_WEIGHTS
+    components = {
+        "cuisine": _overlap_scores(members.cuisine, candidates.cuisine),
+        "budget": _budget_scores(members, candidates),
+        "atmosphere": _overlap_scores(members.atmosphere, candidates.atmosphere),
+        "special_requests": _overlap_scores(members.requests, candidates.requests),
+    }
+    total_weight = sum(weights.get(name, 0) for name in components) or 1
+    scores = sum(weights.get(name, 0) * matrix for name, matrix in components.items()) / total_weight
+
+    # アレルギー・苦手な食材に該当する候補は大きく減点
+    conflicts = (members.allergies @ candidates.allergies.T) > 0
+    components["allergy_conflict"] = conflicts
+    scores = np.where(conflicts, scores * (1 - settings.MATCH_SCORE_ALLERGY_PENALTY), scores)
+    return scores, components
+
+
+def aggregate_scores(scores: np.ndarray, method: str = "mean", temperature: float = 0.1) -> np.ndarray:
+    """メンバー方向にスコアを集約（mean: 平均, min: 最も不満な人, softmin: その中間）"""
+    if scores.shape[0] == 0:
+        return np.full(scores.shape[1], NEUTRAL_SCORE)
+    if method == "min":
+        return scores.min(axis=0)
+    if method == "softmin":
+        # -T * log(mean(exp(-s / T)))。Tが小さいほどminに近づく
+        shifted = -(scores - scores.min(axis=0)) / temperature
+        return scores.min(axis=0) - temperature * np.log(np.exp(shifted).mean(axis=0))
+    return scores.mean(axis=0)
+
+
+def _reason(index: int, components: Dict[str, np.ndarray], members: MemberFeatures, candidates: CandidateFeatures) -> str:
+    member_count = members.cuisine.shape[0]
+    if member_count == 0:
+        return "エリアの人気店から選出しました"
+
+    reasons = []
+    cuisine_fans = int((members.cuisine @ candidates.cuisine[index]).astype(bool).sum())
+    if cuisine_fans:
+        genres = "・".join(name for name, flag in zip(CUISINES, candidates.cuisine[index]) if flag)
+        reasons.append(f"{member_count}人中{cuisine_fans}人の希望ジャンル（{genres}）に合致")
+
+    within_budget = int(((components["budget"][:, index] >= 1) & members.has_budget).sum())
+    if within_budget:
+        if within_budget == int(members.has_budget.sum()):
+            reasons.append("全員の予算内")
+        else:
+            reasons.append(f"{within_budget}人の予算内")
+
+    atmosphere_fans = int((members.atmosphere @ candidates.atmosphere[index]).astype(bool).sum())
+    if atmosphere_fans:
+        reasons.append(f"{atmosphere_fans}人の好みの雰囲気")
+
+    satisfied = [
+        name for name, wanted, offered
+        in zip(SPECIAL_REQUESTS, members.requests.any(axis=0), candidates.requests[index])
+        if wanted and offered
+    ]
+    if satisfied:
+        reasons.append("・".join(satisfied) + "に対応")
+
+    conflicts = int(components["allergy_conflict"][:, index].sum())
+    if conflicts:
+        reasons.append(f"{conflicts}人の苦手な食材を含む可能性あり")
+
+    return "、".join(reasons) if reasons else "グループの好みとのバランスで選出しました"
+
+
+class GroupMatchScorer:
+    """メンバーの好みと候補店舗の適合度をまとめて計算する"""
+
+    def __init__(self, aggregate: Optional[str] = None, temperature: Optional[float] = None):
+        self.aggregate = aggregate or settings.MATCH_SCORE_AGGREGATE
+        if self.aggregate not in AGGREGATES:
+            logger.warning(f"Unknown match score aggregate '{self.aggregate}', falling back to mean")
+            self.aggregate = "mean"
+        self.temperature = temperature or settings.MATCH_SCORE_SOFTMIN_TEMPERATURE
+
+    def _evaluate(self, preferences_summaries: Sequence[Any], candidates: Sequence[Dict[str, Any]]):
+        members = build_member_features([parse_preferences_summary(summary) for summary in preferences_summaries])
+        candidate_features = build_candidate_features(candidates)
+        scores, components = score_matrix(members, candidate_features)
+        group_scores = aggregate_scores(scores, self.aggregate, self.temperature)
+        return group_scores, components, members, candidate_features
+
+    def score(
+        self,
+        preferences_summaries: Sequence[Any],
+        candidates: Sequence[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """各候補に match_score（0〜100）と recommendation_reason を付与して元の順で返す"""
+        return [
+            {**candidate, **result}
+            for candidate, result in self._results(preferences_summaries, candidates, None)
+        ]
+
+    def rank(
+        self,
+        preferences_summaries: Sequence[Any],
+        candidates: Sequence[Dict[str, Any]],
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """スコアの高い順に上位の候補を返す（推薦理由は上位分だけ生成）"""
+        return [
+            {**candidate, **result}
+            for candidate, result in self._results(preferences_summaries, candidates, limit, ranked=True)
+        ]
+
+    def _results(
+        self,
+        preferences_summaries: Sequence[Any],
+        candidates: Sequence[Dict[str, Any]],
+        limit: Optional[int],
+        ranked: bool = False
+    ) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        if not candidates:
+            return []
+
+        group_scores, components, members, candidate_features = self._evaluate(preferences_summaries, candidates)
+        if ranked:
+            # 同点の場合は元の順（プロバイダのおすすめ順）を優先
+            order = np.argsort(-group_scores, kind="stable")[:limit]
+        else:
+            order = np.arange(len(candidates))
+
+        return [
+            (
+                candidates[i],
+                {
+                    "match_score": round(float(group_scores[i]) * 100, 1),
+                    "recommendation_reason": _reason(i, components, members, candidate_features)
+                }
+            )
+            for i in order.tolist()
+        ]
+
+
+# グローバルインスタンス
+match_scorer = GroupMatchScorer()
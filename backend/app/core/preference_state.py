@@ -0,0 +1,143 @@
+import json
+from typing import Any, Dict, Iterable
+
+from .keyword_matcher import KeywordMatcher, first_hit
+from ..models.interview import Interview
+
+# 発言から読み取れなかった場合に完了時のスナップショットで補う値
+DEFAULT_BUDGET = "2000-4000"
+DEFAULT_ATMOSPHERE = "カジュアル"
+
+# 予算（先に一致したものを採用）
+BUDGET_KEYWORDS = (
+    ("1000-2000", ["1000", "千円", "安い", "リーズナブル", "学生"]),
+    ("4000-8000", ["5000", "高級", "記念日", "デート", "特別"]),
+    ("2500-4000", ["3000", "普通", "標準"]),
+    ("1500-3000", ["2000", "ランチ"]),
+)
+
+CUISINE_KEYWORDS = {
+    "和食": ["和食", "寿司", "天ぷら", "懐石", "居酒屋", "刺身", "日本料理"],
+    "イタリアン": ["イタリアン", "パスタ", "ピザ", "イタリア"],
+    "フレンチ": ["フレンチ", "フランス料理", "フランス", "ビストロ"],
+    "中華": ["中華", "中国料理", "中国", "北京ダック", "麻婆豆腐", "餃子"],
+    "韓国料理": ["韓国", "キムチ", "サムギョプサル", "ビビンバ"],
+    "タイ料理": ["タイ", "トムヤムクン", "パッタイ"],
+    "洋食": ["洋食", "ステーキ", "ハンバーグ"],
+    "焼肉": ["焼肉", "カルビ", "ホルモン"]
+}
+
+LOCATIONS = ["渋谷", "新宿", "銀座", "恵比寿", "表参道", "六本木", "池袋", "上野", "浅草", "秋葉原"]
+
+ALLERGY_KEYWORDS = {
+    "魚介類": ["魚", "エビ", "カニ", "貝", "魚介", "海老", "蟹"],
+    "卵": ["卵", "たまご"],
+    "乳製品": ["牛乳", "チーズ", "乳製品", "ミルク"],
+    "ナッツ": ["ナッツ", "ピーナッツ", "アーモンド"],
+    "そば": ["そば", "蕎麦"],
+    "辛い物": ["辛い", "スパイシー", "激辛", "唐辛子"]
+}
+ALLERGY_SUFFIXES = ("が苦手", "はダメ", "アレルギー")
+
+# 雰囲気（先に一致したものを採用）
+ATMOSPHERE_KEYWORDS = (
+    ("ロマンチック", ["デート", "記念日", "誕生日", "ロマンチック"]),
+    ("フォーマル", ["会社", "接待", "ビジネス", "商談"]),
+    ("ファミリー向け", ["家族", "子供", "ファミリー"]),
+    ("カジュアル・グループ向け", ["友達", "仲間", "グループ", "ワイワイ"]),
+    ("落ち着いた大人の空間", ["静か", "落ち着い", "大人"]),
+)
+
+SPECIAL_REQUEST_KEYWORDS = (
+    ("個室希望", ["個室", "プライベート"]),
+    ("禁煙席希望", ["禁煙", "タバコ"]),
+    ("眺めの良い席希望", ["夜景", "景色", "眺め"]),
+    ("駐車場あり", ["駐車場", "車"]),
+    ("ベジタリアン対応", ["ベジタリアン", "野菜", "菜食"]),
+    ("子供連れ歓迎", ["子供", "キッズ"]),
+)
+
+LIST_FIELDS = ("cuisine_types", "allergies", "special_requests")
+
+# 全項目のキーワードを1つにまとめた照合器（import時に1度だけ構築）
+PREFERENCE_MATCHER = KeywordMatcher({
+    "budget": dict(BUDGET_KEYWORDS),
+    "cuisine_types": CUISINE_KEYWORDS,
+    "location": {location: [location] for location in LOCATIONS},
+    "allergies": {
+        allergy: [f"{keyword}{suffix}" for keyword in keywords for suffix in ALLERGY_SUFFIXES]
+        for allergy, keywords in ALLERGY_KEYWORDS.items()
+    },
+    "atmosphere": dict(ATMOSPHERE_KEYWORDS),
+    "special_requests": dict(SPECIAL_REQUEST_KEYWORDS),
+})
+
+
+def empty_preference_state() -> Dict[str, Any]:
+    return {
+        "budget": "",
+        "cuisine_types": [],
+        "location": "",
+        "allergies": [],
+        "atmosphere": "",
+        "special_requests": []
+    }
+
+
+def extract_preferences(content: str) -> Dict[str, Any]:
+    """1件のユーザー発言から読み取れる好みを抽出（読み取れない項目は空）"""
+    hits = PREFERENCE_MATCHER.scan(content)
+    return {
+        "budget": first_hit(hits["budget"], (label for label, _ in BUDGET_KEYWORDS)),
+        "cuisine_types": [cuisine for cuisine in CUISINE_KEYWORDS if cuisine in hits["cuisine_types"]],
+        "location": first_hit(hits["location"], LOCATIONS),
+        "allergies": [allergy for allergy in ALLERGY_KEYWORDS if allergy in hits["allergies"]],
+        "atmosphere": first_hit(hits["atmosphere"], (label for label, _ in ATMOSPHERE_KEYWORDS)),
+        "special_requests": [
+            request for request, _ in SPECIAL_REQUEST_KEYWORDS if request in hits["special_requests"]
+        ]
+    }
+
+
+def merge_preferences(state: Dict[str, Any], extracted: Dict[str, Any]) -> Dict[str, Any]:
+    """抽出結果を状態に反映（後の発言で分かった値を優先し、リストは重複なく追加）"""
+    merged = {**empty_preference_state(), **state}
+    for key, value in extracted.items():
+        if key in LIST_FIELDS:
+            merged[key] = merged[key] + [item for item in value if item not in merged[key]]
+        elif value:
+            merged[key] = value
+    return merged
+
+
+def update_preference_state(state: Dict[str, Any], contents: Iterable[str]) -> Dict[str, Any]:
+    """ユーザー発言を順に状態へ反映（発言1件あたりの処理量は会話の長さによらない）"""
+    for content in contents:
+        state = merge_preferences(state, extract_preferences(content))
+    return state
+
+
+def load_preference_state(interview: Interview) -> Dict[str, Any]:
+    if not interview.preference_state:
+        return empty_preference_state()
+    return {**empty_preference_state(), **json.loads(interview.preference_state)}
+
+
+def record_user_message(interview: Interview, content: str):
+    """ユーザー発言をインタビューの好みの状態に反映（発言の保存と同じトランザクション内で呼ぶ）"""
+    state = update_preference_state(load_preference_state(interview), [content])
+    interview.preference_state = json.dumps(state, ensure_ascii=False)
+
+
+def snapshot_preferences(state: Dict[str, Any]) -> Dict[str, Any]:
+    """完了時の好み（読み取れなかった予算・雰囲気は既定値で補う）"""
+    return {
+        **state,
+        "budget": state.get("budget") or DEFAULT_BUDGET,
+        "atmosphere": state.get("atmosphere") or DEFAULT_ATMOSPHERE
+    }
+
+
+def analysis_dedupe_key(interview_id: str) -> str:
+    """完了後の好み分析ジョブの dedupe_key（推薦生成ジョブが分析の完了を待つのにも使う）"""
+    return f"analyze_interview:{interview_id}"
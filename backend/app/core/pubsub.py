@@ -0,0 +1,144 @@
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Dict, Optional, Set
+
+from .config import settings
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # redis がない環境ではプロセス内バックエンドのみ使える
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """1チャンネルの購読（async for でメッセージを受け取る）"""
+
+    def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def close(self):
+        raise NotImplementedError
+
+
+class PubSubBackend:
+    """ワーカー・ノード間でメッセージを配信する pub/sub の共通インターフェース"""
+    name = "base"
+
+    async def publish(self, channel: str, message: Dict[str, Any]):
+        raise NotImplementedError
+
+    async def subscribe(self, channel: str) -> Subscription:
+        """購読を開始する（戻った時点以降に publish されたメッセージを受け取れる）"""
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class _InMemorySubscription(Subscription):
+    def __init__(self, backend: "InMemoryPubSub", channel: str, queue_size: int):
+        self.backend = backend
+        self.channel = channel
+        self.queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=queue_size)
+
+    async def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+        while True:
+            yield await self.queue.get()
+
+    async def close(self):
+        self.backend._unsubscribe(self)
+
+
+class InMemoryPubSub(PubSubBackend):
+    """プロセス内で完結する pub/sub（単一ワーカー運用・テスト用）"""
+    name = "memory"
+
+    def __init__(self, queue_size: int = 1000):
+        self.queue_size = queue_size
+        self._subscriptions: Dict[str, Set[_InMemorySubscription]] = {}
+        self.dropped = 0
+
+    async def publish(self, channel: str, message: Dict[str, Any]):
+        # 他バックエンドと同じく、購読側には独立したコピーを渡す
+        payload = json.dumps(message, ensure_ascii=False, default=str)
+        for subscription in list(self._subscriptions.get(channel, ())):
+            try:
+                subscription.queue.put_nowait(json.loads(payload))
+            except asyncio.QueueFull:
+                self.dropped += 1
+
+    async def subscribe(self, channel: str) -> Subscription:
+        subscription = _InMemorySubscription(self, channel, self.queue_size)
+        self._subscriptions.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: _InMemorySubscription):
+        subscriptions = self._subscriptions.get(subscription.channel)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.channel]
+
+
+class _RedisSubscription(Subscription):
+    def __init__(self, pubsub):
+        self.pubsub = pubsub
+
+    async def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+        async for message in self.pubsub.listen():
+            if message.get("type") != "message":
+                continue
+            try:
+                yield json.loads(message["data"])
+            except (TypeError, ValueError):
+                logger.warning(f"Ignored malformed pub/sub message: {message.get('data')!r}")
+
+    async def close(self):
+        try:
+            await self.pubsub.unsubscribe()
+        finally:
+            await self.pubsub.close()
+
+
+class RedisPubSub(PubSubBackend):
+    """Redis プロトコルの PUBLISH/SUBSCRIBE を使う pub/sub（複数ワーカー・ノード間で共有）
+
+    client には redis.asyncio.Redis 互換のオブジェクトを渡せる（テストでは fakeredis など）。
+    """
+    name = "redis"
+
+    def __init__(self, url: str = "", client: Any = None):
+        if client is None:
+            if aioredis is None:
+                raise RuntimeError("redis package is required for the redis pub/sub backend")
+            client = aioredis.from_url(url, decode_responses=True)
+        self.client = client
+
+    async def publish(self, channel: str, message: Dict[str, Any]):
+        await self.client.publish(channel, json.dumps(message, ensure_ascii=False, default=str))
+
+    async def subscribe(self, channel: str) -> Subscription:
+        pubsub = self.client.pubsub()
+        await pubsub.subscribe(channel)
+        return _RedisSubscription(pubsub)
+
+    async def close(self):
+        await self.client.close()
+
+
+def create_pubsub(backend: str, redis_url: Optional[str] = None, queue_size: int = 1000) -> PubSubBackend:
+    """設定に応じた pub/sub バックエンドを作成"""
+    if backend == "redis":
+        if aioredis is not None and redis_url:
+            return RedisPubSub(redis_url)
+        logger.warning("Redis pub/sub is not available; falling back to in-process pub/sub")
+    elif backend != "memory":
+        logger.warning(f"Unknown pub/sub backend '{backend}'; using in-process pub/sub")
+    return InMemoryPubSub(queue_size=queue_size)
+
+
+# グローバルインスタンス
+pubsub = create_pubsub(settings.PUBSUB_BACKEND, settings.PUBSUB_REDIS_URL, settings.PUBSUB_QUEUE_SIZE)
@@ -0,0 +1,219 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitExceeded(Exception):
+    """待ち行列が満杯、または待ち時間の上限を超えた"""
+    pass
+
+
+def is_throttle_error(exc: BaseException) -> bool:
+    """プロバイダからのレート制限（HTTP 429）エラーか判定"""
+    if getattr(exc, 'status_code', None) == 429:
+        return True
+    response = getattr(exc, 'response', None)
+    return getattr(response, 'status_code', None) == 429
+
+
+class TokenBucket:
+    """トークンバケットによる送信レート制限"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+
+class AIMDConcurrencyLimiter:
+    """AIMD方式の適応的同時実行数制限
+
+    目標レイテンシ以内で成功すれば上限を少しずつ増やし（加算増加）、
+    レイテンシ超過や429を受けたら上限を一定割合で減らす（乗算減少）。
+    """
+
+    def __init__(
+        self,
+        initial_limit: float,
+        min_limit: float = 1,
+        max_limit: float = 100,
+        target_latency: float = 2.0,
+        decrease_factor: float = 0.7
+    ):
+        self.limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < max(int(self.limit), 1))
+            self.in_flight += 1
+
+    async def release(self, latency: Optional[float], overloaded: bool):
+        async with self._condition:
+            self.in_flight -= 1
+            if overloaded or (latency is not None and latency > self.target_latency):
+                self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+            elif latency is not None:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+
+class ProviderPermit:
+    """1回の呼び出し分の実行許可"""
+
+    def __init__(self):
+        self.overloaded = False
+
+    def mark_overloaded(self):
+        """レスポンスからプロバイダの過負荷を検知した場合に呼び出す"""
+        self.overloaded = True
+
+
+class ProviderRateLimiter:
+    """プロバイダごとのレート制限・同時実行数制御
+
+    トークンバケットで送信レートを、AIMDで同時実行数を制御し、
+    上限に達した呼び出しは有限の待ち行列で待たせる。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: float,
+        max_concurrency: float,
+        max_queue: int,
+        max_wait_seconds: float,
+        target_latency: float
+    ):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.concurrency = AIMDConcurrencyLimiter(
+            initial_limit=max_concurrency,
+            max_limit=max_concurrency,
+            target_latency=target_latency
+        )
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.acquired = 0
+        self.rejected = 0
+        self.throttled = 0
+        self.errors = 0
+        self._total_wait = 0.0
+
+    async def _wait_for_slot(self):
+        await self.bucket.acquire()
+        await self.concurrency.acquire()
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[ProviderPermit]:
+        """呼び出し枠を確保する（確保できなければ RateLimitExceeded）"""
+        if self.queue_depth >= self.max_queue:
+            self.rejected += 1
+            logger.warning(f"[{self.name}] rate limiter queue is full ({self.queue_depth})")
+            raise RateLimitExceeded(f"{self.name}: too many queued requests")
+
+        self.queue_depth += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        queued_at = time.monotonic()
+        try:
+            await asyncio.wait_for(self._wait_for_slot(), timeout=self.max_wait_seconds)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            logger.warning(f"[{self.name}] rate limiter wait exceeded {self.max_wait_seconds}s")
+            raise RateLimitExceeded(f"{self.name}: rate limit wait timed out")
+        finally:
+            self.queue_depth -= 1
+
+        started_at = time.monotonic()
+        self._total_wait += started_at - queued_at
+        self.acquired += 1
+
+        permit = ProviderPermit()
+        latency = None
+        try:
+            yield permit
+            latency = time.monotonic() - started_at
+        except BaseException as e:
+            if is_throttle_error(e):
+                permit.mark_overloaded()
+            else:
+                self.errors += 1
+            raise
+        finally:
+            if permit.overloaded:
+                self.throttled += 1
+            await self.concurrency.release(latency, permit.overloaded)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "rate_per_second": self.bucket.rate,
+            "available_tokens": round(self.bucket.tokens, 2),
+            "concurrency_limit": round(self.concurrency.limit, 2),
+            "in_flight": self.concurrency.in_flight,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "acquired": self.acquired,
+            "rejected": self.rejected,
+            "throttled": self.throttled,
+            "errors": self.errors,
+            "avg_wait_ms": self._total_wait / self.acquired * 1000 if self.acquired > 0 else 0
+        }
+
+
+_limiters: Dict[str, ProviderRateLimiter] = {}
+
+
+def get_rate_limiter(provider: str) -> ProviderRateLimiter:
+    """プロバイダ名ごとのレートリミッタを取得（設定は PROVIDER_RATE_LIMITS）"""
+    if provider not in _limiters:
+        config = {**settings.PROVIDER_RATE_LIMITS.get("default", {}), **settings.PROVIDER_RATE_LIMITS.get(provider, {})}
+        _limiters[provider] = ProviderRateLimiter(
+            name=provider,
+            rate=config.get("rate", 5),
+            burst=config.get("burst", 10),
+            max_concurrency=config.get("max_concurrency", 10),
+            max_queue=int(config.get("max_queue", 100)),
+            max_wait_seconds=config.get("max_wait_seconds", 5),
+            target_latency=config.get("target_latency", 2)
+        )
+    return _limiters[provider]
+
+
+def get_rate_limiter_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: limiter.get_stats() for name, limiter in _limiters.items()}
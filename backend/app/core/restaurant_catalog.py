@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from ..db.database import SessionLocal
+from ..models.restaurant import Restaurant
+from .geo_index import restaurant_geo_index
+
+logger = logging.getLogger(__name__)
+
+# upsert時に最新の値で上書きするカラム
+UPDATABLE_FIELDS = (
+    "name", "address", "lat", "lng", "genre", "genre_code", "budget", "budget_code",
+    "features", "rating", "review_count", "description", "access", "open_hours",
+    "closed_days", "image_url", "url", "last_seen_at"
+)
+
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def catalog_record_from_hotpepper(restaurant: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """HotPepperClient.convert_to_restaurant_data の出力をカタログ行に変換"""
+    if not restaurant.get('restaurant_id') or not restaurant.get('name'):
+        return None
+
+    return {
+        'provider': 'hotpepper',
+        'provider_restaurant_id': str(restaurant['restaurant_id']),
+        'name': restaurant['name'],
+        'address': restaurant.get('address') or None,
+        'lat': _to_float(restaurant.get('lat')),
+        'lng': _to_float(restaurant.get('lng')),
+        'genre': restaurant.get('cuisine_type') or None,
+        'genre_code': restaurant.get('genre_code') or None,
+        'budget': restaurant.get('price_range') or None,
+        'budget_code': restaurant.get('budget_code') or None,
+        'features': restaurant.get('features') or [],
+        'rating': None,  # ホットペッパーAPIには評価がない
+        'review_count': None,
+        'description': restaurant.get('description') or None,
+        'access': restaurant.get('access') or None,
+        'open_hours': restaurant.get('open_hours') or None,
+        'closed_days': restaurant.get('closed_days') or None,
+        'image_url': restaurant.get('image_url') or None,
+        'url': restaurant.get('url') or None
+    }
+
+
+def catalog_record_from_external(restaurant: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """ぐるなび・Google Places クライアントの出力をカタログ行に変換"""
+    if not restaurant.get('external_id') or not restaurant.get('name'):
+        return None
+
+    return {
+        'provider': restaurant.get('external_source', 'unknown'),
+        'provider_restaurant_id': str(restaurant['external_id']),
+        'name': restaurant['name'],
+        'address': restaurant.get('address') or None,
+        'lat': _to_float(restaurant.get('latitude')),
+        'lng': _to_float(restaurant.get('longitude')),
+        'genre': restaurant.get('cuisine_type') or None,
+        'genre_code': None,
+        'budget': restaurant.get('price_range') or None,
+        'budget_code': None,
+        'features': [],
+        'rating': _to_float(restaurant.get('external_rating')),
+        'review_count': restaurant.get('external_review_count'),
+        'description': restaurant.get('description') or None,
+        'access': None,
+        'open_hours': None,
+        'closed_days': None,
+        'image_url': restaurant.get('image_url') or None,
+        'url': restaurant.get('website') or None
+    }
+
+
+def upsert_restaurants(db: Session, records: List[Dict[str, Any]]) -> int:
+    """カタログに店舗をまとめてupsert（呼び出し側でcommitする）"""
+    now = datetime.now(timezone.utc)
+
+    # 同一バッチ内の重複はあとに出てきたものを優先
+    rows_by_key: Dict[tuple, Dict[str, Any]] = {}
+    for record in records:
+        if record is None:
+            continue
+        key = (record['provider'], record['provider_restaurant_id'])
+        rows_by_key[key] = {**record, 'restaurant_id': str(uuid.uuid4()), 'last_seen_at': now}
+
+    rows = list(rows_by_key.values())
+    if not rows:
+        return 0
+
+    dialect = db.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return _upsert_restaurants_generic(db, rows)
+
+    stmt = insert(Restaurant).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['provider', 'provider_restaurant_id'],
+        set_={field: stmt.excluded[field] for field in UPDATABLE_FIELDS}
+    )
+    db.execute(stmt)
+    return len(rows)
+
+
+def _upsert_restaurants_generic(db: Session, rows: List[Dict[str, Any]]) -> int:
+    """ON CONFLICT 非対応DB向けのupsert"""
+    for row in rows:
+        existing = db.query(Restaurant).filter(
+            Restaurant.provider == row['provider'],
+            Restaurant.provider_restaurant_id == row['provider_restaurant_id']
+        ).first()
+        if existing:
+            for field in UPDATABLE_FIELDS:
+                setattr(existing, field, row[field])
+        else:
+            db.add(Restaurant(**row))
+    return len(rows)
+
+
+def _ingest_sync(records: List[Dict[str, Any]]) -> int:
+    db = SessionLocal()
+    try:
+        count = upsert_restaurants(db, records)
+        db.commit()
+        return count
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+class RestaurantCatalogIngestor:
+    """検索結果をバックグラウンドでカタログに取り込む"""
+
+    def __init__(self):
+        self._tasks: Set[asyncio.Task] = set()
+        self.ingested_total = 0
+        self.failures = 0
+
+    async def ingest(self, records: List[Dict[str, Any]]) -> int:
+        """店舗情報をカタログにupsert（失敗しても検索処理には影響させない）"""
+        records = [record for record in records if record]
+        if not records:
+            return 0
+        try:
+            count = await asyncio.to_thread(_ingest_sync, records)
+            restaurant_geo_index.mark_stale()
+            self.ingested_total += count
+            return count
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Restaurant catalog ingestion failed: {e}")
+            return 0
+
+    def schedule(self, records: List[Dict[str, Any]]):
+        """検索のレスポンスを待たせないよう取り込みをバックグラウンドで実行"""
+        task = asyncio.ensure_future(self.ingest(records))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "ingested_total": self.ingested_total,
+            "failures": self.failures,
+            "pending": len(self._tasks)
+        }
+
+
+# グローバルインスタンス
+restaurant_catalog = RestaurantCatalogIngestor()
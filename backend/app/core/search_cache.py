@@ -0,0 +1,325 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# カンマ区切りで複数指定されるコード系パラメータ
+CODE_LIST_FIELDS = ("genre", "budget")
+# キャッシュキーに含めないパラメータ
+EXCLUDED_FIELDS = ("key", "format")
+
+
+def _snap(value: float, grid: float) -> float:
+    """座標をグリッドに丸める"""
+    return round(round(float(value) / grid) * grid, 6)
+
+
+def normalize_keyword(keyword: str) -> str:
+    """キーワードを正規化（全角半角統一・小文字化・重複除去・ソート）"""
+    normalized = unicodedata.normalize("NFKC", str(keyword)).lower()
+    return " ".join(sorted(set(normalized.split())))
+
+
+def canonicalize_search_params(params: Dict[str, Any], grid: Optional[float] = None) -> Dict[str, Any]:
+    """検索パラメータを正規化してキャッシュキー用の辞書を作成"""
+    grid = grid or settings.SEARCH_CACHE_GRID_DEGREES
+    canonical = {}
+
+    for field, value in params.items():
+        if field in EXCLUDED_FIELDS or value is None or value == "":
+            continue
+
+        if field in ("lat", "lng"):
+            canonical[field] = _snap(value, grid)
+        elif field in CODE_LIST_FIELDS:
+            codes = value if isinstance(value, list) else str(value).split(",")
+            canonical[field] = ",".join(sorted({code.strip() for code in codes if code.strip()}))
+        elif field == "keyword":
+            canonical[field] = normalize_keyword(value)
+        else:
+            canonical[field] = value
+
+    return canonical
+
+
+def make_cache_key(namespace: str, params: Dict[str, Any]) -> str:
+    """正規化済みパラメータからキャッシュキーを生成"""
+    payload = json.dumps(
+        canonicalize_search_params(params),
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str
+    )
+    digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    return f"{namespace}:{digest}"
+
+
+class MemoryTTLCache:
+    """プロセス内LRUキャッシュ（TTL・件数上限付き）"""
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, expires_at: Optional[float] = None):
+        expires_at = expires_at or time.time() + self.ttl_seconds
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteTTLCache:
+    """ワーカー間で共有するSQLiteキャッシュ（TTL・件数上限付き）
+
+    読み出しは原則として書き込みを伴わない。上限超過時に古い順に消すためのアクセス時刻は
+    touch_interval_seconds 以上古くなったときだけ更新し、期限切れの削除は書き込み時に行う
+    （同じファイルを使う全キャッシュ・全ワーカーの読み出しが書き込みロックで直列化しないように）。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 10000,
+        ttl_seconds: float = 600,
+        table: str = "cache_entries",
+        touch_interval_seconds: float = 60
+    ):
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.touch_interval_seconds = touch_interval_seconds
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.evictions = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {self.table} (
+                    cache_key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS ix_{self.table}_accessed_at ON {self.table} (accessed_at)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """値と有効期限を取得（期限切れ・未登録の場合はNone）"""
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                row = conn.execute(
+                    f"SELECT value, expires_at, accessed_at FROM {self.table} WHERE cache_key = ?",
+                    (key,)
+                ).fetchone()
+                if row is None or row[1] <= now:
+                    return None
+                if now - row[2] >= self.touch_interval_seconds:
+                    # 他のワーカーが更新済みなら書き込まない
+                    conn.execute(
+                        f"UPDATE {self.table} SET accessed_at = ? WHERE cache_key = ? AND accessed_at <= ?",
+                        (now, key, now - self.touch_interval_seconds)
+                    )
+                    conn.commit()
+            return json.loads(row[0]), row[1]
+        except sqlite3.Error as e:
+            logger.warning(f"Shared search cache read failed: {e}")
+            return None
+
+    def set(self, key: str, value: Any, expires_at: Optional[float] = None):
+        now = time.time()
+        expires_at = expires_at or now + self.ttl_seconds
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    f"""
+                    INSERT INTO {self.table} (cache_key, value, expires_at, accessed_at)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(cache_key) DO UPDATE SET
+                        value = excluded.value,
+                        expires_at = excluded.expires_at,
+                        accessed_at = excluded.accessed_at
+                    """,
+                    (key, json.dumps(value, ensure_ascii=False), expires_at, now)
+                )
+                self._evict(conn, now)
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Shared search cache write failed: {e}")
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """期限切れエントリと上限超過分（アクセスが古い順）を削除"""
+        expired = conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (now,)).rowcount
+        overflow = conn.execute(
+            f"""
+            DELETE FROM {self.table} WHERE cache_key IN (
+                SELECT cache_key FROM {self.table}
+                ORDER BY accessed_at DESC
+                LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_entries,)
+        ).rowcount
+        self.evictions += max(expired, 0) + max(overflow, 0)
+
+    def count(self) -> int:
+        try:
+            with self._lock:
+                return self._connect().execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        except sqlite3.Error:
+            return 0
+
+
+class TieredSearchCache:
+    """プロセス内LRU + 共有SQLiteの2層検索結果キャッシュ
+
+    async のコードからは aget/aset を使う（共有層のディスクI/Oとロック待ちはスレッドで行う）。
+    """
+
+    def __init__(self, memory: MemoryTTLCache, shared: Optional[SQLiteTTLCache] = None):
+        self.memory = memory
+        self.shared = shared
+        self.memory_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.sets = 0
+
+    def _get_memory(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is not None:
+            self.memory_hits += 1
+        return value
+
+    def _from_shared(self, key: str, entry: Optional[Tuple[Any, float]]) -> Optional[Any]:
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expires_at = entry
+        # 共有層のヒットはプロセス内にも残す（有効期限は引き継ぐ）
+        self.memory.set(key, value, expires_at=expires_at)
+        self.shared_hits += 1
+        return value
+
+    def _set_memory(self, key: str, value: Any) -> float:
+        expires_at = time.time() + self.memory.ttl_seconds
+        self.memory.set(key, value, expires_at=expires_at)
+        self.sets += 1
+        return expires_at
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self._get_memory(key)
+        if value is not None:
+            return value
+        return self._from_shared(key, self.shared.get(key) if self.shared is not None else None)
+
+    def set(self, key: str, value: Any):
+        expires_at = self._set_memory(key, value)
+        if self.shared is not None:
+            self.shared.set(key, value, expires_at=expires_at)
+
+    async def aget(self, key: str) -> Optional[Any]:
+        value = self._get_memory(key)
+        if value is not None:
+            return value
+        entry = await asyncio.to_thread(self.shared.get, key) if self.shared is not None else None
+        return self._from_shared(key, entry)
+
+    async def aset(self, key: str, value: Any):
+        expires_at = self._set_memory(key, value)
+        if self.shared is not None:
+            await asyncio.to_thread(self.shared.set, key, value, expires_at)
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.shared_hits + self.misses
+        hits = self.memory_hits + self.shared_hits
+        return {
+            "memory_hits": self.memory_hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "sets": self.sets,
+            "hit_rate": hits / lookups if lookups > 0 else 0,
+            "memory_entries": len(self.memory),
+            "memory_evictions": self.memory.evictions,
+            "shared_entries": self.shared.count() if self.shared is not None else 0,
+            "shared_evictions": self.shared.evictions if self.shared is not None else 0
+        }
+
+
+# グローバルインスタンス
+search_cache = TieredSearchCache(
+    memory=MemoryTTLCache(
+        max_entries=settings.SEARCH_CACHE_MEMORY_MAX_ENTRIES,
+        ttl_seconds=settings.SEARCH_CACHE_TTL_SECONDS
+    ),
+    shared=SQLiteTTLCache(
+        path=settings.SEARCH_CACHE_PATH,
+        max_entries=settings.SEARCH_CACHE_SHARED_MAX_ENTRIES,
+        ttl_seconds=settings.SEARCH_CACHE_TTL_SECONDS,
+        touch_interval_seconds=settings.SEARCH_CACHE_TOUCH_INTERVAL_SECONDS
+    ) if settings.SEARCH_CACHE_PATH else None
+)
+
+# プロバイダ障害時に返す直近の検索結果（TTL切れ後も長期間保持する）
+stale_search_cache = TieredSearchCache(
+    memory=MemoryTTLCache(
+        max_entries=settings.SEARCH_CACHE_MEMORY_MAX_ENTRIES,
+        ttl_seconds=settings.STALE_RESULTS_TTL_SECONDS
+    ),
+    shared=SQLiteTTLCache(
+        path=settings.SEARCH_CACHE_PATH,
+        max_entries=settings.STALE_RESULTS_MAX_ENTRIES,
+        ttl_seconds=settings.STALE_RESULTS_TTL_SECONDS,
+        table="stale_entries",
+        touch_interval_seconds=settings.SEARCH_CACHE_TOUCH_INTERVAL_SECONDS
+    ) if settings.SEARCH_CACHE_PATH else None
+)
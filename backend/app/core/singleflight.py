@@ -0,0 +1,56 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """同一キーの同時リクエストを1回の上流呼び出しにまとめる
+
+    最初の呼び出し元（リーダー）がタスクを起動し、実行中に同じキーで
+    呼び出した側はそのタスクの結果（または例外）を共有する。
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            logger.debug(f"[{self.name}] coalesced in-flight request: {key}")
+        else:
+            self.leaders += 1
+            task = asyncio.ensure_future(func())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+
+        # 呼び出し元がキャンセルされても他の待機者のために上流呼び出しは継続する
+        return await asyncio.shield(task)
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.leaders + self.coalesced
+        return {
+            "upstream_calls": self.leaders,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight),
+            "coalesce_rate": self.coalesced / total if total > 0 else 0
+        }
+
+
+_registry: Dict[str, SingleFlight] = {}
+
+
+def get_singleflight(name: str) -> SingleFlight:
+    """プロバイダ名ごとのSingleFlightを取得"""
+    if name not in _registry:
+        _registry[name] = SingleFlight(name)
+    return _registry[name]
+
+
+def get_singleflight_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: flight.get_stats() for name, flight in _registry.items()}
@@ -0,0 +1,154 @@
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Set
+
+from fastapi import WebSocket
+
+from .config import settings
+from .pubsub import PubSubBackend, Subscription, pubsub
+
+logger = logging.getLogger(__name__)
+
+# 送信が詰まった接続を閉じるときのコード（クライアントは再接続して集計を取り直す）
+WS_TRY_AGAIN_LATER = 1013
+
+
+class _Relay:
+    """1グループの購読と転送タスク（購読が始まると ready がセットされる）"""
+
+    def __init__(self):
+        self.ready = asyncio.Event()
+        self.error: Optional[BaseException] = None
+        self.task: Optional[asyncio.Task] = None
+
+
+class VoteHub:
+    """グループごとの投票 WebSocket 接続への配信
+
+    投票の差分は pub/sub のグループ別チャンネルに publish し、各ワーカーは
+    接続中のクライアントがいるグループだけを1本ずつ購読して手元の接続に
+    転送する。どのワーカーで投票されても全ワーカーの接続に届く。
+    """
+
+    def __init__(self, backend: PubSubBackend, channel_prefix: str = "votes:", send_timeout: float = 5):
+        self.backend = backend
+        self.channel_prefix = channel_prefix
+        self.send_timeout = send_timeout
+        self._connections: Dict[str, Set[WebSocket]] = {}
+        self._relays: Dict[str, _Relay] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.published = 0
+        self.delivered = 0
+        self.slow_closed = 0
+
+    def start(self):
+        """イベントループを記録（アプリ起動時に呼び出す）"""
+        self._loop = asyncio.get_running_loop()
+
+    async def stop(self):
+        tasks = [relay.task for relay in self._relays.values() if relay.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._relays = {}
+        await self.backend.close()
+
+    def _channel(self, group_id: str) -> str:
+        return f"{self.channel_prefix}{group_id}"
+
+    def publish(self, group_id: str, message: Dict[str, Any]):
+        """投票の差分を配信（スレッドプールで動く同期ハンドラから呼び出す）"""
+        if self._loop is None:
+            logger.debug("Vote hub is not started; skipped publishing")
+            return
+        future = asyncio.run_coroutine_threadsafe(
+            self.backend.publish(self._channel(group_id), message), self._loop
+        )
+        future.add_done_callback(self._log_publish_error)
+        self.published += 1
+
+    def _log_publish_error(self, future):
+        if future.exception() is not None:
+            logger.error(f"Failed to publish vote update: {future.exception()!r}")
+
+    async def connect(self, group_id: str, websocket: WebSocket):
+        """接続を受け付け、グループの購読を開始する（戻った時点以降の差分は届く）"""
+        await websocket.accept()
+        self._connections.setdefault(group_id, set()).add(websocket)
+        relay = self._relays.get(group_id)
+        if relay is None:
+            # 同時に接続してきた他のクライアントが二重に購読しないよう、購読前に登録する
+            relay = _Relay()
+            self._relays[group_id] = relay
+            relay.task = asyncio.create_task(self._relay(group_id, relay))
+        await relay.ready.wait()
+        if relay.error is not None:
+            await self.disconnect(group_id, websocket)
+            raise relay.error
+
+    async def disconnect(self, group_id: str, websocket: WebSocket):
+        connections = self._connections.get(group_id)
+        if connections is None:
+            return
+        connections.discard(websocket)
+        if not connections:
+            del self._connections[group_id]
+            relay = self._relays.pop(group_id, None)
+            if relay is not None and relay.task is not None:
+                relay.task.cancel()
+
+    async def _relay(self, group_id: str, relay: _Relay):
+        subscription: Optional[Subscription] = None
+        try:
+            subscription = await self.backend.subscribe(self._channel(group_id))
+            relay.ready.set()
+            async for message in subscription:
+                await self._broadcast(group_id, message)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Vote relay for group {group_id} stopped: {e!r}")
+            relay.error = e
+            # 次の接続で購読し直せるようにする
+            if self._relays.get(group_id) is relay:
+                del self._relays[group_id]
+        finally:
+            relay.ready.set()
+            if subscription is not None:
+                await subscription.close()
+
+    async def _broadcast(self, group_id: str, message: Dict[str, Any]):
+        """全接続へ並行して送る（遅い接続が他の接続への配信を遅らせない）"""
+        connections = list(self._connections.get(group_id, ()))
+        await asyncio.gather(*(self._send(group_id, websocket, message) for websocket in connections))
+
+    async def _send(self, group_id: str, websocket: WebSocket, message: Dict[str, Any]):
+        try:
+            await asyncio.wait_for(websocket.send_json(message), timeout=self.send_timeout)
+            self.delivered += 1
+        except asyncio.TimeoutError:
+            # 送信が詰まった接続は閉じ、再接続時の集計で追いつかせる
+            self.slow_closed += 1
+            await self.disconnect(group_id, websocket)
+            try:
+                await asyncio.wait_for(websocket.close(code=WS_TRY_AGAIN_LATER), timeout=self.send_timeout)
+            except Exception:
+                pass
+        except Exception:
+            # 切断済みの接続は外す（受信側のループでも disconnect される）
+            await self.disconnect(group_id, websocket)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend.name,
+            "groups": len(self._connections),
+            "connections": sum(len(connections) for connections in self._connections.values()),
+            "published": self.published,
+            "delivered": self.delivered,
+            "slow_closed": self.slow_closed
+        }
+
+
+# グローバルインスタンス
+vote_hub = VoteHub(pubsub, send_timeout=settings.VOTE_HUB_SEND_TIMEOUT_SECONDS)
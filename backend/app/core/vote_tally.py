@@ -0,0 +1,161 @@
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from ..models.group import group_members
+from ..models.recommendation import CandidateVoteTally, RestaurantCandidate, Vote, VoteType
+
+# 投票種別ごとの集計カラム
+COUNT_COLUMNS = {
+    VoteType.like.value: CandidateVoteTally.like_count,
+    VoteType.dislike.value: CandidateVoteTally.dislike_count,
+    VoteType.neutral.value: CandidateVoteTally.neutral_count,
+}
+
+
+def new_tally(candidate: RestaurantCandidate) -> CandidateVoteTally:
+    """候補作成時に0件の集計行を用意する"""
+    return CandidateVoteTally(
+        candidate_id=candidate.candidate_id,
+        recommendation_id=candidate.recommendation_id,
+        like_count=0,
+        dislike_count=0,
+        neutral_count=0,
+        voter_count=0
+    )
+
+
+def apply_vote_changes(db: Session, recommendation_id: str, changes: List[Dict]):
+    """投票の差分を集計テーブルに反映（呼び出し側のトランザクション内で実行する）
+
+    changes は {"candidate_id", "vote_type", "delta"} のリスト。カウンタは
+    UPDATE ... SET count = count + delta で増減するため、同時に投票されても取りこぼさない。
+    """
+    if not changes:
+        return
+
+    count_deltas: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    for change in changes:
+        count_deltas[change["candidate_id"]][change["vote_type"]] += change["delta"]
+
+    db.flush()
+    for candidate_id, deltas in count_deltas.items():
+        values = {CandidateVoteTally.voter_count: CandidateVoteTally.voter_count + sum(deltas.values())}
+        for vote_type, delta in deltas.items():
+            if delta:
+                column = COUNT_COLUMNS[vote_type]
+                values[column] = column + delta
+        updated = db.query(CandidateVoteTally).filter(
+            CandidateVoteTally.candidate_id == candidate_id
+        ).update(values, synchronize_session=False)
+        if not updated:
+            # 集計行がない候補（集計テーブル導入前の推薦）は投票から作り直す
+            rebuild_vote_tallies(db, recommendation_id)
+            return
+
+
+def count_votes(db: Session, recommendation_id: str) -> Dict[str, Dict[str, int]]:
+    """推薦の候補ごと・投票種別ごとの件数を投票テーブルから数える"""
+    counts: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    rows = db.query(Vote.candidate_id, Vote.vote_type, func.count(Vote.vote_id)).join(
+        RestaurantCandidate, Vote.candidate_id == RestaurantCandidate.candidate_id
+    ).filter(
+        RestaurantCandidate.recommendation_id == recommendation_id
+    ).group_by(Vote.candidate_id, Vote.vote_type).all()
+    for candidate_id, vote_type, count in rows:
+        counts[candidate_id][vote_type.value] = count
+    return counts
+
+
+def rebuild_vote_tallies(db: Session, recommendation_id: str):
+    """推薦の全候補の集計を投票テーブルから作り直す"""
+    counts = count_votes(db, recommendation_id)
+    candidate_ids = [
+        candidate_id for (candidate_id,) in db.query(RestaurantCandidate.candidate_id).filter(
+            RestaurantCandidate.recommendation_id == recommendation_id
+        )
+    ]
+    existing = {
+        tally.candidate_id: tally
+        for tally in db.query(CandidateVoteTally).filter(CandidateVoteTally.recommendation_id == recommendation_id)
+    }
+    for candidate_id in candidate_ids:
+        tally = existing.get(candidate_id)
+        if tally is None:
+            tally = CandidateVoteTally(candidate_id=candidate_id, recommendation_id=recommendation_id)
+            db.add(tally)
+        summary = counts.get(candidate_id, {})
+        tally.like_count = summary.get(VoteType.like.value, 0)
+        tally.dislike_count = summary.get(VoteType.dislike.value, 0)
+        tally.neutral_count = summary.get(VoteType.neutral.value, 0)
+        tally.voter_count = tally.like_count + tally.dislike_count + tally.neutral_count
+    db.flush()
+
+
+def _tally_result(row, counts: Optional[Dict[str, int]] = None) -> Dict:
+    """集計行から結果を作る（集計行がない候補は counts に数えた件数を渡す）"""
+    if counts is None:
+        vote_summary = {
+            "like": row.like_count or 0,
+            "dislike": row.dislike_count or 0,
+            "neutral": row.neutral_count or 0
+        }
+        voter_count = row.voter_count or 0
+    else:
+        vote_summary = {vote_type: counts.get(vote_type, 0) for vote_type in COUNT_COLUMNS}
+        voter_count = sum(vote_summary.values())
+    return {
+        "candidate_id": row.candidate_id,
+        "name": row.name,
+        "vote_summary": vote_summary,
+        "total_votes": sum(vote_summary.values()),
+        "voter_count": voter_count
+    }
+
+
+def load_vote_tallies(db: Session, recommendation_id: str, group_id: str, candidate_ids: Optional[List[str]] = None) -> Dict:
+    """候補ごとの集計とメンバー数を1回のクエリで取得
+
+    1人1票のため、投票済みメンバー数は各候補の voter_count の合計になる。
+    読み取り専用で、集計行がない候補は投票テーブルから数える（集計行は書き込み側と
+    起動時のスキーマ更新で作る）。
+    """
+    member_count = select(func.count()).select_from(group_members).where(
+        group_members.c.group_id == group_id
+    )
+    query = db.query(
+        RestaurantCandidate.candidate_id,
+        RestaurantCandidate.name,
+        CandidateVoteTally.like_count,
+        CandidateVoteTally.dislike_count,
+        CandidateVoteTally.neutral_count,
+        CandidateVoteTally.voter_count,
+        CandidateVoteTally.candidate_id.isnot(None).label("has_tally"),
+        member_count.scalar_subquery().label("total_members")
+    ).outerjoin(
+        CandidateVoteTally, CandidateVoteTally.candidate_id == RestaurantCandidate.candidate_id
+    ).filter(
+        RestaurantCandidate.recommendation_id == recommendation_id
+    ).order_by(RestaurantCandidate.created_at, RestaurantCandidate.candidate_id)
+    rows = query.all()
+
+    counts = count_votes(db, recommendation_id) if any(not row.has_tally for row in rows) else {}
+    results = [
+        _tally_result(row) if row.has_tally else _tally_result(row, counts.get(row.candidate_id, {}))
+        for row in rows
+    ]
+    voted_members = sum(result.pop("voter_count") for result in results)
+    if candidate_ids is not None:
+        results = [result for result in results if result["candidate_id"] in candidate_ids]
+
+    if rows:
+        total_members = rows[0].total_members
+    else:
+        total_members = db.execute(member_count).scalar()
+    return {
+        "vote_results": results,
+        "total_members": total_members or 0,
+        "voted_members": voted_members
+    }
@@ -1,12 +1,170 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from ..core.config import settings
 
-engine = create_engine(settings.DATABASE_URL)
+# 非同期ドライバ（同期用URLから非同期エンジンのURLを作る）
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def to_async_url(url: str) -> str:
+    """同期ドライバのDB URLを非同期ドライバのURLに変換（sqlite → aiosqlite, postgresql → asyncpg）"""
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver configured for database URL: {parsed.drivername}")
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+class PoolWaitStats:
+    """コネクションプールからの取り出し（checkout）の待ち時間"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, wait: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+
+    def get_stats(self) -> Dict[str, Any]:
+        waited = self.checkouts + self.timeouts
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": self._total_wait / waited * 1000 if waited > 0 else 0,
+            "max_wait_ms": self._max_wait * 1000
+        }
+
+
+class _TimedCheckout:
+    """QueuePool の取り出しにかかった時間を wait_stats に記録する"""
+
+    wait_stats: PoolWaitStats
+
+    def _do_get(self):
+        started = time.monotonic()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.wait_stats.record(time.monotonic() - started, timed_out=True)
+            raise
+        self.wait_stats.record(time.monotonic() - started)
+        return connection
+
+
+# dispose() で作り直されたプールも同じ集計を使うよう、集計はクラスに持たせる
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    wait_stats = PoolWaitStats()
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    wait_stats = PoolWaitStats()
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:")
+
+
+def _engine_options(url: str, poolclass: type) -> Dict[str, Any]:
+    """プール設定と接続時の設定（インメモリのSQLiteは接続を共有するので既定のプールのまま）"""
+    if _is_memory_sqlite(url):
+        return {}
+    parsed = make_url(url)
+    options: Dict[str, Any] = {
+        "poolclass": poolclass,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE
+    }
+    # 長時間のクエリでコネクションを占有しないよう、PostgreSQLではサーバー側で打ち切る
+    if parsed.get_backend_name() == "postgresql" and settings.DB_STATEMENT_TIMEOUT_MS > 0:
+        if parsed.get_driver_name() == "asyncpg":
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """SQLiteの接続ごとの設定（WALで読み取りと書き込みを並行させ、ロック中は busy_timeout まで待つ）"""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+        cursor.execute(f"PRAGMA cache_size={int(settings.SQLITE_CACHE_SIZE)}")
+    finally:
+        cursor.close()
+
+
+def _configure_engine(sync_engine: Engine):
+    if sync_engine.dialect.name == "sqlite":
+        event.listen(sync_engine, "connect", _apply_sqlite_pragmas)
+
+
+engine = create_engine(settings.DATABASE_URL, **_engine_options(settings.DATABASE_URL, TimedQueuePool))
+_configure_engine(engine)
+
+# commit後も属性を失効させない（レスポンス生成のための db.refresh を不要にする）
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+# async def のルートで使う非同期エンジン（クエリ中もイベントループを止めない）
+ASYNC_URL = settings.ASYNC_DATABASE_URL or to_async_url(settings.DATABASE_URL)
+async_engine = create_async_engine(ASYNC_URL, **_engine_options(ASYNC_URL, TimedAsyncQueuePool))
+_configure_engine(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+def _pool_stats(pool, wait_stats: PoolWaitStats) -> Dict[str, Any]:
+    stats: Dict[str, Any] = {"pool": pool.status()}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            **wait_stats.get_stats()
+        })
+    return stats
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """同期・非同期エンジンのコネクションプールの使用状況と取り出し待ち時間"""
+    return {
+        "sync": _pool_stats(engine.pool, TimedQueuePool.wait_stats),
+        "async": _pool_stats(async_engine.pool, TimedAsyncQueuePool.wait_stats)
+    }
+
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+class _ModelBase:
+    # INSERT/UPDATE時にサーバー側で決まる値（created_at など）を RETURNING で同時に取得する
+    __mapper_args__ = {"eager_defaults": True}
 
-Base = declarative_base()
+
+Base = declarative_base(cls=_ModelBase)
 
 
 def get_db():
@@ -16,3 +174,29 @@ def get_db():
     finally:
         db.close()
 
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+@contextmanager
+def unit_of_work(db: Session) -> Iterator[Session]:
+    """ブロック内の変更を1トランザクション・1回のcommitで確定する（例外時はrollback）"""
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+
+@asynccontextmanager
+async def async_unit_of_work(db: AsyncSession) -> AsyncIterator[AsyncSession]:
+    """unit_of_work の AsyncSession 版"""
+    try:
+        yield db
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
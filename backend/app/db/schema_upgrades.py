@@ -0,0 +1,106 @@
+import logging
+from typing import Callable, Dict, List, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from .database import Base
+
+logger = logging.getLogger(__name__)
+
+# 既存のテーブルに後から追加した列: (テーブル, 列, 列定義)
+# create_all は既存のテーブルを変更しないため、起動時に足りない列だけ ALTER TABLE で追加する。
+# 既存の行にも値が入るよう、NOT NULL の列には DEFAULT を付ける。
+ADDED_COLUMNS: List[Tuple[str, str, str]] = [
+    ("groups", "version", "INTEGER NOT NULL DEFAULT 0"),
+    ("interviews", "context_summary", "TEXT"),
+    ("interviews", "slot_state", "TEXT"),
+    ("interviews", "summarized_through", "INTEGER NOT NULL DEFAULT 0"),
+    ("interviews", "preference_state", "TEXT"),
+]
+
+# 既存のテーブルに後から追加したインデックス（モデルの __table_args__ で定義した名前）
+ADDED_INDEXES: List[str] = [
+    "ix_recommendations_group_created",
+    "ix_messages_interview_sequence",
+]
+
+
+def _backfill_preference_state(conn: Connection):
+    """既存のインタビューの好みの状態をユーザー発言から作る（以後は発言ごとに更新される）"""
+    from ..core.preference_state import record_user_message
+    from ..models.interview import Interview, Message, MessageRole
+
+    db = Session(bind=conn)
+    try:
+        interviews = db.query(Interview).filter(Interview.preference_state.is_(None)).all()
+        for interview in interviews:
+            contents = db.query(Message.content).filter(
+                Message.interview_id == interview.interview_id,
+                Message.role == MessageRole.user
+            ).order_by(Message.sequence_number)
+            for (content,) in contents:
+                record_user_message(interview, content)
+        db.flush()
+    finally:
+        db.close()
+    logger.info(f"Backfilled preference state for {len(interviews)} interviews")
+
+
+# 列を追加した直後に1度だけ実行する既存データの埋め戻し
+BACKFILLS: Dict[Tuple[str, str], Callable[[Connection], None]] = {
+    ("interviews", "preference_state"): _backfill_preference_state,
+}
+
+
+def _backfill_vote_tallies(conn: Connection):
+    """集計行のない候補（集計テーブル導入前の推薦）の投票集計を作る
+
+    読み取り側は集計行を作らないため、起動時にまとめて埋める。
+    """
+    from ..core.vote_tally import rebuild_vote_tallies
+    from ..models.recommendation import CandidateVoteTally, RestaurantCandidate
+
+    db = Session(bind=conn)
+    try:
+        recommendation_ids = [
+            recommendation_id for (recommendation_id,) in db.query(RestaurantCandidate.recommendation_id).outerjoin(
+                CandidateVoteTally, CandidateVoteTally.candidate_id == RestaurantCandidate.candidate_id
+            ).filter(CandidateVoteTally.candidate_id.is_(None)).distinct()
+        ]
+        for recommendation_id in recommendation_ids:
+            rebuild_vote_tallies(db, recommendation_id)
+    finally:
+        db.close()
+    if recommendation_ids:
+        logger.info(f"Backfilled vote tallies for {len(recommendation_ids)} recommendations")
+
+
+def _find_index(name: str):
+    for table in Base.metadata.tables.values():
+        for index in table.indexes:
+            if index.name == name:
+                return index
+    raise KeyError(f"Index not defined in models: {name}")
+
+
+def upgrade_schema(engine: Engine):
+    """create_all の後に呼び、既存のテーブルに足りない列・インデックス・集計行を追加する"""
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    with engine.begin() as conn:
+        for table, column, definition in ADDED_COLUMNS:
+            if table not in tables:
+                continue
+            if column in {existing["name"] for existing in inspector.get_columns(table)}:
+                continue
+            logger.info(f"Adding column {table}.{column}")
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {definition}"))
+            backfill = BACKFILLS.get((table, column))
+            if backfill is not None:
+                backfill(conn)
+        _backfill_vote_tallies(conn)
+
+    for name in ADDED_INDEXES:
+        _find_index(name).create(engine, checkfirst=True)
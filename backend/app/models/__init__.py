@@ -1,8 +1,10 @@
 from .user import User
 from .group import Group, GroupStatus, group_members
 from .hearing import Hearing, HearingStatus
-from .recommendation import Recommendation, RestaurantCandidate, Vote, RecommendationStatus, VoteType
+from .recommendation import Recommendation, RestaurantCandidate, CandidateVoteTally, Vote, RecommendationStatus, VoteType
 from .interview import Interview, Message, InterviewStatus, MessageRole
+from .restaurant import Restaurant
+from .job import Job, JobStatus
 
 __all__ = [
     "User",
@@ -13,11 +15,15 @@ __all__ = [
     "HearingStatus", 
     "Recommendation",
     "RestaurantCandidate",
+    "CandidateVoteTally",
     "Vote",
     "RecommendationStatus",
     "VoteType",
     "Interview",
     "Message",
     "InterviewStatus",
-    "MessageRole"
+    "MessageRole",
+    "Restaurant",
+    "Job",
+    "JobStatus"
 ]
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Enum, Table, ForeignKey
+from sqlalchemy import Column, String, DateTime, Enum, Table, ForeignKey, Integer
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..db.database import Base
@@ -36,6 +36,7 @@ class Group(Base):
     host_user_id = Column(String(36), ForeignKey('users.user_id'), nullable=False)  # ホストユーザーID追加
     invite_code = Column(String(6), unique=True, nullable=False, default=generate_invite_code, index=True)  # 招待コード追加
     status = Column(Enum(GroupStatus), default=GroupStatus.active)
+    version = Column(Integer, default=0, nullable=False)  # グループに影響する書き込みごとに増える（ETag用）
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Text, Enum, ForeignKey, Integer
+from sqlalchemy import Column, String, DateTime, Text, Enum, ForeignKey, Integer, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..db.database import Base
@@ -27,6 +27,10 @@ class Interview(Base):
     group_id = Column(String(36), ForeignKey("groups.group_id"), nullable=False)
     status = Column(Enum(InterviewStatus), default=InterviewStatus.pending, nullable=False)
     preferences_summary = Column(Text, nullable=True)  # AIが生成した要約
+    preference_state = Column(Text, nullable=True)  # ユーザー発言ごとに更新する好みの状態（JSON）
+    context_summary = Column(Text, nullable=True)  # 会話ウィンドウから外れた古いターンの要約
+    slot_state = Column(Text, nullable=True)  # 要約済みのターンから抽出した条件（JSON）
+    summarized_through = Column(Integer, default=0, nullable=False)  # 要約に畳み込み済みの最後の sequence_number
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     completed_at = Column(DateTime(timezone=True), nullable=True)
@@ -54,3 +58,6 @@ class Message(Base):
     
     # リレーション
     interview = relationship("Interview", back_populates="messages")
+    
+    # インタビューごとの直近メッセージ・最大番号の取得用
+    __table_args__ = (Index('ix_messages_interview_sequence', 'interview_id', 'sequence_number'),)
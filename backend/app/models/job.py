@@ -0,0 +1,37 @@
+from sqlalchemy import Column, String, DateTime, Text, Integer, Enum, Index
+from sqlalchemy.sql import func
+from ..db.database import Base
+import uuid
+import enum
+
+
+class JobStatus(enum.Enum):
+    pending = "pending"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+
+
+class Job(Base):
+    """リクエストから切り離して実行するバックグラウンドジョブ"""
+    __tablename__ = "jobs"
+
+    job_id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()), index=True)
+    job_type = Column(String(50), nullable=False)
+    status = Column(Enum(JobStatus), default=JobStatus.pending, nullable=False)
+    dedupe_key = Column(String(255), nullable=True, index=True)  # 同じ処理の重複投入を防ぐキー
+    payload = Column(Text, nullable=True)  # JSON形式で保存
+    result = Column(Text, nullable=True)  # JSON形式で保存
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=3, nullable=False)
+    run_after = Column(DateTime(timezone=True), nullable=False)  # この時刻以降に実行（リトライ待ち）
+    locked_until = Column(DateTime(timezone=True), nullable=True)  # 実行中ジョブの可視性タイムアウト
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index('ix_jobs_status_run_after', 'status', 'run_after'),
+    )
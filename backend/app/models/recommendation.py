@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Text, Float, Integer, ForeignKey, Enum, UniqueConstraint
+from sqlalchemy import Column, String, DateTime, Text, Float, Integer, ForeignKey, Enum, UniqueConstraint, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..db.database import Base
@@ -32,6 +32,9 @@ class Recommendation(Base):
     # リレーションシップ
     group = relationship("Group", back_populates="recommendations")
     candidates = relationship("RestaurantCandidate", back_populates="recommendation")
+    
+    # グループの最新推薦の取得用
+    __table_args__ = (Index('ix_recommendations_group_created', 'group_id', 'created_at'),)
 
 
 class RestaurantCandidate(Base):
@@ -62,6 +65,23 @@ class RestaurantCandidate(Base):
     # リレーションシップ
     recommendation = relationship("Recommendation", back_populates="candidates")
     votes = relationship("Vote", back_populates="candidate")
+    tally = relationship("CandidateVoteTally", back_populates="candidate", uselist=False)
+
+
+class CandidateVoteTally(Base):
+    """候補ごとの投票数（投票と同じトランザクションで増減させる集計テーブル）"""
+    __tablename__ = "candidate_vote_tallies"
+    
+    candidate_id = Column(String(36), ForeignKey("restaurant_candidates.candidate_id"), primary_key=True)
+    recommendation_id = Column(String(36), ForeignKey("recommendations.recommendation_id"), nullable=False, index=True)
+    like_count = Column(Integer, default=0, nullable=False)
+    dislike_count = Column(Integer, default=0, nullable=False)
+    neutral_count = Column(Integer, default=0, nullable=False)
+    voter_count = Column(Integer, default=0, nullable=False)  # この候補に投票したユーザー数
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    # リレーションシップ
+    candidate = relationship("RestaurantCandidate", back_populates="tally")
 
 
 class Vote(Base):
@@ -0,0 +1,39 @@
+from sqlalchemy import Column, String, DateTime, Text, Float, Integer, JSON, UniqueConstraint, Index
+from sqlalchemy.sql import func
+from ..db.database import Base
+import uuid
+
+
+class Restaurant(Base):
+    """外部APIから取得した店舗情報を正規化して保持するカタログ"""
+    __tablename__ = "restaurants"
+
+    restaurant_id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()), index=True)
+    provider = Column(String(30), nullable=False)  # "hotpepper" / "gurunavi" / "google_places"
+    provider_restaurant_id = Column(String(255), nullable=False)  # プロバイダ側の店舗ID
+    name = Column(String(255), nullable=False)
+    address = Column(Text, nullable=True)
+    lat = Column(Float, nullable=True)
+    lng = Column(Float, nullable=True)
+    genre = Column(String(100), nullable=True)
+    genre_code = Column(String(20), nullable=True)
+    budget = Column(String(100), nullable=True)
+    budget_code = Column(String(20), nullable=True)
+    features = Column(JSON, nullable=True)  # 特徴ラベルのリスト
+    rating = Column(Float, nullable=True)
+    review_count = Column(Integer, nullable=True)
+    description = Column(Text, nullable=True)
+    access = Column(Text, nullable=True)
+    open_hours = Column(Text, nullable=True)
+    closed_days = Column(Text, nullable=True)
+    image_url = Column(String(500), nullable=True)
+    url = Column(String(500), nullable=True)
+    first_seen_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_seen_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+    # 同じプロバイダの同じ店舗は1行にまとめる（upsertのキー）
+    # 緯度経度の複合インデックスは近傍検索の範囲絞り込みに使う
+    __table_args__ = (
+        UniqueConstraint('provider', 'provider_restaurant_id', name='uq_restaurant_provider_id'),
+        Index('ix_restaurants_lat_lng', 'lat', 'lng'),
+    )
@@ -1,13 +1,20 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
-from app.db.database import engine
-from app.models import User, Group, Hearing, Recommendation, RestaurantCandidate, Vote, Interview, Message
+from app.db.database import engine, async_engine
+from app.models import User, Group, Hearing, Recommendation, RestaurantCandidate, CandidateVoteTally, Vote, Interview, Message, Restaurant, Job
 from app.api import api_router
+from app.core.http_client import http_client
+from app.clients.openai_client import openai_client
+from app.core.jobs import job_queue
+from app.core.vote_hub import vote_hub
+from app.core.group_events import group_events
 
-# データベーステーブルを作成
+# データベーステーブルを作成（既存のテーブルには後から追加した列・インデックスを足す）
 from app.db.database import Base
+from app.db.schema_upgrades import upgrade_schema
 Base.metadata.create_all(bind=engine)
+upgrade_schema(engine)
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -21,11 +28,55 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Group-Version"],
 )
 
 # APIルーターを追加（新しいパス構造）
 app.include_router(api_router, prefix="/api")
 
+@app.on_event("startup")
+async def start_job_workers():
+    """バックグラウンドジョブのワーカーを起動"""
+    job_queue.start(settings.JOB_WORKER_COUNT)
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    await job_queue.stop()
+
+@app.on_event("startup")
+async def start_group_events():
+    """グループイベントの配信（pub/sub）を開始"""
+    group_events.start()
+
+@app.on_event("shutdown")
+async def stop_group_events():
+    # pub/sub の接続は vote_hub.stop で閉じるので、先に購読を止める
+    await group_events.stop()
+
+@app.on_event("startup")
+async def start_vote_hub():
+    """投票差分の配信（pub/sub）を開始"""
+    vote_hub.start()
+
+@app.on_event("shutdown")
+async def stop_vote_hub():
+    await vote_hub.stop()
+
+@app.on_event("shutdown")
+async def close_http_client():
+    """外部API用のコネクションプールを閉じる"""
+    await http_client.aclose()
+
+@app.on_event("shutdown")
+async def close_openai_client():
+    """OpenAI用のコネクションプールを閉じる"""
+    await openai_client.aclose()
+
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    """非同期DBエンジンのコネクションを閉じる"""
+    await async_engine.dispose()
+
 @app.get("/")
 async def root():
     return {"message": "Restaurant Recommendation API"}
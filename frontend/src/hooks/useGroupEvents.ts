@@ -0,0 +1,48 @@
+import { useEffect, useRef } from 'react';
+import { API_BASE_URL } from '../services/api';
+
+export type GroupEventType =
+  | 'member_joined'
+  | 'member_left'
+  | 'interview_status'
+  | 'recommendations_ready'
+  | 'votes_updated'
+  | 'final_decision'
+  | 'resync';
+
+export type GroupEventHandlers = Partial<Record<GroupEventType, (data: any) => void>>;
+
+const EVENT_TYPES: GroupEventType[] = [
+  'member_joined',
+  'member_left',
+  'interview_status',
+  'recommendations_ready',
+  'votes_updated',
+  'final_decision',
+  'resync',
+];
+
+// グループの状態変化をSSEで受け取る（再接続・Last-Event-IDはEventSourceが自動で行う）
+export const useGroupEvents = (groupId: string | undefined, handlers: GroupEventHandlers) => {
+  const handlersRef = useRef(handlers);
+  handlersRef.current = handlers;
+
+  useEffect(() => {
+    if (!groupId) return;
+
+    const source = new EventSource(`${API_BASE_URL}/groups/${groupId}/events`);
+    EVENT_TYPES.forEach((type) => {
+      source.addEventListener(type, (event) => {
+        const handler = handlersRef.current[type];
+        if (!handler) return;
+        try {
+          handler(JSON.parse((event as MessageEvent).data));
+        } catch (error) {
+          console.error(`Failed to handle group event ${type}:`, error);
+        }
+      });
+    });
+
+    return () => source.close();
+  }, [groupId]);
+};
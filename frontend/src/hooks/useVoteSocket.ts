@@ -0,0 +1,84 @@
+import { useEffect, useRef } from 'react';
+import { API_BASE_URL } from '../services/api';
+
+// 切断時に再接続するまでの待ち時間
+const RECONNECT_DELAY_MS = 3000;
+
+// 接続直後に届く投票集計の全体
+export interface VoteSnapshotMessage {
+  type: 'snapshot';
+  votes: any;
+}
+
+// 投票ごとに届く差分（変化した候補の最新集計を含む）
+export interface VoteDeltaMessage {
+  type: 'vote_delta';
+  recommendation_id: string;
+  user_id: string;
+  changes: { candidate_id: string; vote_type: string; delta: number }[];
+  candidates: { candidate_id: string; vote_summary: Record<string, number>; total_votes: number }[];
+  total_members: number;
+  voted_members: number;
+  is_voting_complete: boolean;
+}
+
+export type VoteSocketMessage = VoteSnapshotMessage | VoteDeltaMessage;
+
+// 差分を手元の投票集計に反映する（同じ差分を重ねて適用しても結果は変わらない）
+export const applyVoteDelta = (votes: any, delta: VoteDeltaMessage) => {
+  if (!votes || votes.recommendation_id !== delta.recommendation_id) {
+    return votes;
+  }
+  const updated = new Map(delta.candidates.map((candidate) => [candidate.candidate_id, candidate]));
+  return {
+    ...votes,
+    vote_results: votes.vote_results.map((result: any) => {
+      const candidate = updated.get(result.candidate_id);
+      return candidate
+        ? { ...result, vote_summary: candidate.vote_summary, total_votes: candidate.total_votes }
+        : result;
+    }),
+    total_members: delta.total_members,
+    voted_members: delta.voted_members,
+    is_voting_complete: delta.is_voting_complete,
+  };
+};
+
+// グループの投票結果をWebSocketで受け取る（切断されたら再接続して全体を取り直す）
+export const useVoteSocket = (groupId: string | undefined, onMessage: (message: VoteSocketMessage) => void) => {
+  const onMessageRef = useRef(onMessage);
+  onMessageRef.current = onMessage;
+
+  useEffect(() => {
+    if (!groupId) return;
+
+    const url = `${API_BASE_URL.replace(/^http/, 'ws')}/recommendations/groups/${groupId}/votes/ws`;
+    let socket: WebSocket | null = null;
+    let reconnectTimer: ReturnType<typeof setTimeout> | undefined;
+    let closed = false;
+
+    const connect = () => {
+      socket = new WebSocket(url);
+      socket.onmessage = (event) => {
+        try {
+          onMessageRef.current(JSON.parse(event.data));
+        } catch (error) {
+          console.error('Failed to handle vote message:', error);
+        }
+      };
+      socket.onclose = () => {
+        if (!closed) {
+          reconnectTimer = setTimeout(connect, RECONNECT_DELAY_MS);
+        }
+      };
+    };
+
+    connect();
+
+    return () => {
+      closed = true;
+      clearTimeout(reconnectTimer);
+      socket?.close();
+    };
+  }, [groupId]);
+};
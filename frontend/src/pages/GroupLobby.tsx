@@ -5,6 +5,7 @@ import { Layout } from '../components/Layout/Layout';
 import { Button } from '../components/UI/Button';
 import { LoadingSpinner } from '../components/UI/LoadingSpinner';
 import { groupApi, interviewApi, recommendationApi } from '../services/api';
+import { useGroupEvents } from '../hooks/useGroupEvents';
 import { useStore } from '../store/useStore';
 
 export const GroupLobby: React.FC = () => {
@@ -16,6 +17,17 @@ export const GroupLobby: React.FC = () => {
   const [isLoading, setIsLoading] = useState(false);
   const [interviewStatus, setInterviewStatus] = useState<any>(null);
   const [recommendationAvailable, setRecommendationAvailable] = useState(false);
+  const [refreshKey, setRefreshKey] = useState(0);
+
+  // グループの状態が変わったらサーバーから通知を受けて再取得する
+  const refresh = () => setRefreshKey((key) => key + 1);
+  useGroupEvents(groupId, {
+    member_joined: refresh,
+    member_left: refresh,
+    interview_status: refresh,
+    recommendations_ready: refresh,
+    resync: refresh,
+  });
 
   // デバッグ情報をコンソールに出力
   console.log('GroupLobby - groupId:', groupId);
@@ -113,11 +125,7 @@ export const GroupLobby: React.FC = () => {
     };
 
     fetchGroup();
-
-    // 3秒間隔で更新（より頻繁にチェック）
-    const interval = setInterval(fetchGroup, 3000);
-    return () => clearInterval(interval);
-  }, [groupId, currentUser, navigate, setCurrentGroup]);
+  }, [groupId, currentUser, navigate, setCurrentGroup, refreshKey]);
 
   const handleStartInterview = async () => {
     if (!currentUser || !currentGroup || isLoading) return;
@@ -79,13 +79,32 @@ export const Interview: React.FC = () => {
     };
     setMessages(prev => [...prev, tempUserMessage]);
 
+    // AI応答は最初の断片が届いた時点から順に表示する
+    const tempAssistantId = `temp-assistant-${Date.now()}`;
+    const appendToken = (content: string) => setMessages(prev => {
+      if (!prev.some(msg => msg.message_id === tempAssistantId)) {
+        return [...prev, {
+          message_id: tempAssistantId,
+          interview_id: currentInterview.interview_id,
+          role: 'assistant',
+          content,
+          created_at: new Date().toISOString(),
+        }];
+      }
+      return prev.map(msg =>
+        msg.message_id === tempAssistantId ? { ...msg, content: msg.content + content } : msg
+      );
+    });
+
     try {
-      const response = await interviewApi.sendMessage(currentInterview.interview_id, {
-        message: userMessage,
-      });
+      const response = await interviewApi.sendMessageStream(
+        currentInterview.interview_id,
+        { message: userMessage },
+        appendToken
+      );
       
       // 一時メッセージを削除
-      setMessages(prev => prev.filter(msg => !msg.message_id.startsWith('temp-user')));
+      setMessages(prev => prev.filter(msg => !msg.message_id.startsWith('temp-')));
       
       // ユーザーメッセージとAIレスポンスの両方を追加
       const userMessageFinal: InterviewMessage = {
@@ -98,7 +117,7 @@ export const Interview: React.FC = () => {
       
       setMessages(prev => [...prev, userMessageFinal, response]);
     } catch (error) {
-      setMessages(prev => prev.filter(msg => !msg.message_id.startsWith('temp-user')));
+      setMessages(prev => prev.filter(msg => !msg.message_id.startsWith('temp-')));
       toast.error('メッセージの送信に失敗しました');
     } finally {
       setIsSending(false);
@@ -227,7 +246,7 @@ export const Interview: React.FC = () => {
               </div>
             ))}
             
-            {isSending && (
+            {isSending && !messages.some(msg => msg.message_id.startsWith('temp-assistant')) && (
               <div className="flex justify-start mb-3">
                 <div className="flex items-end space-x-2">
                   <div className="w-8 h-8 bg-blue-500 rounded-full flex items-center justify-center flex-shrink-0 mb-1">
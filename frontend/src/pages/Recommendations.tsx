@@ -302,6 +302,9 @@ export const Recommendations: React.FC = () => {
                     </span>
                   </div>
                   <p className="text-gray-600 text-sm mb-3">{restaurant.address}</p>
+                  {restaurant.recommendation_reason && (
+                    <p className="text-gray-700 text-sm mb-3">💡 {restaurant.recommendation_reason}</p>
+                  )}
                   
                   {/* 評価 */}
                   <div className="flex items-center space-x-2">
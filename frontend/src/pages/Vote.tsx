@@ -6,6 +6,8 @@ import { Button } from '../components/UI/Button';
 import { LoadingSpinner } from '../components/UI/LoadingSpinner';
 import { useStore } from '../store/useStore';
 import { voteApi, recommendationApi } from '../services/api';
+import { useGroupEvents } from '../hooks/useGroupEvents';
+import { useVoteSocket, applyVoteDelta } from '../hooks/useVoteSocket';
 
 export const Vote: React.FC = () => {
   const navigate = useNavigate();
@@ -13,6 +15,40 @@ export const Vote: React.FC = () => {
   const { currentUser, currentGroup, currentRecommendation } = useStore();
   const [votes, setVotes] = useState<any>(null);
   const [isLoading, setIsLoading] = useState(true);
+  const [refreshKey, setRefreshKey] = useState(0);
+
+  // 主催者の最終決定を結果画面へ反映（主催者以外）
+  const showFinalDecision = (restaurantData: any): boolean => {
+    if (!currentUser || !currentGroup || currentUser.user_id === currentGroup.host_user_id) {
+      return false;
+    }
+    // 推薦データから該当するレストランを探す
+    const selectedRestaurant = currentRecommendation?.restaurants.find(
+      r => r.restaurant_id === restaurantData.restaurant_id
+    );
+    if (!selectedRestaurant) {
+      return false;
+    }
+    toast.success(`${restaurantData.restaurant_name}に決定されました！`);
+    navigate(`/group/${groupId}/result`, { state: { winner: selectedRestaurant } });
+    return true;
+  };
+
+  // 最終決定はサーバーからの通知で反映する
+  useGroupEvents(groupId, {
+    final_decision: showFinalDecision,
+    resync: () => setRefreshKey((key) => key + 1),
+  });
+
+  // 投票結果は接続時の全体集計と、その後の投票ごとの差分で更新する
+  useVoteSocket(groupId, (message) => {
+    if (message.type === 'snapshot') {
+      setVotes(message.votes);
+      setIsLoading(false);
+    } else {
+      setVotes((current: any) => applyVoteDelta(current, message));
+    }
+  });
 
   const handleFinalDecision = async (restaurant: any) => {
     if (!currentUser || !currentGroup || !groupId) {
@@ -64,18 +100,8 @@ export const Vote: React.FC = () => {
         if (currentUser && currentGroup && currentUser.user_id !== currentGroup.host_user_id) {
           try {
             const finalDecision = await recommendationApi.getFinalDecision(groupId);
-            if (finalDecision.has_final_decision) {
-              const restaurantData = finalDecision.final_decision;
-              // 推薦データから該当するレストランを探す
-              const selectedRestaurant = currentRecommendation?.restaurants.find(
-                r => r.restaurant_id === restaurantData.restaurant_id
-              );
-              
-              if (selectedRestaurant) {
-                toast.success(`${restaurantData.restaurant_name}に決定されました！`);
-                navigate(`/group/${groupId}/result`, { state: { winner: selectedRestaurant } });
-                return;
-              }
+            if (finalDecision.has_final_decision && showFinalDecision(finalDecision.final_decision)) {
+              return;
             }
           } catch (finalDecisionError) {
             // 最終決定チェックエラーは無視（まだ決定されていない）
@@ -93,18 +119,7 @@ export const Vote: React.FC = () => {
     };
 
     fetchVotes();
-    
-    // 投票完了まで10秒間隔で投票結果を更新
-    const interval = setInterval(() => {
-      if (votes?.is_voting_complete) {
-        clearInterval(interval);
-        return;
-      }
-      fetchVotes();
-    }, 10000);
-    
-    return () => clearInterval(interval);
-  }, [groupId, navigate, currentUser, currentGroup, currentRecommendation]); // 依存配列を更新
+  }, [groupId, navigate, currentUser, currentGroup, currentRecommendation, refreshKey]); // 依存配列を更新
 
   if (isLoading) {
     return (
@@ -2,7 +2,8 @@ import React, { useState, useEffect } from 'react';
 import { useNavigate, useParams } from 'react-router-dom';
 import { Layout } from '../components/Layout/Layout';
 import { LoadingSpinner } from '../components/UI/LoadingSpinner';
-import { groupApi } from '../services/api';
+import { groupApi, interviewApi } from '../services/api';
+import { useGroupEvents } from '../hooks/useGroupEvents';
 import { useStore } from '../store/useStore';
 
 export const Waiting: React.FC = () => {
@@ -11,6 +12,27 @@ export const Waiting: React.FC = () => {
   const { currentUser, currentGroup, setCurrentGroup } = useStore();
   const [completedMembers, setCompletedMembers] = useState<string[]>([]);
 
+  const applyInterviewStatus = (status: any) => {
+    setCompletedMembers(
+      (status.member_status || [])
+        .filter((member: any) => member.interview_status === 'completed')
+        .map((member: any) => member.user_id)
+    );
+    if (status.all_completed) {
+      navigate(`/group/${groupId}/recommendations`);
+    }
+  };
+
+  // ヒアリングの進捗はサーバーからの通知で更新する
+  useGroupEvents(groupId, {
+    interview_status: applyInterviewStatus,
+    resync: async () => {
+      if (groupId) {
+        applyInterviewStatus(await interviewApi.getGroupInterviewStatus(groupId));
+      }
+    },
+  });
+
   useEffect(() => {
     if (!groupId || !currentUser || !currentGroup) {
       navigate('/');
@@ -21,21 +43,14 @@ export const Waiting: React.FC = () => {
       try {
         const group = await groupApi.getGroup(groupId);
         setCurrentGroup(group);
-        
-        // TODO: 実際のAPIでヒアリング完了状況を取得
-        // 仮の実装として、3秒後にレコメンデーション画面に遷移
-        setTimeout(() => {
-          navigate(`/group/${groupId}/recommendations`);
-        }, 3000);
+        applyInterviewStatus(await interviewApi.getGroupInterviewStatus(groupId));
       } catch (error) {
         console.error('Status check error:', error);
       }
     };
 
     checkStatus();
-    const interval = setInterval(checkStatus, 2000);
-    return () => clearInterval(interval);
-  }, [groupId, currentUser, navigate, setCurrentGroup, currentGroup]);
+  }, [groupId, currentUser, navigate, setCurrentGroup]);
 
   if (!currentGroup) {
     return (
@@ -11,7 +11,7 @@ import {
   ChatMessageRequest 
 } from '../types';
 
-const API_BASE_URL = 'http://localhost:8001/api';
+export const API_BASE_URL = 'http://localhost:8001/api';
 
 const api = axios.create({
   baseURL: API_BASE_URL,
@@ -20,6 +20,63 @@ const api = axios.create({
   },
 });
 
+// 長ポーリング（SSEを使えないクライアント向け）
+// since_version より状態が進むまでサーバーが応答を保留する。変化がなければ data は null
+export interface VersionedState<T = any> {
+  version: number;
+  data: T | null;
+}
+
+const LONG_POLL_TIMEOUT_SECONDS = 25;
+
+const longPoll = async <T = any>(url: string, sinceVersion?: number): Promise<VersionedState<T>> => {
+  const response = await api.get(url, {
+    params: sinceVersion === undefined ? {} : { since_version: sinceVersion, timeout: LONG_POLL_TIMEOUT_SECONDS },
+    validateStatus: (status) => status === 200 || status === 304,
+  });
+  return {
+    version: Number(response.headers['x-group-version']),
+    data: response.status === 200 ? response.data : null,
+  };
+};
+
+// Job API
+export interface Job<T = any> {
+  job_id: string;
+  job_type: string;
+  status: 'pending' | 'running' | 'succeeded' | 'failed';
+  attempts: number;
+  max_attempts: number;
+  result: T | null;
+  error: string | null;
+}
+
+const JOB_POLL_INTERVAL_MS = 1000;
+const JOB_TIMEOUT_MS = 120000;
+
+export const jobApi = {
+  getJob: async <T = any>(jobId: string): Promise<Job<T>> => {
+    const response = await api.get(`/jobs/${jobId}`);
+    return response.data;
+  },
+
+  // ジョブが完了するまでポーリングして結果を返す
+  waitForJob: async <T = any>(jobId: string): Promise<T> => {
+    const deadline = Date.now() + JOB_TIMEOUT_MS;
+    while (Date.now() < deadline) {
+      const job = await jobApi.getJob<T>(jobId);
+      if (job.status === 'succeeded') {
+        return job.result as T;
+      }
+      if (job.status === 'failed') {
+        throw new Error(job.error || 'Job failed');
+      }
+      await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+    }
+    throw new Error('Job timed out');
+  },
+};
+
 // User API
 export const userApi = {
   createAnonymousUser: async (data: CreateUserRequest): Promise<User> => {
@@ -72,6 +129,51 @@ export const interviewApi = {
     return response.data;
   },
   
+  // AI応答をトークン単位で受け取る（SSE）。断片ごとに onToken を呼び、保存されたメッセージを返す
+  sendMessageStream: async (
+    interviewId: string,
+    data: ChatMessageRequest,
+    onToken: (content: string) => void
+  ): Promise<InterviewMessage> => {
+    const response = await fetch(`${API_BASE_URL}/interviews/${interviewId}/chat?stream=true`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(data),
+    });
+    if (!response.ok || !response.body) {
+      throw new Error(`Chat stream failed: ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    for (;;) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let boundary = buffer.indexOf('\n\n');
+      while (boundary !== -1) {
+        const block = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        boundary = buffer.indexOf('\n\n');
+
+        const event = block.match(/^event: (.*)$/m)?.[1];
+        const payload = block.match(/^data: (.*)$/m)?.[1];
+        if (!event || payload === undefined) continue;
+        const message = JSON.parse(payload);
+        if (event === 'token') {
+          onToken(message.content);
+        } else if (event === 'done') {
+          return message;
+        } else if (event === 'error') {
+          throw new Error(message.detail);
+        }
+      }
+    }
+    throw new Error('Chat stream ended unexpectedly');
+  },
+  
   completeInterview: async (interviewId: string): Promise<Interview> => {
     const response = await api.post(`/interviews/${interviewId}/complete`);
     return response.data;
@@ -86,13 +188,17 @@ export const interviewApi = {
     const response = await api.get(`/interviews/groups/${groupId}/interview-status`);
     return response.data;
   },
+  
+  pollGroupInterviewStatus: (groupId: string, sinceVersion?: number): Promise<VersionedState> =>
+    longPoll(`/interviews/groups/${groupId}/interview-status`, sinceVersion),
 };
 
 // Recommendation API
 export const recommendationApi = {
   generateRecommendations: async (groupId: string): Promise<Recommendation> => {
+    // 店舗検索・スコアリングはバックグラウンドジョブで行われる
     const response = await api.post(`/recommendations/groups/${groupId}/recommendations`);
-    return response.data;
+    return jobApi.waitForJob<Recommendation>(response.data.job_id);
   },
   
   getRecommendations: async (groupId: string): Promise<Recommendation> => {
@@ -145,6 +251,9 @@ export const voteApi = {
     return response.data;
   },
   
+  pollGroupVotes: (groupId: string, sinceVersion?: number): Promise<VersionedState> =>
+    longPoll(`/recommendations/groups/${groupId}/votes`, sinceVersion),
+  
   getUserVote: async (groupId: string, userId: string): Promise<any> => {
     const response = await api.get(`/recommendations/groups/${groupId}/user/${userId}/vote`);
     return response.data;
@@ -45,6 +45,8 @@ export interface Restaurant {
   external_rating: number;
   external_review_count: number;
   image_url: string;
+  match_score?: number;  // グループの好みとの適合度（0〜100）
+  recommendation_reason?: string;
   vote_count: number;
 }
 